@@ -0,0 +1,133 @@
+from models import ActionType
+from database import RiskDatabase
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A handler gets the claimed action row and returns the processing note to store.
+# Delivery is at-least-once (a claim can expire mid-handler), so handlers must be idempotent.
+ActionHandler = Callable[[Dict], Awaitable[str]]
+
+
+async def handle_accept_delay(action: Dict) -> str:
+    return f"Customer accepted the delay for package {action['package_id']}; no further action"
+
+
+# Refunds and resends need a real integration (finance, fulfillment): register() one at startup.
+# Until then those actions stay pending with a "no handler configured" note.
+DEFAULT_HANDLERS: Dict[str, ActionHandler] = {
+    ActionType.ACCEPT_DELAY.value: handle_accept_delay
+}
+
+
+class ActionProcessor:
+    """
+    Background worker for customer_actions: claims pending rows in batches (oldest first),
+    runs the handler registered for each action with bounded concurrency and marks the batch
+    processed in one write. Claims are leases, so actions whose worker dies are retried;
+    failed handlers are retried after retry_delay_seconds, up to max_attempts. Actions without
+    a handler are never marked processed; they are re-checked every retry_delay_seconds.
+    """
+
+    def __init__(self, db: RiskDatabase, batch_size: int = 100, concurrency: int = 4,
+                 interval_seconds: float = 5, lease_seconds: float = 300,
+                 max_attempts: int = 5, retry_delay_seconds: float = 60):
+        self.db = db
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.handlers: Dict[str, ActionHandler] = dict(DEFAULT_HANDLERS)
+
+        self.processed = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        logger.info(f"ActionProcessor initialized (batch size: {batch_size}, concurrency: {concurrency}, poll: {interval_seconds}s)")
+
+    def register(self, action: str, handler: ActionHandler):
+        """Install (or replace) the handler for an action type"""
+        self.handlers[action] = handler
+
+    async def _handle(self, action: Dict, semaphore: asyncio.Semaphore) -> Tuple[bool, str]:
+        handler = self.handlers.get(action["action"])
+        if handler is None:
+            return False, f"No handler configured for action '{action['action']}'; not processed"
+        async with semaphore:
+            try:
+                return True, await handler(action)
+            except Exception as e:
+                logger.warning(f"Handler for action {action['id']} ({action['action']}) failed: {str(e)}")
+                return False, f"Attempt {action['attempts']} failed: {str(e)}"
+
+    async def process_batch(self) -> int:
+        """Claim and process one batch; returns the number of actions claimed"""
+        actions = await self.db.claim_customer_actions(self.batch_size, self.lease_seconds)
+        if not actions:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*[self._handle(action, semaphore) for action in actions])
+
+        completed: List[Tuple[int, str]] = []
+        retries: List[Tuple[int, str]] = []
+        for action, (ok, notes) in zip(actions, outcomes):
+            if ok:
+                completed.append((action["id"], notes))
+            elif action["action"] in self.handlers and action["attempts"] >= self.max_attempts:
+                # Stop retrying; the note records that the action was not carried out
+                completed.append((action["id"], f"FAILED after {action['attempts']} attempts: {notes}"))
+                self.failed += 1
+            else:
+                retries.append((action["id"], notes))
+
+        await self.db.complete_customer_actions(completed)
+        await self.db.retry_customer_actions(retries, self.retry_delay_seconds)
+        self.processed += len(completed)
+        logger.info(f"Processed {len(actions)} customer actions ({len(completed)} done, {len(retries)} to retry)")
+        return len(actions)
+
+    async def run_until_idle(self) -> int:
+        """Process batches until nothing claimable is left"""
+        total = 0
+        while True:
+            claimed = await self.process_batch()
+            total += claimed
+            if claimed < self.batch_size:
+                return total
+
+    def wake(self):
+        """Nudge the worker after an action is recorded"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_until_idle()
+            except Exception as e:
+                logger.warning(f"Customer action processing cycle failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            logger.info("Starting customer action processor")
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Customer action processor stopped")
@@ -0,0 +1,121 @@
+from zip_reference import DEFAULT_CSV_PATH
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+import csv
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z ]+")
+_SPACES = re.compile(r"\s+")
+_CITY_PREFIXES = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+
+
+class ResolvedAddress(NamedTuple):
+    zip_code: str
+    city: str
+    source: str  # 'postal_code', 'city' or 'state'
+
+
+def normalize_postal_code(postal_code: Optional[str], country_code: str = "US") -> Optional[str]:
+    """5-digit ZIP for US codes (ZIP+4, missing leading zeros, stray characters), uppercased otherwise"""
+    if not postal_code:
+        return None
+    if country_code.upper() in ("US", "PR"):
+        digits = re.sub(r"\D", "", postal_code)
+        if len(digits) == 9:
+            digits = digits[:5]
+        elif 3 <= len(digits) <= 4:
+            # Leading zeros dropped by spreadsheets, e.g. 2108 -> 02108
+            digits = digits.zfill(5)
+        return digits if len(digits) == 5 else None
+    normalized = _SPACES.sub(" ", postal_code.strip().upper())
+    return normalized or None
+
+
+def normalize_city(city: Optional[str]) -> str:
+    """Case, punctuation and common abbreviation insensitive city key ('St. Louis' == 'saint louis')"""
+    if not city:
+        return ""
+    words = _NON_ALNUM.sub(" ", city.lower().replace("-", " ")).split()
+    if words and words[0] in _CITY_PREFIXES:
+        words[0] = _CITY_PREFIXES[words[0]]
+    return " ".join(words)
+
+
+class AddressResolver:
+    """
+    Resolves ShipStation ship-to addresses to a destination zip without any I/O per request:
+    a normalized postal code wins, otherwise (country, state, city) is looked up in a hash
+    index built once from the ZIP reference CSV, then a representative zip for the state.
+    Resolved addresses are kept in a bounded LRU.
+    """
+
+    def __init__(self, csv_path: str = DEFAULT_CSV_PATH, cache_size: int = 10000):
+        self.csv_path = csv_path
+        self.cache_size = cache_size
+        self._by_city: Optional[Dict[Tuple[str, str, str], Tuple[str, str]]] = None
+        self._by_state: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._city_by_zip: Dict[str, str] = {}
+        self._cache: "OrderedDict[Tuple, Optional[ResolvedAddress]]" = OrderedDict()
+
+    def _build_index(self):
+        if self._by_city is not None:
+            return
+        self._by_city = {}
+        if not os.path.exists(self.csv_path):
+            logger.warning(f"ZIP reference dataset not found at {self.csv_path} - address resolution by city disabled")
+            return
+
+        with open(self.csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                city = (row.get("city") or "").strip()
+                zip_code = normalize_postal_code(row["zip"])
+                state = row["state"].strip().upper()
+                if not city or not zip_code:
+                    continue
+                country = row.get("country", "US").strip().upper() or "US"
+                # First zip listed for a city / state is its representative
+                self._by_city.setdefault((country, state, normalize_city(city)), (zip_code, city))
+                self._by_state.setdefault((country, state), (zip_code, city))
+                self._city_by_zip[zip_code] = city
+        logger.info(f"Address index built: {len(self._by_city)} cities in {len(self._by_state)} states")
+
+    def _resolve(self, country: str, state: str, city_key: str, postal_code: Optional[str],
+                 city: str) -> Optional[ResolvedAddress]:
+        self._build_index()
+        if postal_code and country in ("US", "PR"):
+            return ResolvedAddress(postal_code, city or self._city_by_zip.get(postal_code, ""), "postal_code")
+
+        match = self._by_city.get((country, state, city_key)) if city_key else None
+        if match is not None:
+            return ResolvedAddress(match[0], city or match[1], "city")
+
+        match = self._by_state.get((country, state))
+        if match is not None:
+            return ResolvedAddress(match[0], match[1], "state")
+        return None
+
+    def resolve(self, country_code: Optional[str], state: Optional[str], city: Optional[str] = None,
+                postal_code: Optional[str] = None) -> Optional[ResolvedAddress]:
+        """Best destination zip for an address, None if nothing in it can be resolved"""
+        country = (country_code or "US").strip().upper()
+        state = (state or "").strip().upper()
+        city = (city or "").strip()
+        key = (country, state, normalize_city(city), normalize_postal_code(postal_code, country))
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        resolved = self._resolve(country, state, key[2], key[3], city)
+        self._cache[key] = resolved
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return resolved
+
+
+# Global address resolver instance (same dataset as the ZIP reference)
+address_resolver = AddressResolver(os.getenv("ZIP_REFERENCE_CSV", DEFAULT_CSV_PATH))
@@ -0,0 +1,164 @@
+from database import RiskDatabase
+from email_service import EmailService
+from alert_ledger import AlertLedger
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class BulkAlertJob:
+    """Progress of one bulk alert campaign"""
+
+    def __init__(self, job_id: str, criteria: Dict):
+        self.job_id = job_id
+        self.criteria = criteria
+        self.status = "queued"
+        self.selected = 0
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.suppressed = 0
+        self.batches_sent = 0
+        self.batches_failed = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "criteria": self.criteria,
+            "packages_selected": self.selected,
+            "recipients_sent": self.sent,
+            "recipients_failed": self.failed,
+            "packages_skipped": self.skipped,
+            "packages_suppressed": self.suppressed,
+            "batches_sent": self.batches_sent,
+            "batches_failed": self.batches_failed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class BulkAlertJobManager:
+    """
+    Runs bulk alert campaigns in the background: pages through stored risk scores above a
+    threshold (highest risk first) and sends each page as one SendGrid request with up to
+    batch_size personalizations, at most requests_per_second requests per second.
+    Every package is claimed in the alert ledger first, so re-running a campaign does not
+    alert anyone already alerted within the suppression window; claims of failed batches
+    are released.
+    """
+
+    def __init__(self, db: RiskDatabase, email_service: EmailService, alert_ledger: AlertLedger,
+                 batch_size: int = 1000, requests_per_second: float = 2.0, max_jobs: int = 100):
+        self.db = db
+        self.email_service = email_service
+        self.alert_ledger = alert_ledger
+        self.batch_size = batch_size
+        self.requests_per_second = requests_per_second
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BulkAlertJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._next_send_at = 0.0
+        logger.info(f"BulkAlertJobManager initialized (batch size: {batch_size}, {requests_per_second} requests/s)")
+
+    def get(self, job_id: str) -> Optional[BulkAlertJob]:
+        return self._jobs.get(job_id)
+
+    def start_job(self, min_risk: int, carrier: Optional[str] = None, zip_prefix: Optional[str] = None,
+                  recipients: Optional[Dict[str, str]] = None) -> BulkAlertJob:
+        job = BulkAlertJob(uuid.uuid4().hex, {"min_risk": min_risk, "carrier": carrier, "zip_prefix": zip_prefix})
+        self._jobs[job.job_id] = job
+        # Keep status for the most recent jobs only
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+        self._tasks[job.job_id] = asyncio.create_task(self.run_job(job, recipients or {}))
+        logger.info(f"Started bulk alert job {job.job_id}: {job.criteria}")
+        return job
+
+    async def _throttle(self):
+        """Space SendGrid requests out to the configured rate (shared by all jobs)"""
+        now = time.monotonic()
+        wait = self._next_send_at - now
+        self._next_send_at = max(now, self._next_send_at) + 1.0 / self.requests_per_second
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _claim(self, rows: List[Dict], recipients: Dict[str, str]) -> List[Dict]:
+        """The rows this campaign may alert now; all claims are released if the ledger fails"""
+        claimed = []
+        try:
+            for row in rows:
+                if await self.alert_ledger.claim(row["package_id"], recipients[row["package_id"]]):
+                    claimed.append(row)
+        except Exception:
+            await self._release(claimed, recipients)
+            raise
+        return claimed
+
+    async def _release(self, rows: List[Dict], recipients: Dict[str, str]):
+        for row in rows:
+            try:
+                await self.alert_ledger.release(row["package_id"], recipients[row["package_id"]])
+            except Exception as e:
+                logger.warning(f"Could not release the alert claim for {row['package_id']}: {str(e)}")
+
+    async def run_job(self, job: BulkAlertJob, recipients: Dict[str, str]):
+        job.status = "running"
+        after = None
+        try:
+            while True:
+                rows = await self.db.query_packages(
+                    limit=self.batch_size, sort_by="risk", after=after,
+                    carrier=job.criteria["carrier"], zip_prefix=job.criteria["zip_prefix"],
+                    min_risk=job.criteria["min_risk"]
+                )
+                if not rows:
+                    break
+                job.selected += len(rows)
+
+                # Packages without a recipient in the campaign are not emailed
+                addressed = [row for row in rows if recipients.get(row["package_id"])]
+                job.skipped += len(rows) - len(addressed)
+                claimed = await self._claim(addressed, recipients)
+                job.suppressed += len(addressed) - len(claimed)
+                if claimed:
+                    message = self.email_service.build_bulk_alert_message(claimed, recipients)
+                    try:
+                        await self._throttle()
+                        sent = await self.email_service.send_bulk_message(message)
+                    except Exception:
+                        await self._release(claimed, recipients)
+                        raise
+                    if sent:
+                        job.sent += len(claimed)
+                        job.batches_sent += 1
+                    else:
+                        await self._release(claimed, recipients)
+                        job.failed += len(claimed)
+                        job.batches_failed += 1
+                logger.info(f"Bulk alert job {job.job_id}: {job.sent} sent, {job.failed} failed, {job.skipped} skipped, "
+                            f"{job.suppressed} suppressed of {job.selected} selected")
+
+                if len(rows) < self.batch_size:
+                    break
+                after = (rows[-1]["risk_score"], rows[-1]["package_id"])
+
+            job.status = "completed" if not job.failed else "completed_with_errors"
+        except Exception as e:
+            logger.error(f"Bulk alert job {job.job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            self._tasks.pop(job.job_id, None)
@@ -0,0 +1,79 @@
+from database import RiskDatabase
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AlertLedger:
+    """
+    Suppresses repeat delay alerts: at most one alert per (package, recipient) within the
+    suppression window. The alert_ledger table is the record; an in-memory LRU of recent
+    sends answers repeats without touching the database or the email provider.
+    """
+
+    def __init__(self, db: RiskDatabase, window_seconds: float = 86400, cache_size: int = 100000):
+        self.db = db
+        self.window_seconds = window_seconds
+        self.cache_size = cache_size
+        self._recent: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.suppressed = 0
+        logger.info(f"AlertLedger initialized (suppression window: {window_seconds}s, cache size: {cache_size})")
+
+    @staticmethod
+    def _key(package_id: str, recipient: str) -> Tuple[str, str]:
+        return package_id, recipient.strip().lower()
+
+    def _remember(self, key: Tuple[str, str], sent_at: float):
+        self._recent[key] = sent_at
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+
+    def recently_alerted(self, package_id: str, recipient: str) -> bool:
+        """In-memory check only: True if this process knows of an alert inside the window"""
+        sent_at = self._recent.get(self._key(package_id, recipient))
+        return sent_at is not None and time.time() - sent_at < self.window_seconds
+
+    async def claim(self, package_id: str, recipient: str) -> bool:
+        """
+        Reserve the right to alert this recipient about this package.
+        False if an alert already went out within the window (the caller must not send).
+        """
+        if self.window_seconds <= 0:
+            return True
+
+        key = self._key(package_id, recipient)
+        if self.recently_alerted(package_id, recipient):
+            self.suppressed += 1
+            self._recent.move_to_end(key)
+            logger.info(f"Alert for {package_id} to {key[1]} SUPPRESSED (in-memory)")
+            return False
+
+        # Reserve in memory before awaiting so concurrent duplicates are rejected too
+        now = time.time()
+        self._remember(key, now)
+        try:
+            claimed = await self.db.claim_alert(key[0], key[1], now, self.window_seconds)
+        except Exception:
+            # Nothing was recorded, so don't let the reservation suppress retries
+            if self._recent.get(key) == now:
+                del self._recent[key]
+            raise
+        if claimed:
+            return True
+
+        # Sent within the window by another process, or before this cache was warm
+        self._remember(key, await self.db.get_alert_sent_at(key[0], key[1]) or now)
+        self.suppressed += 1
+        logger.info(f"Alert for {package_id} to {key[1]} SUPPRESSED (ledger)")
+        return False
+
+    async def release(self, package_id: str, recipient: str):
+        """Give back a claim whose alert was not sent"""
+        key = self._key(package_id, recipient)
+        sent_at: Optional[float] = self._recent.pop(key, None)
+        if sent_at is not None:
+            await self.db.release_alert(key[0], key[1], sent_at)
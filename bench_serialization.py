@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for response serialization cost per 250-row page.
+
+For the /packages, /enrich-shipments and /enrich-awaiting-shipments payloads
+it compares:
+  - jsonable_encoder + JSONResponse (FastAPI's path for routes without a response model)
+  - response model serialize + JSONResponse (previous default for our typed routes)
+  - response model serialize + ORJSONModelResponse (current default)
+  - ORJSONModelResponse rendering the models directly
+
+Usage: python bench_serialization.py [rows] [iterations]
+"""
+import asyncio
+import logging
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from bench_enrichment import build_page
+from json_response import ORJSONModelResponse
+from mock_data import build_awaiting_shipment_payload, generate_mock_packages
+from models import EnrichedPackage, ShipStationResponse, ShipStationAwaitingShipmentResponse
+
+logging.disable(logging.CRITICAL)
+
+
+def build_packages(rows: int) -> List[EnrichedPackage]:
+    return [
+        EnrichedPackage(**package.model_dump(), risk_score=40 + i % 50,
+                        reasons=["storm", "known UPS delays", "tight delivery timeline"])
+        for i, package in enumerate(generate_mock_packages(rows))
+    ]
+
+
+def build_awaiting_page(rows: int) -> ShipStationAwaitingShipmentResponse:
+    template = build_awaiting_shipment_payload()
+    order = template["salesOrders"][0]
+    orders = [dict(order, fulfillmentPlanIds=[str(1100000 + i)], riskScore=i % 100) for i in range(rows)]
+    return ShipStationAwaitingShipmentResponse(
+        currentPageFulfillmentPlanIds=[o["fulfillmentPlanIds"][0] for o in orders],
+        salesOrders=orders
+    )
+
+
+def time_per_page(fn, iterations: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def bench(label: str, response_type, content, iterations: int):
+    field = create_response_field(name=f"Response_{label}", type_=response_type)
+
+    # What FastAPI hands to the response class for a route with this response model
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+
+    def model_serialize():
+        # The synchronous pydantic step inside serialize_response
+        return field.serialize(content)
+
+    results = {
+        "jsonable_encoder + json": time_per_page(lambda: JSONResponse(jsonable_encoder(content)), iterations),
+        "model serialize + json": time_per_page(lambda: JSONResponse(model_serialize()), iterations),
+        "model serialize + orjson": time_per_page(lambda: ORJSONModelResponse(model_serialize()), iterations),
+        "orjson direct": time_per_page(lambda: ORJSONModelResponse(content), iterations),
+    }
+
+    # All variants must produce the same document
+    reference = JSONResponse(serialized).body
+    assert ORJSONModelResponse(model_serialize()).body == ORJSONModelResponse(content).body
+    assert JSONResponse(jsonable_encoder(content)).body == reference
+
+    print(f"\n{label}")
+    baseline = results["model serialize + json"]
+    for name, ms in results.items():
+        print(f"  {name:<26} {ms:8.2f} ms/page   ({baseline / ms:4.1f}x vs previous default)")
+
+
+def run(rows: int, iterations: int):
+    print(f"Serializing {rows}-row pages, {iterations} iterations")
+    bench("/packages", List[EnrichedPackage], build_packages(rows), iterations)
+    bench("/enrich-shipments", ShipStationResponse, ShipStationResponse(**build_page(rows)), iterations)
+    bench("/enrich-awaiting-shipments", ShipStationAwaitingShipmentResponse, build_awaiting_page(rows), iterations)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run(rows, iterations)
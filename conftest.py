@@ -0,0 +1,41 @@
+import asyncio
+import shutil
+import pytest
+from database import RiskDatabase, risk_db
+from models import CarrierType, Package
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_risk_database(tmp_path_factory):
+    """
+    Run the app's shared database against an initialized copy (as after /admin/initialize-database),
+    so tests never modify the tracked risk_data.db
+    """
+    original_path = risk_db.db_path
+    risk_db.db_path = str(tmp_path_factory.mktemp("data") / "risk_data.db")
+    shutil.copy(original_path, risk_db.db_path)
+    asyncio.run(risk_db.initialize())
+    yield risk_db.db_path
+    risk_db.db_path = original_path
+
+
+@pytest.fixture
+def db(tmp_path):
+    """An initialized RiskDatabase of its own for each test"""
+    database = RiskDatabase(str(tmp_path / "risk.db"))
+    asyncio.run(database.initialize())
+    return database
+
+
+@pytest.fixture
+def make_package():
+    """Factory for Packages; anything not given defaults to a UPS shipment to Seattle"""
+    def factory(package_id: str = "PKG-1", **fields) -> Package:
+        defaults = {
+            "destination_zip": "98101",
+            "destination_city": "Seattle",
+            "carrier": CarrierType.UPS,
+            "expected_delivery_date": "2030-01-10",
+        }
+        return Package(package_id=package_id, **{**defaults, **fields})
+    return factory
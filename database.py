@@ -1,16 +1,36 @@
 import aiosqlite
 import os
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from zip_reference import zip_reference
+from delivery_calendar import delivery_calendar
 import json
+import time
 
 logger = logging.getLogger(__name__)
 
+# Rollup granularities: bucket type -> strftime format of the bucket start (UTC, like CURRENT_TIMESTAMP)
+ROLLUP_BUCKETS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d"}
+
 
 class RiskDatabase:
     def __init__(self, db_path: str = "risk_data.db"):
         self.db_path = db_path
+        # Bumped whenever data feeding risk factors changes (seeding, delivery outcomes)
+        self.data_version = 0
+        # Newest delivery outcome id, so outcomes recorded by other processes invalidate caches too
+        self._outcome_version = 0
+        self._outcome_version_checked_at = float("-inf")
+        self.version_check_seconds = 1.0
+        # Carrier x zip analysis results, keyed by the data version so new outcomes invalidate them
+        self._matrix_cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self.matrix_cache_size = 256
+        # temporal_risk patterns, loaded once, and the temporal risk they give each delivery date
+        self._temporal_patterns: Optional[Dict[Tuple[str, str], Tuple[float, str]]] = None
+        self._temporal_cache: "OrderedDict[str, Tuple[int, Tuple[str, ...]]]" = OrderedDict()
+        self.temporal_cache_size = 4096
         logger.info(f"Initializing RiskDatabase at {db_path}")
     
     async def initialize(self):
@@ -27,8 +47,13 @@ class RiskDatabase:
             # Seed with realistic historical data
             await self._seed_initial_data(db)
             
-            await db.commit()
+            await self._backfill_rollups(db)
             
+            await db.commit()
+        
+        self._temporal_patterns = None
+        self._temporal_cache.clear()
+        self.data_version += 1
         logger.info("Database initialization completed")
     
     async def _create_tables(self, db: aiosqlite.Connection):
@@ -140,9 +165,158 @@ class RiskDatabase:
                 processing_notes TEXT
             )
         """)
+        # Action processing worker: lease on claimed rows and delivery attempts
+        await self._add_missing_columns(db, "customer_actions", {
+            "claimed_until": "REAL",  # Unix time the current claim expires; NULL when unclaimed
+            "attempts": "INTEGER DEFAULT 0",
+            "processed_at": "TIMESTAMP"
+        })
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_customer_actions_pending ON customer_actions(processed, timestamp)")
+        
+        # Package repository (primary-key lookups, bulk upserts)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS packages (
+                package_id TEXT PRIMARY KEY,
+                destination_zip TEXT NOT NULL,
+                destination_city TEXT NOT NULL,
+                carrier TEXT NOT NULL,
+                expected_delivery_date TEXT NOT NULL,
+                risk_score INTEGER,  -- precomputed by the background scorer, NULL until scored
+                risk_reasons TEXT,  -- JSON array of reasons
+                scored_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await self._add_missing_columns(db, "packages", {
+            "origin_zip": "TEXT",
+            "risk_score": "INTEGER",
+            "risk_reasons": "TEXT",
+            "scored_at": "TIMESTAMP"
+        })
+        
+        # Indexes backing keyset pagination and filters on /packages
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_packages_risk ON packages(risk_score DESC, package_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_packages_carrier_risk ON packages(carrier, risk_score DESC, package_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_packages_zip ON packages(destination_zip)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_packages_delivery_date ON packages(expected_delivery_date)")
+        
+        # Materialized current risk score per package with a monotonic change sequence,
+        # so consumers can poll "everything changed since N" instead of re-scoring everything
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS package_risk_scores (
+                package_id TEXT PRIMARY KEY,
+                risk_score INTEGER NOT NULL,
+                risk_reasons TEXT NOT NULL,  -- JSON array of reasons
+                factors TEXT NOT NULL,  -- JSON object: factor -> points
+                computed_at TIMESTAMP NOT NULL,
+                change_seq INTEGER NOT NULL
+            )
+        """)
+        await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_package_risk_scores_seq ON package_risk_scores(change_seq)")
+        
+        # Emails that could not be delivered after retries (or were rejected outright)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS email_dead_letters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipients TEXT NOT NULL,  -- JSON array of addresses
+                subject TEXT NOT NULL,
+                payload TEXT NOT NULL,  -- SendGrid v3 mail/send body, for replay
+                attempts INTEGER NOT NULL,
+                last_status INTEGER,  -- HTTP status of the last attempt, NULL on network errors
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Last delay alert per (package, recipient), for repeat-alert suppression
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS alert_ledger (
+                package_id TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                sent_at REAL NOT NULL,  -- Unix time of the last alert
+                alert_count INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (package_id, recipient)
+            )
+        """)
+        
+        await self._create_rollup_tables(db)
         
         logger.info("All database tables created successfully")
     
+    async def _create_rollup_tables(self, db: aiosqlite.Connection):
+        # Dashboard rollups, maintained on write: customer actions and delivery outcomes per hour/day
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS action_rollups (
+                bucket_type TEXT NOT NULL,  -- 'hour' or 'day'
+                bucket_start TEXT NOT NULL,
+                action TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket_type, bucket_start, action)
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS outcome_rollups (
+                bucket_type TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                delayed INTEGER NOT NULL DEFAULT 0,
+                delay_hours_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket_type, bucket_start)
+            )
+        """)
+    
+    async def _add_missing_columns(self, db: aiosqlite.Connection, table: str, columns: Dict[str, str]):
+        """Add columns introduced after a table was first created"""
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in await cursor.fetchall()}
+        
+        for column, column_type in columns.items():
+            if column not in existing:
+                logger.info(f"Migrating {table}: adding column {column}")
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    
+    async def _backfill_rollups(self, db: aiosqlite.Connection):
+        """Build the rollup tables from the raw rows for databases created before rollups existed (run by initialize)"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM action_rollups)")
+        if not (await cursor.fetchone())[0]:
+            for bucket_type, bucket_format in ROLLUP_BUCKETS.items():
+                await db.execute("""
+                    INSERT INTO action_rollups (bucket_type, bucket_start, action, count)
+                    SELECT ?, strftime(?, timestamp), action, COUNT(*)
+                    FROM customer_actions
+                    GROUP BY 2, 3
+                """, (bucket_type, bucket_format))
+        
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM outcome_rollups)")
+        if not (await cursor.fetchone())[0]:
+            for bucket_type, bucket_format in ROLLUP_BUCKETS.items():
+                await db.execute("""
+                    INSERT INTO outcome_rollups (bucket_type, bucket_start, total, delayed, delay_hours_sum)
+                    SELECT ?, strftime(?, created_at), COUNT(*),
+                           SUM(CASE WHEN was_delayed THEN 1 ELSE 0 END), COALESCE(SUM(delay_hours), 0)
+                    FROM delivery_outcomes
+                    GROUP BY 2
+                """, (bucket_type, bucket_format))
+    
+    async def _roll_up_action(self, db: aiosqlite.Connection, action: str):
+        await db.executemany("""
+            INSERT INTO action_rollups (bucket_type, bucket_start, action, count)
+            VALUES (?, strftime(?, 'now'), ?, 1)
+            ON CONFLICT(bucket_type, bucket_start, action) DO UPDATE SET count = count + 1
+        """, [(bucket_type, bucket_format, action) for bucket_type, bucket_format in ROLLUP_BUCKETS.items()])
+    
+    async def _roll_up_outcome(self, db: aiosqlite.Connection, was_delayed: bool, delay_hours: float):
+        delayed = 1 if was_delayed else 0
+        await db.executemany("""
+            INSERT INTO outcome_rollups (bucket_type, bucket_start, total, delayed, delay_hours_sum)
+            VALUES (?, strftime(?, 'now'), 1, ?, ?)
+            ON CONFLICT(bucket_type, bucket_start) DO UPDATE SET
+                total = total + 1,
+                delayed = delayed + excluded.delayed,
+                delay_hours_sum = delay_hours_sum + excluded.delay_hours_sum
+        """, [(bucket_type, bucket_format, delayed, delay_hours) for bucket_type, bucket_format in ROLLUP_BUCKETS.items()])
+    
     async def _seed_initial_data(self, db: aiosqlite.Connection):
         """Seed database with realistic historical performance data"""
         logger.info("Seeding database with initial historical data")
@@ -233,21 +407,24 @@ class RiskDatabase:
             
             result = await cursor.fetchone()
             if result:
-                reliability, peak_drop, avg_delay = result
-                # Convert reliability (higher is better) to risk (lower is better)
-                base_risk = 100 - reliability
-                
-                # Add seasonal adjustment if we're in peak season
-                current_month = datetime.now().month
-                if current_month in [11, 12]:  # Holiday season
-                    base_risk += peak_drop
-                
-                logger.debug(f"Carrier {carrier} risk: base={base_risk}, reliability={reliability}")
-                return min(base_risk, 50)  # Cap at 50 points
+                return self._carrier_risk_from_row(carrier, *result)
             else:
                 logger.warning(f"No performance data found for carrier {carrier}, using default risk")
                 return 25  # Default risk for unknown carriers
     
+    @staticmethod
+    def _carrier_risk_from_row(carrier: str, reliability: float, peak_drop: float, avg_delay: float) -> int:
+        # Convert reliability (higher is better) to risk (lower is better)
+        base_risk = 100 - reliability
+        
+        # Add seasonal adjustment if we're in peak season
+        current_month = datetime.now().month
+        if current_month in [11, 12]:  # Holiday season
+            base_risk += peak_drop
+        
+        logger.debug(f"Carrier {carrier} risk: base={base_risk}, reliability={reliability}")
+        return min(base_risk, 50)  # Cap at 50 points
+    
     async def get_geographic_risk(self, zip_code: str) -> int:
         """Get risk score for a geographic area"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -259,14 +436,24 @@ class RiskDatabase:
             
             result = await cursor.fetchone()
             if result:
-                base_risk, traffic, weather_mult = result
-                total_risk = base_risk + (traffic * 0.3)  # Traffic adds up to 10 points
-                
-                logger.debug(f"Geographic risk for {zip_code}: base={base_risk}, traffic={traffic}, total={total_risk}")
-                return int(min(total_risk, 30))  # Cap at 30 points
-            else:
-                logger.warning(f"No geographic data for zip {zip_code}, using default risk")
-                return 10  # Default risk for unknown areas
+                return self._geographic_risk_from_row(zip_code, result[0], result[1])
+            return self._default_geographic_risk(zip_code)
+    
+    @staticmethod
+    def _default_geographic_risk(zip_code: str) -> int:
+        """Base risk from the ZIP reference dataset for zips without curated geographic data"""
+        reference = zip_reference.lookup(zip_code)
+        if reference is not None:
+            return min(reference.base_risk, 30)
+        logger.warning(f"No geographic data for zip {zip_code}, using default risk")
+        return 10  # Default risk for unknown areas
+    
+    @staticmethod
+    def _geographic_risk_from_row(zip_code: str, base_risk: float, traffic: float) -> int:
+        total_risk = base_risk + (traffic * 0.3)  # Traffic adds up to 10 points
+        
+        logger.debug(f"Geographic risk for {zip_code}: base={base_risk}, traffic={traffic}, total={total_risk}")
+        return int(min(total_risk, 30))  # Cap at 30 points
     
     async def get_delivery_performance_risk(self, carrier: str, zip_code: str) -> int:
         """Get specific carrier-zip combination risk based on historical data"""
@@ -279,66 +466,208 @@ class RiskDatabase:
             
             result = await cursor.fetchone()
             if result:
-                total, delayed, avg_delay = result
-                if total > 0:
-                    delay_rate = delayed / total
-                    # Convert delay rate to risk score (0-20 points)
-                    risk_score = int(delay_rate * 100)  # 10% delay rate = 10 points
-                    
-                    # Add delay severity factor
-                    if avg_delay > 8:  # More than 8 hours average delay
-                        risk_score += 5
-                    
-                    logger.debug(f"Performance risk for {carrier} to {zip_code}: delay_rate={delay_rate:.2%}, avg_delay={avg_delay}h, risk={risk_score}")
-                    return min(risk_score, 20)  # Cap at 20 points
+                return self._performance_risk_from_row(carrier, zip_code, *result)
             
             return 0  # No specific performance penalty if no data
     
+    @staticmethod
+    def _performance_risk_from_row(carrier: str, zip_code: str, total: int, delayed: int, avg_delay: float) -> int:
+        if not total:
+            return 0
+        delay_rate = delayed / total
+        # Convert delay rate to risk score (0-20 points)
+        risk_score = int(delay_rate * 100)  # 10% delay rate = 10 points
+        
+        # Add delay severity factor
+        if avg_delay > 8:  # More than 8 hours average delay
+            risk_score += 5
+        
+        logger.debug(f"Performance risk for {carrier} to {zip_code}: delay_rate={delay_rate:.2%}, avg_delay={avg_delay}h, risk={risk_score}")
+        return min(risk_score, 20)  # Cap at 20 points
+    
+    async def get_risk_matrix(self, carriers: Optional[List[str]] = None,
+                              zip_codes: Optional[List[str]] = None) -> Dict:
+        """
+        Carrier risk, geographic risk and carrier x zip delivery performance risk for the given
+        carriers and zips (all known ones when omitted), same scores as the per-pair lookups.
+        Cached until the next delivery outcome or re-initialization.
+        """
+        key = (
+            await self.get_data_version(), datetime.now().month,
+            tuple(sorted(set(carriers))) if carriers else None,
+            tuple(sorted(set(zip_codes))) if zip_codes else None
+        )
+        cached = self._matrix_cache.get(key)
+        if cached is not None:
+            self._matrix_cache.move_to_end(key)
+            return cached
+        
+        def in_filter(column: str, values: Optional[Tuple[str, ...]]) -> Tuple[str, Tuple[str, ...]]:
+            if not values:
+                return "1 = 1", ()
+            return f"{column} IN ({', '.join('?' * len(values))})", values
+        
+        carrier_filter, carrier_params = in_filter("carrier", key[2])
+        zip_filter, zip_params = in_filter("zip_code", key[3])
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f"""
+                SELECT carrier, zip_code, SUM(total_deliveries), SUM(delayed_deliveries), MAX(avg_delay_hours)
+                FROM delivery_performance
+                WHERE {carrier_filter} AND {zip_filter}
+                GROUP BY carrier, zip_code
+            """, carrier_params + zip_params)
+            performance_rows = await cursor.fetchall()
+            
+            cursor = await db.execute(f"""
+                SELECT carrier, reliability_score, peak_season_performance_drop, average_delay_hours
+                FROM carrier_performance WHERE {carrier_filter}
+            """, carrier_params)
+            carrier_rows = await cursor.fetchall()
+            
+            cursor = await db.execute(f"""
+                SELECT zip_code, base_risk_score, traffic_complexity
+                FROM geographic_risk WHERE {zip_filter}
+            """, zip_params)
+            zip_rows = await cursor.fetchall()
+        
+        carrier_list = list(key[2]) if key[2] else sorted({row[0] for row in carrier_rows} | {row[0] for row in performance_rows})
+        zip_list = list(key[3]) if key[3] else sorted({row[0] for row in zip_rows} | {row[1] for row in performance_rows})
+        
+        carrier_risk = {carrier: 25 for carrier in carrier_list}  # Defaults match the single lookups
+        carrier_risk.update({row[0]: self._carrier_risk_from_row(*row) for row in carrier_rows})
+        geographic_risk = {zip_code: self._default_geographic_risk(zip_code) for zip_code in zip_list}
+        geographic_risk.update({row[0]: self._geographic_risk_from_row(*row) for row in zip_rows})
+        performance_risk = {carrier: {zip_code: 0 for zip_code in zip_list} for carrier in carrier_list}
+        for carrier, zip_code, total, delayed, avg_delay in performance_rows:
+            performance_risk[carrier][zip_code] = self._performance_risk_from_row(carrier, zip_code, total, delayed, avg_delay)
+        
+        matrix = {
+            "carriers": carrier_list,
+            "zip_codes": zip_list,
+            "carrier_risk": carrier_risk,
+            "geographic_risk": geographic_risk,
+            "performance_risk": performance_risk
+        }
+        self._matrix_cache[key] = matrix
+        while len(self._matrix_cache) > self.matrix_cache_size:
+            self._matrix_cache.popitem(last=False)
+        return matrix
+    
+    async def get_route_distances(self, origin_zip: str, destination_zips: List[str]) -> Dict[str, int]:
+        """Known route distances in miles from origin_zip, for the destinations that have one"""
+        distances = {}
+        async with aiosqlite.connect(self.db_path) as db:
+            for start in range(0, len(destination_zips), 500):
+                chunk = destination_zips[start:start + 500]
+                cursor = await db.execute(f"""
+                    SELECT destination_zip, MIN(distance_miles)
+                    FROM route_performance
+                    WHERE origin_zip = ? AND destination_zip IN ({', '.join('?' * len(chunk))})
+                      AND distance_miles IS NOT NULL
+                    GROUP BY destination_zip
+                """, [origin_zip, *chunk])
+                distances.update({row[0]: row[1] for row in await cursor.fetchall()})
+        return distances
+    
+    async def record_route_distances(self, routes: List[Tuple[str, str, int]]):
+        """Store computed (origin_zip, destination_zip, miles) distances; carrier '' means any carrier"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                INSERT INTO route_performance (origin_zip, destination_zip, carrier, distance_miles, typical_transit_days)
+                VALUES (?, ?, '', ?, ?)
+                ON CONFLICT(origin_zip, destination_zip, carrier) DO UPDATE SET
+                    distance_miles = COALESCE(route_performance.distance_miles, excluded.distance_miles),
+                    typical_transit_days = COALESCE(route_performance.typical_transit_days, excluded.typical_transit_days)
+            """, [
+                # Ground transit covers roughly 500 miles a day
+                (origin_zip, destination_zip, miles, 1 + miles // 500)
+                for origin_zip, destination_zip, miles in routes
+            ])
+            await db.commit()
+    
+    async def get_data_version(self) -> Tuple[int, int]:
+        """
+        Version of the data feeding risk factors: changes when this process re-seeds or any
+        process records a delivery outcome. Checked against the database at most every
+        version_check_seconds, so other processes' outcomes are picked up within that time.
+        """
+        now = time.monotonic()
+        if now - self._outcome_version_checked_at >= self.version_check_seconds:
+            try:
+                async with aiosqlite.connect(self.db_path) as db:
+                    cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM delivery_outcomes")
+                    self._outcome_version = (await cursor.fetchone())[0]
+            except aiosqlite.Error as e:
+                logger.warning(f"Could not read the risk data version: {str(e)}")
+            self._outcome_version_checked_at = now
+        return self.data_version, self._outcome_version
+    
+    async def _get_temporal_patterns(self) -> Dict[Tuple[str, str], Tuple[float, str]]:
+        if self._temporal_patterns is None:
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute("""
+                    SELECT pattern_type, pattern_value, risk_multiplier, description
+                    FROM temporal_risk
+                """)
+                self._temporal_patterns = {(row[0], row[1]): (row[2], row[3]) for row in await cursor.fetchall()}
+        return self._temporal_patterns
+    
     async def get_temporal_risk(self, delivery_date: str) -> Tuple[int, List[str]]:
         """Get time-based risk factors"""
-        try:
-            date_obj = datetime.strptime(delivery_date, "%Y-%m-%d")
-        except ValueError:
+        day = delivery_calendar.day(delivery_date)
+        if day is None:
             return 0, []
         
+        cached = self._temporal_cache.get(day.iso)
+        if cached is not None:
+            self._temporal_cache.move_to_end(day.iso)
+            return cached[0], list(cached[1])
+        
+        patterns = await self._get_temporal_patterns()
         risk_score = 0
         reasons = []
         
-        async with aiosqlite.connect(self.db_path) as db:
-            # Check day of week
-            day_name = date_obj.strftime("%A").lower()
-            cursor = await db.execute("""
-                SELECT risk_multiplier, description
-                FROM temporal_risk 
-                WHERE pattern_type = 'day_of_week' AND pattern_value = ?
-            """, (day_name,))
-            
-            day_result = await cursor.fetchone()
-            if day_result:
-                multiplier, description = day_result
-                if multiplier > 1.0:
-                    additional_risk = int((multiplier - 1.0) * 20)  # Convert multiplier to points
-                    risk_score += additional_risk
-                    reasons.append(description)
-            
-            # Check month
-            month_name = date_obj.strftime("%B").lower()
-            cursor = await db.execute("""
-                SELECT risk_multiplier, description
-                FROM temporal_risk 
-                WHERE pattern_type = 'month' AND pattern_value = ?
-            """, (month_name,))
-            
-            month_result = await cursor.fetchone()
-            if month_result:
-                multiplier, description = month_result
+        # Check day of week
+        day_result = patterns.get(("day_of_week", day.day_name))
+        if day_result:
+            multiplier, description = day_result
+            if multiplier > 1.0:
+                additional_risk = int((multiplier - 1.0) * 20)  # Convert multiplier to points
+                risk_score += additional_risk
+                reasons.append(description)
+        
+        # Check month
+        month_result = patterns.get(("month", day.month_name))
+        if month_result:
+            multiplier, description = month_result
+            if multiplier > 1.0:
+                additional_risk = int((multiplier - 1.0) * 25)  # Seasonal impact is higher
+                risk_score += additional_risk
+                reasons.append(description)
+        
+        # Check peak holiday weeks
+        for period, active in (("christmas_week", day.christmas_week), ("thanksgiving_week", day.thanksgiving_week)):
+            period_result = patterns.get(("holiday_period", period)) if active else None
+            if period_result:
+                multiplier, description = period_result
                 if multiplier > 1.0:
-                    additional_risk = int((multiplier - 1.0) * 25)  # Seasonal impact is higher
+                    additional_risk = int((multiplier - 1.0) * 25)
                     risk_score += additional_risk
                     reasons.append(description)
         
+        # Deliveries due on a carrier holiday slip to the next delivery day
+        if day.holiday and not day.delivery_day:
+            risk_score += 10
+            reasons.append(f"{day.holiday} - carriers do not deliver")
+        
+        risk_score = min(risk_score, 25)
+        self._temporal_cache[day.iso] = (risk_score, tuple(reasons))
+        while len(self._temporal_cache) > self.temporal_cache_size:
+            self._temporal_cache.popitem(last=False)
+        
         logger.debug(f"Temporal risk for {delivery_date}: {risk_score} points, reasons: {reasons}")
-        return min(risk_score, 25), reasons
+        return risk_score, reasons
     
     async def record_delivery_outcome(self, package_id: str, carrier: str, 
                                     origin_zip: str, destination_zip: str,
@@ -362,12 +691,14 @@ class RiskDatabase:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (package_id, carrier, origin_zip, destination_zip, scheduled_date,
                       actual_date, was_delayed, delay_hours, json.dumps(delay_reasons or [])))
+                await self._roll_up_outcome(db, was_delayed, delay_hours)
                 
-                await db.commit()
-                
-                # Update aggregated performance data
+                # Update aggregated performance data in the same transaction, so a process that
+                # sees the new outcome also sees the metrics it changed
                 await self._update_performance_metrics(db, carrier, destination_zip, 
                                                      was_delayed, delay_hours)
+                await db.commit()
+            self.data_version += 1
             
             logger.info(f"Recorded outcome: delayed={was_delayed}, delay_hours={delay_hours:.1f}")
             
@@ -391,8 +722,6 @@ class RiskDatabase:
                 last_updated = CURRENT_TIMESTAMP
         """, (carrier, zip_code, 1 if was_delayed else 0, delay_hours,
               1 if was_delayed else 0, delay_hours))
-        
-        await db.commit()
     
     async def record_customer_action(self, package_id: str, action: str, 
                                    customer_id: str = None, notes: str = None) -> Dict:
@@ -406,6 +735,7 @@ class RiskDatabase:
             """, (package_id, action, customer_id, notes))
             
             action_id = cursor.lastrowid
+            await self._roll_up_action(db, action)
             await db.commit()
             
             logger.info(f"Customer action recorded with ID: {action_id}")
@@ -446,46 +776,389 @@ class RiskDatabase:
                 for action in actions
             ]
     
+    async def claim_customer_actions(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        Claim up to limit pending actions, oldest first, for lease_seconds. Claims that expire
+        without being completed (e.g. the worker died) are handed out again.
+        """
+        now = time.time()
+        async with aiosqlite.connect(self.db_path) as db:
+            # Take the write lock up front so two workers never claim the same rows
+            await db.execute("BEGIN IMMEDIATE")
+            cursor = await db.execute("""
+                SELECT id, package_id, action, customer_id, notes, timestamp, attempts
+                FROM customer_actions
+                WHERE processed = 0 AND (claimed_until IS NULL OR claimed_until <= ?)
+                ORDER BY timestamp, id
+                LIMIT ?
+            """, (now, limit))
+            rows = await cursor.fetchall()
+            await db.executemany(
+                "UPDATE customer_actions SET claimed_until = ?, attempts = COALESCE(attempts, 0) + 1 WHERE id = ?",
+                [(now + lease_seconds, row[0]) for row in rows]
+            )
+            await db.commit()
+        
+        return [
+            {
+                "id": row[0],
+                "package_id": row[1],
+                "action": row[2],
+                "customer_id": row[3],
+                "notes": row[4],
+                "timestamp": row[5],
+                "attempts": (row[6] or 0) + 1
+            }
+            for row in rows
+        ]
+    
+    async def complete_customer_actions(self, results: List[Tuple[int, str]]):
+        """Mark claimed actions processed with their (id, processing_notes)"""
+        if not results:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                UPDATE customer_actions
+                SET processed = 1, processing_notes = ?, processed_at = CURRENT_TIMESTAMP, claimed_until = NULL
+                WHERE id = ?
+            """, [(notes, action_id) for action_id, notes in results])
+            await db.commit()
+    
+    async def retry_customer_actions(self, failures: List[Tuple[int, str]], retry_after_seconds: float):
+        """Give failed (id, error) claims back to the queue after a delay"""
+        if not failures:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "UPDATE customer_actions SET processing_notes = ?, claimed_until = ? WHERE id = ?",
+                [(error, time.time() + retry_after_seconds, action_id) for action_id, error in failures]
+            )
+            await db.commit()
+    
+    async def record_email_dead_letter(self, recipients: List[str], subject: str, payload: Dict,
+                                       attempts: int, last_status: Optional[int], last_error: Optional[str]) -> int:
+        """Store an undeliverable email for inspection and replay"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO email_dead_letters (recipients, subject, payload, attempts, last_status, last_error)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (json.dumps(recipients), subject, json.dumps(payload), attempts, last_status, last_error))
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def get_email_dead_letters(self, limit: int = 50) -> List[Dict]:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT id, recipients, subject, attempts, last_status, last_error, created_at
+                FROM email_dead_letters 
+                ORDER BY id DESC 
+                LIMIT ?
+            """, (limit,))
+            rows = await cursor.fetchall()
+        
+        return [
+            {
+                "id": row[0],
+                "recipients": json.loads(row[1]),
+                "subject": row[2],
+                "attempts": row[3],
+                "last_status": row[4],
+                "last_error": row[5],
+                "created_at": row[6]
+            }
+            for row in rows
+        ]
+    
+    async def claim_alert(self, package_id: str, recipient: str, sent_at: float, window_seconds: float) -> bool:
+        """
+        Record an alert unless one went to the same recipient for the same package within
+        window_seconds; False means the alert is suppressed
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO alert_ledger (package_id, recipient, sent_at) VALUES (?, ?, ?)
+                ON CONFLICT(package_id, recipient) DO UPDATE SET
+                    sent_at = excluded.sent_at,
+                    alert_count = alert_count + 1
+                WHERE alert_ledger.sent_at <= ?
+            """, (package_id, recipient, sent_at, sent_at - window_seconds))
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def get_alert_sent_at(self, package_id: str, recipient: str) -> Optional[float]:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT sent_at FROM alert_ledger WHERE package_id = ? AND recipient = ?",
+                (package_id, recipient)
+            )
+            row = await cursor.fetchone()
+        return row[0] if row else None
+    
+    async def release_alert(self, package_id: str, recipient: str, sent_at: float):
+        """Undo a claim whose email was never sent, so the alert can be retried"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE alert_ledger SET sent_at = 0, alert_count = alert_count - 1
+                WHERE package_id = ? AND recipient = ? AND sent_at = ?
+            """, (package_id, recipient, sent_at))
+            await db.commit()
+    
     async def get_customer_action_stats(self) -> Dict:
-        """Get customer action statistics"""
+        """Get customer action statistics (from the action rollups)"""
         async with aiosqlite.connect(self.db_path) as db:
             # Get action counts by type
             cursor = await db.execute("""
-                SELECT action, COUNT(*) as count
-                FROM customer_actions
+                SELECT action, SUM(count) as count
+                FROM action_rollups
+                WHERE bucket_type = 'day'
                 GROUP BY action
                 ORDER BY count DESC
             """)
             action_counts = await cursor.fetchall()
+            total = sum(ac[1] for ac in action_counts)
             
-            # Get recent activity (last 7 days)
+            # Get recent activity (last 7 days, to the hour)
             cursor = await db.execute("""
-                SELECT COUNT(*) as total_actions
-                FROM customer_actions
-                WHERE timestamp > datetime('now', '-7 days')
+                SELECT COALESCE(SUM(count), 0)
+                FROM action_rollups
+                WHERE bucket_type = 'hour' AND bucket_start >= strftime('%Y-%m-%d %H:00:00', 'now', '-7 days')
             """)
             recent_activity = await cursor.fetchone()
             
-            # Get processing status
-            cursor = await db.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN processed THEN 1 ELSE 0 END) as processed,
-                    SUM(CASE WHEN NOT processed THEN 1 ELSE 0 END) as pending
-                FROM customer_actions
-            """)
-            processing_stats = await cursor.fetchone()
+            # Pending count comes from the (processed, timestamp) index
+            cursor = await db.execute("SELECT COUNT(*) FROM customer_actions WHERE processed = 0")
+            pending = (await cursor.fetchone())[0]
             
             return {
                 "action_breakdown": [{"action": ac[0], "count": ac[1]} for ac in action_counts],
                 "recent_activity": recent_activity[0] if recent_activity else 0,
                 "processing_stats": {
-                    "total": processing_stats[0] if processing_stats else 0,
-                    "processed": processing_stats[1] if processing_stats else 0,
-                    "pending": processing_stats[2] if processing_stats else 0
+                    "total": total,
+                    "processed": total - pending,
+                    "pending": pending
                 }
             }
 
+    async def upsert_packages(self, packages: List[Dict]) -> int:
+        """Insert or update packages in one transaction"""
+        if not packages:
+            return 0
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                INSERT INTO packages 
+                (package_id, destination_zip, destination_city, carrier, expected_delivery_date, origin_zip)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(package_id) DO UPDATE SET
+                    -- Changed scoring inputs invalidate the stored score
+                    risk_score = CASE WHEN destination_zip = excluded.destination_zip
+                                       AND destination_city = excluded.destination_city
+                                       AND carrier = excluded.carrier
+                                       AND expected_delivery_date = excluded.expected_delivery_date
+                                       AND origin_zip IS excluded.origin_zip
+                                  THEN risk_score ELSE NULL END,
+                    destination_zip = excluded.destination_zip,
+                    destination_city = excluded.destination_city,
+                    carrier = excluded.carrier,
+                    expected_delivery_date = excluded.expected_delivery_date,
+                    origin_zip = excluded.origin_zip,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [
+                (p["package_id"], p["destination_zip"], p["destination_city"],
+                 p["carrier"], p["expected_delivery_date"], p.get("origin_zip"))
+                for p in packages
+            ])
+            await db.commit()
+        
+        logger.info(f"Upserted {len(packages)} packages")
+        return len(packages)
+    
+    async def get_package(self, package_id: str) -> Optional[Dict]:
+        """Get a single package by primary key"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT package_id, destination_zip, destination_city, carrier, expected_delivery_date, origin_zip
+                FROM packages 
+                WHERE package_id = ?
+            """, (package_id,))
+            
+            row = await cursor.fetchone()
+            return self._package_row_to_dict(row) if row else None
+    
+    async def iter_packages(self, batch_size: int = 10000) -> AsyncIterator[List[Dict]]:
+        """Yield all packages in primary-key order, one batch at a time"""
+        last_package_id = ""
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                cursor = await db.execute("""
+                    SELECT package_id, destination_zip, destination_city, carrier, expected_delivery_date, origin_zip
+                    FROM packages 
+                    WHERE package_id > ?
+                    ORDER BY package_id
+                    LIMIT ?
+                """, (last_package_id, batch_size))
+                
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                
+                yield [self._package_row_to_dict(row) for row in rows]
+                last_package_id = rows[-1][0]
+    
+    async def record_risk_scores(self, scores: List[Tuple[str, int, List[str], Dict[str, int]]]) -> int:
+        """
+        Store (package_id, risk_score, reasons, factors) results in package_risk_scores and packages.
+        Only rows whose score, reasons or factors changed get a new change sequence number.
+        Returns the number of changed rows.
+        """
+        if not scores:
+            return 0
+        
+        rows = [
+            (package_id, risk_score, json.dumps(reasons), json.dumps(factors, sort_keys=True))
+            for package_id, risk_score, reasons, factors in scores
+        ]
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            # Take the write lock up front so sequence numbers are handed out in commit order
+            await db.execute("BEGIN IMMEDIATE")
+            changes_before = db.total_changes
+            await db.executemany("""
+                INSERT INTO package_risk_scores 
+                (package_id, risk_score, risk_reasons, factors, computed_at, change_seq)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP,
+                        (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM package_risk_scores))
+                ON CONFLICT(package_id) DO UPDATE SET
+                    risk_score = excluded.risk_score,
+                    risk_reasons = excluded.risk_reasons,
+                    factors = excluded.factors,
+                    computed_at = excluded.computed_at,
+                    change_seq = excluded.change_seq
+                WHERE package_risk_scores.risk_score != excluded.risk_score
+                   OR package_risk_scores.risk_reasons != excluded.risk_reasons
+                   OR package_risk_scores.factors != excluded.factors
+            """, rows)
+            changed = db.total_changes - changes_before
+            
+            await db.executemany("""
+                UPDATE packages 
+                SET risk_score = ?, risk_reasons = ?, scored_at = CURRENT_TIMESTAMP
+                WHERE package_id = ?
+            """, [(risk_score, reasons, package_id) for package_id, risk_score, reasons, _ in rows])
+            await db.commit()
+        
+        logger.debug(f"Stored {len(scores)} package risk scores ({changed} changed)")
+        return changed
+    
+    async def get_risk_score_changes(self, since_seq: int = 0, limit: int = 500) -> List[Dict]:
+        """Current scores changed after the given sequence number, oldest change first"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT package_id, risk_score, risk_reasons, factors, computed_at, change_seq
+                FROM package_risk_scores 
+                WHERE change_seq > ?
+                ORDER BY change_seq
+                LIMIT ?
+            """, (since_seq, limit))
+            rows = await cursor.fetchall()
+        
+        return [
+            {
+                "package_id": row[0],
+                "risk_score": row[1],
+                "reasons": json.loads(row[2]),
+                "factors": json.loads(row[3]),
+                "computed_at": row[4],
+                "seq": row[5]
+            }
+            for row in rows
+        ]
+    
+    async def get_latest_risk_score_seq(self) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT COALESCE(MAX(change_seq), 0) FROM package_risk_scores")
+            return (await cursor.fetchone())[0]
+    
+    async def query_packages(self, limit: int, sort_by: str = "package_id",
+                             after: Optional[Tuple] = None, carrier: Optional[str] = None,
+                             zip_prefix: Optional[str] = None, date_from: Optional[str] = None,
+                             date_to: Optional[str] = None, min_risk: Optional[int] = None) -> List[Dict]:
+        """
+        One indexed range query over stored packages.
+        sort_by 'package_id' pages by primary key (after = (package_id,));
+        sort_by 'risk' pages by risk_score DESC, package_id (after = (risk_score, package_id)),
+        with not-yet-scored packages last (after = (None, package_id) once in that tail).
+        """
+        conditions = []
+        params: List = []
+        
+        if carrier:
+            conditions.append("carrier = ?")
+            params.append(carrier)
+        if zip_prefix:
+            # Range scan instead of LIKE so the zip index is usable
+            conditions.append("destination_zip >= ? AND destination_zip < ?")
+            params.extend([zip_prefix, zip_prefix[:-1] + chr(ord(zip_prefix[-1]) + 1)])
+        if date_from:
+            conditions.append("expected_delivery_date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("expected_delivery_date <= ?")
+            params.append(date_to)
+        if min_risk is not None:
+            conditions.append("risk_score >= ?")
+            params.append(min_risk)
+        
+        if sort_by == "risk":
+            # SQLite sorts NULL lowest, so unscored packages come after every scored one
+            if after and after[0] is None:
+                conditions.append("risk_score IS NULL AND package_id > ?")
+                params.append(after[1])
+            elif after:
+                conditions.append("(risk_score < ? OR (risk_score = ? AND package_id > ?) OR risk_score IS NULL)")
+                params.extend([after[0], after[0], after[1]])
+            order_by = "risk_score DESC, package_id"
+        else:
+            if after:
+                conditions.append("package_id > ?")
+                params.append(after[0])
+            order_by = "package_id"
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f"""
+                SELECT package_id, destination_zip, destination_city, carrier, expected_delivery_date,
+                       origin_zip, risk_score, risk_reasons
+                FROM packages 
+                {where}
+                ORDER BY {order_by}
+                LIMIT ?
+            """, params)
+            rows = await cursor.fetchall()
+        
+        return [
+            {
+                **self._package_row_to_dict(row),
+                "risk_score": row[6],
+                "reasons": json.loads(row[7]) if row[7] else None
+            }
+            for row in rows
+        ]
+    
+    @staticmethod
+    def _package_row_to_dict(row: Tuple) -> Dict:
+        return {
+            "package_id": row[0],
+            "destination_zip": row[1],
+            "destination_city": row[2],
+            "carrier": row[3],
+            "expected_delivery_date": row[4],
+            "origin_zip": row[5]
+        }
+    
     async def get_performance_stats(self) -> Dict:
         """Get overall performance statistics for dashboard"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -505,13 +1178,11 @@ class RiskDatabase:
             """)
             locations = await cursor.fetchall()
             
-            # Get recent outcomes
+            # Get recent outcomes (last 30 days, to the hour)
             cursor = await db.execute("""
-                SELECT COUNT(*) as total, 
-                       SUM(CASE WHEN was_delayed THEN 1 ELSE 0 END) as delayed,
-                       AVG(delay_hours) as avg_delay
-                FROM delivery_outcomes 
-                WHERE created_at > datetime('now', '-30 days')
+                SELECT SUM(total), SUM(delayed), SUM(delay_hours_sum) / SUM(total)
+                FROM outcome_rollups 
+                WHERE bucket_type = 'hour' AND bucket_start >= strftime('%Y-%m-%d %H:00:00', 'now', '-30 days')
             """)
             recent_stats = await cursor.fetchone()
             
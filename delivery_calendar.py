@@ -0,0 +1,200 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+import calendar
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = [name.lower() for name in calendar.day_name]
+MONTH_NAMES = [""] + [name.lower() for name in calendar.month_name[1:]]
+
+
+class DayInfo(NamedTuple):
+    iso: str  # YYYY-MM-DD
+    ordinal: int
+    weekday: int  # Monday == 0
+    day_name: str  # 'monday'
+    month_name: str  # 'december'
+    christmas_week: bool
+    thanksgiving_week: bool
+    holiday: Optional[str]  # observed federal or carrier holiday name
+    delivery_day: bool  # False on Sundays and carrier holidays
+
+
+class Holiday(NamedTuple):
+    name: str
+    federal: bool  # federal holiday (USPS closed)
+    carrier: bool  # UPS, FedEx, USPS and DHL all closed
+
+
+class YearHolidays(NamedTuple):
+    holidays: Dict[date, Holiday]  # keyed by observed date
+    christmas: date
+    thanksgiving: date
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday of a month (n=-1 for the last one)"""
+    if n < 0:
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        return last - timedelta(days=(last.weekday() - weekday) % 7)
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def thanksgiving(year: int) -> date:
+    """US Thanksgiving: fourth Thursday of November"""
+    return nth_weekday(year, 11, calendar.THURSDAY, 4)
+
+
+def observed(day: date) -> date:
+    """Federal observance: Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == calendar.SATURDAY:
+        return day - timedelta(days=1)
+    if day.weekday() == calendar.SUNDAY:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays_for_year(year: int) -> YearHolidays:
+    """US federal and carrier holidays for a year (computed once per year)"""
+    thanksgiving_day = thanksgiving(year)
+    fixed = [
+        (observed(date(year, 1, 1)), Holiday("New Year's Day", True, True)),
+        (nth_weekday(year, 1, calendar.MONDAY, 3), Holiday("Martin Luther King Jr. Day", True, False)),
+        (nth_weekday(year, 2, calendar.MONDAY, 3), Holiday("Presidents' Day", True, False)),
+        (nth_weekday(year, 5, calendar.MONDAY, -1), Holiday("Memorial Day", True, True)),
+        (observed(date(year, 6, 19)), Holiday("Juneteenth", True, False)),
+        (observed(date(year, 7, 4)), Holiday("Independence Day", True, True)),
+        (nth_weekday(year, 9, calendar.MONDAY, 1), Holiday("Labor Day", True, True)),
+        (nth_weekday(year, 10, calendar.MONDAY, 2), Holiday("Columbus Day", True, False)),
+        (observed(date(year, 11, 11)), Holiday("Veterans Day", True, False)),
+        (thanksgiving_day, Holiday("Thanksgiving Day", True, True)),
+        (observed(date(year, 12, 25)), Holiday("Christmas Day", True, True)),
+    ]
+    holidays = {day: holiday for day, holiday in fixed if day.year == year}
+    # New Year's Day on a Saturday is observed on December 31 of the year before
+    next_new_year = observed(date(year + 1, 1, 1))
+    if next_new_year.year == year:
+        holidays[next_new_year] = Holiday("New Year's Day", True, True)
+    return YearHolidays(holidays, date(year, 12, 25), thanksgiving_day)
+
+
+def _same_week(day: date, anchor: date) -> bool:
+    """Monday-Sunday week containing the anchor date"""
+    return 0 <= day.toordinal() - (anchor.toordinal() - anchor.weekday()) < 7
+
+
+def _day_info(day: date) -> DayInfo:
+    year = holidays_for_year(day.year)
+    holiday = year.holidays.get(day)
+    return DayInfo(
+        iso=day.isoformat(),
+        ordinal=day.toordinal(),
+        weekday=day.weekday(),
+        day_name=DAY_NAMES[day.weekday()],
+        month_name=MONTH_NAMES[day.month],
+        christmas_week=_same_week(day, year.christmas),
+        thanksgiving_week=_same_week(day, year.thanksgiving),
+        holiday=holiday.name if holiday else None,
+        delivery_day=day.weekday() != calendar.SUNDAY and not (holiday and holiday.carrier)
+    )
+
+
+@lru_cache(maxsize=16384)
+def parse_iso_datetime(value: str) -> Optional[datetime]:
+    """Memoized datetime.fromisoformat that also accepts a trailing 'Z'; None if unparseable"""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class DeliveryCalendar:
+    """
+    Precomputed day table for a rolling window around today (weekday, month, holidays,
+    peak weeks, next delivery day), indexed both by ISO date string and by ordinal. Date factors for delivery dates become
+    one dict lookup instead of strptime/strftime per package; dates outside the window are
+    computed on demand and memoized. The window is rebuilt when the day rolls over.
+    """
+
+    def __init__(self, window_days: int = 730, overflow_cache_size: int = 16384):
+        self.window_days = window_days
+        self._by_iso: Dict[str, DayInfo] = {}
+        self._by_ordinal: List[DayInfo] = []
+        self._next_delivery: List[Optional[int]] = []
+        self._first_ordinal = 0
+        self._built_for: Optional[date] = None
+        self._overflow = lru_cache(maxsize=overflow_cache_size)(self._parse_outside_window)
+        self._build(date.today())
+
+    def _build(self, today: date):
+        first = today - timedelta(days=self.window_days)
+        self._by_ordinal = [_day_info(first + timedelta(days=offset)) for offset in range(2 * self.window_days + 1)]
+        self._by_iso = {day.iso: day for day in self._by_ordinal}
+        # Ordinal of the first delivery day on or after each day (None past the last one)
+        self._next_delivery = []
+        following = None
+        for day in reversed(self._by_ordinal):
+            following = day.ordinal if day.delivery_day else following
+            self._next_delivery.append(following)
+        self._next_delivery.reverse()
+        self._first_ordinal = first.toordinal()
+        self._built_for = today
+        logger.info(f"Delivery calendar built: {len(self._by_ordinal)} days from {self._by_ordinal[0].iso} to {self._by_ordinal[-1].iso}")
+
+    def _refresh(self) -> date:
+        today = date.today()
+        if today != self._built_for:
+            self._build(today)
+        return today
+
+    @staticmethod
+    def _parse_outside_window(value: str) -> Optional[DayInfo]:
+        try:
+            return _day_info(datetime.strptime(value, "%Y-%m-%d").date())
+        except (TypeError, ValueError):
+            return None
+
+    def day(self, value: str) -> Optional[DayInfo]:
+        """Day info for a YYYY-MM-DD string, None if it isn't a valid date"""
+        info = self._by_iso.get(value)
+        if info is not None:
+            return info
+        self._refresh()
+        return self._by_iso.get(value) or self._overflow(value)
+
+    def from_ordinal(self, ordinal: int) -> DayInfo:
+        index = ordinal - self._first_ordinal
+        if 0 <= index < len(self._by_ordinal):
+            return self._by_ordinal[index]
+        return _day_info(date.fromordinal(ordinal))
+
+    def shift(self, day: DayInfo, days: int) -> DayInfo:
+        return self.from_ordinal(day.ordinal + days)
+
+    def next_delivery_day(self, day: DayInfo) -> DayInfo:
+        """The day itself if carriers deliver on it, otherwise the next day they do"""
+        index = day.ordinal - self._first_ordinal
+        if 0 <= index < len(self._next_delivery) and self._next_delivery[index] is not None:
+            return self._by_ordinal[self._next_delivery[index] - self._first_ordinal]
+        while not day.delivery_day:
+            day = self.shift(day, 1)
+        return day
+
+    def today(self) -> DayInfo:
+        return self.from_ordinal(self._refresh().toordinal())
+
+    def days_from_today(self, day: DayInfo) -> int:
+        return day.ordinal - self._refresh().toordinal()
+
+    def day_of_datetime(self, value: str) -> Optional[DayInfo]:
+        """Calendar day of an ISO datetime string (in its own offset), None if unparseable"""
+        parsed = parse_iso_datetime(value)
+        return self.from_ordinal(parsed.toordinal()) if parsed is not None else None
+
+
+# Global delivery calendar instance
+delivery_calendar = DeliveryCalendar()
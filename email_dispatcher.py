@@ -0,0 +1,162 @@
+from database import RiskDatabase
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher:
+    """
+    Non-blocking SendGrid delivery: messages are queued and sent by a pool of worker tasks
+    over an async HTTP client. Transient failures (network errors, 429, 5xx) are retried
+    with exponential backoff; permanent failures and exhausted retries go to the
+    email_dead_letters table (and run the message's on_dead_letter callback, if any).
+    """
+
+    SEND_PATH = "/v3/mail/send"
+
+    def __init__(self, api_key: str, db: RiskDatabase, base_url: str = "https://api.sendgrid.com",
+                 workers: int = 4, max_attempts: int = 5, backoff_base_seconds: float = 1.0,
+                 max_backoff_seconds: float = 60.0, queue_size: int = 1000,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_key = api_key
+        self.db = db
+        self.base_url = base_url.rstrip("/")
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.queue_size = queue_size
+        self._transport = transport
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self.sent = 0
+        self.dead_lettered = 0
+        logger.info(f"EmailDispatcher initialized ({workers} workers, {max_attempts} attempts, endpoint: {self.base_url}{self.SEND_PATH})")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(10.0),
+                transport=self._transport
+            )
+
+    def start(self):
+        """Start the worker pool on the running event loop"""
+        if self.running:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._ensure_client()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"Started {self.worker_count} email workers")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Give queued messages a chance to go out, then stop the workers"""
+        if not self.running:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping email workers with {self.pending} messages still queued")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self._client.aclose()
+        self._client = None
+        logger.info("Email workers stopped")
+
+    def enqueue(self, message: Dict[str, Any],
+                on_dead_letter: Optional[Callable[[], Awaitable[None]]] = None) -> bool:
+        """Queue a SendGrid v3 mail/send payload; False if the queue is full"""
+        self.start()
+        try:
+            self._queue.put_nowait((message, on_dead_letter))
+        except asyncio.QueueFull:
+            logger.error(f"Email queue full ({self.queue_size}) - rejecting message")
+            return False
+        logger.info(f"Queued email '{message.get('subject')}' ({self.pending} pending)")
+        return True
+
+    async def join(self):
+        """Wait until every queued message has been sent or dead-lettered"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            message, on_dead_letter = await self._queue.get()
+            try:
+                if not await self.deliver(message) and on_dead_letter is not None:
+                    await on_dead_letter()
+            except Exception as e:
+                logger.error(f"Email worker {worker_id} failed unexpectedly: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff_seconds)
+        return min(self.backoff_base_seconds * (2 ** (attempt - 1)), self.max_backoff_seconds)
+
+    async def deliver(self, message: Dict[str, Any]) -> bool:
+        """Send one payload now with retries; False if it ended up dead-lettered"""
+        self._ensure_client()
+        recipients = [to["email"] for p in message.get("personalizations", []) for to in p.get("to", [])]
+        status_code = None
+        error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            retry_after = None
+            try:
+                response = await self._client.post(self.SEND_PATH, json=message)
+                status_code = response.status_code
+                if response.is_success:
+                    self.sent += 1
+                    logger.info(f"SendGrid accepted email to {len(recipients)} recipients (status {status_code}, attempt {attempt})")
+                    return True
+                error = response.text[:500]
+                if status_code != 429 and status_code < 500:
+                    # Bad request / auth problem - retrying won't help
+                    logger.error(f"SendGrid rejected email (status {status_code}): {error}")
+                    break
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+                status_code = None
+
+            if attempt < self.max_attempts:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"SendGrid send failed (status {status_code}, attempt {attempt}/{self.max_attempts}) - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.dead_lettered += 1
+        logger.error(f"Dead-lettering email to {recipients} after {attempt} attempts (status {status_code})")
+        await self.db.record_email_dead_letter(
+            recipients=recipients,
+            subject=message.get("subject", ""),
+            payload=message,
+            attempts=attempt,
+            last_status=status_code,
+            last_error=error
+        )
+        return False
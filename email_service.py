@@ -1,169 +1,143 @@
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 from models import Package, EnrichedPackage
-from typing import Optional
+from database import risk_db
+from email_dispatcher import EmailDispatcher
+from email_templates import AlertEmailRenderer
+from typing import Awaitable, Callable, Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Recipient used when a request doesn't name one
+DEFAULT_RECIPIENT = "customer@example.com"
+
 
 class EmailService:
     def __init__(self):
         self.api_key = os.getenv("SENDGRID_API_KEY")
         self.from_email = os.getenv("FROM_EMAIL", "noreply@shipstation.com")
         self.mock_mode = self.api_key is None or self.api_key == "mock_api_key"
+        self.templates = AlertEmailRenderer()
+        # Bulk sends share one tagged body, rendered once
+        self._bulk_content = self.templates.render_tagged()
         
         if self.mock_mode:
             logger.info("EmailService initialized in MOCK MODE (no SendGrid API key)")
         else:
             logger.info(f"EmailService initialized with SendGrid API key: {self.api_key[:8] if self.api_key else 'None'}...")
             logger.info(f"From email: {self.from_email}")
-            self.sg = SendGridAPIClient(api_key=self.api_key)
+            self.dispatcher = EmailDispatcher(
+                self.api_key,
+                risk_db,
+                base_url=os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com"),
+                workers=int(os.getenv("EMAIL_WORKERS", "4")),
+                max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "5")),
+                queue_size=int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+            )
     
     async def send_delay_alert(
         self, 
         enriched_package: EnrichedPackage, 
-        customer_email: Optional[str] = None
+        customer_email: Optional[str] = None,
+        on_failure: Optional[Callable[[], Awaitable[None]]] = None
     ) -> dict:
-        """Send delay alert email to customer"""
+        """Send delay alert email to customer; on_failure runs if a queued email is dead-lettered later"""
         
         logger.info(f"Preparing delay alert email for package {enriched_package.package_id}")
         logger.info(f"Package risk score: {enriched_package.risk_score}, reasons: {enriched_package.reasons}")
         
         # Use mock email if none provided
-        recipient_email = customer_email or "customer@example.com"
+        recipient_email = customer_email or DEFAULT_RECIPIENT
         logger.info(f"Recipient email: {recipient_email}")
         
         # Generate email content
         subject = f"Delivery Alert: Package {enriched_package.package_id} may be delayed"
         logger.info(f"Email subject: {subject}")
         
-        html_content = self._generate_alert_email_html(enriched_package)
-        plain_content = self._generate_alert_email_text(enriched_package)
+        html_content, plain_content = self.templates.render(enriched_package)
         logger.info(f"Email content generated (HTML: {len(html_content)} chars, Text: {len(plain_content)} chars)")
         
         if self.mock_mode:
             logger.info("Using MOCK email sending")
             return await self._mock_send_email(recipient_email, subject, html_content)
         else:
-            logger.info("Using real SendGrid email sending")
-            return await self._send_email_via_sendgrid(
-                recipient_email, subject, html_content, plain_content
+            logger.info("Queueing email for SendGrid delivery")
+            return self._queue_sendgrid_email(
+                recipient_email, subject, html_content, plain_content, on_failure
             )
     
-    def _generate_alert_email_html(self, package: EnrichedPackage) -> str:
-        """Generate HTML email content"""
-        reasons_list = "</li><li>".join(package.reasons)
-        
-        html = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px;">
-                <h2 style="color: #e74c3c;">⚠️ Package Delivery Alert</h2>
-                
-                <div style="background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>Package Details:</h3>
-                    <ul>
-                        <li><strong>Package ID:</strong> {package.package_id}</li>
-                        <li><strong>Destination:</strong> {package.destination_city}, {package.destination_zip}</li>
-                        <li><strong>Carrier:</strong> {package.carrier}</li>
-                        <li><strong>Expected Delivery:</strong> {package.expected_delivery_date}</li>
-                        <li><strong>Risk Level:</strong> {package.risk_score}/100</li>
-                    </ul>
-                </div>
-                
-                <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>Potential Delay Reasons:</h3>
-                    <ul>
-                        <li>{reasons_list}</li>
-                    </ul>
-                </div>
-                
-                <div style="margin: 20px 0; text-align: center;">
-                    <h3>What would you like to do?</h3>
-                    <p>Please visit our customer portal to choose your preferred action:</p>
-                    
-                    <div style="margin: 10px 0;">
-                        <a href="#" style="background-color: #28a745; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Accept Delay</a>
-                        <a href="#" style="background-color: #dc3545; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Request Refund</a>
-                        <a href="#" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Resend Package</a>
-                    </div>
-                </div>
-                
-                <footer style="margin-top: 20px; font-size: 12px; color: #666;">
-                    <p>This is an automated message from ShipStation. Please do not reply to this email.</p>
-                </footer>
-            </div>
-        </body>
-        </html>
+    def build_bulk_alert_message(self, packages: List[Dict], recipients: Dict[str, str]) -> Dict:
         """
-        return html
-    
-    def _generate_alert_email_text(self, package: EnrichedPackage) -> str:
-        """Generate plain text email content"""
-        reasons_text = "\n- ".join(package.reasons)
-        
-        return f"""
-PACKAGE DELIVERY ALERT
-
-Your package may be delayed:
-
-Package Details:
-- Package ID: {package.package_id}
-- Destination: {package.destination_city}, {package.destination_zip}
-- Carrier: {package.carrier}
-- Expected Delivery: {package.expected_delivery_date}
-- Risk Level: {package.risk_score}/100
-
-Potential Delay Reasons:
-- {reasons_text}
-
-What would you like to do?
-Please visit our customer portal to choose your preferred action:
-1. Accept Delay
-2. Request Refund  
-3. Resend Package
-
-This is an automated message from ShipStation.
+        One SendGrid mail/send payload alerting up to 1000 packages: a shared templated body
+        plus one personalization (recipient, subject, substitutions) per package.
+        Packages without a recipient are left out.
         """
+        personalizations = []
+        for package in packages:
+            recipient = recipients.get(package["package_id"])
+            if not recipient:
+                continue
+            fields = {
+                "package_id": package["package_id"],
+                "destination_city": package["destination_city"],
+                "destination_zip": package["destination_zip"],
+                "carrier": package["carrier"],
+                "expected_delivery_date": package["expected_delivery_date"],
+                "risk_score": str(package["risk_score"])
+            }
+            personalizations.append({
+                "to": [{"email": recipient}],
+                "subject": f"Delivery Alert: Package {package['package_id']} may be delayed",
+                "substitutions": self.templates.bulk_substitutions(fields, package.get("reasons") or [])
+            })
+        
+        return {
+            "personalizations": personalizations,
+            "from": {"email": self.from_email},
+            "subject": "Delivery Alert",
+            "content": self._bulk_content
+        }
+    
+    async def send_bulk_message(self, message: Dict) -> bool:
+        """Send a bulk payload now (retried, dead-lettered on failure); True if accepted"""
+        if self.mock_mode:
+            logger.info(f"[MOCK EMAIL] Bulk alert to {len(message['personalizations'])} recipients")
+            return True
+        return await self.dispatcher.deliver(message)
     
-    async def _send_email_via_sendgrid(
+    def _queue_sendgrid_email(
         self, 
         to_email: str, 
         subject: str, 
         html_content: str, 
-        plain_content: str
+        plain_content: str,
+        on_failure: Optional[Callable[[], Awaitable[None]]] = None
     ) -> dict:
-        """Send email using SendGrid API"""
-        logger.info(f"Attempting to send email via SendGrid to {to_email}")
-        try:
-            message = Mail(
-                from_email=self.from_email,
-                to_emails=to_email,
-                subject=subject,
-                html_content=html_content,
-                plain_text_content=plain_content
-            )
-            logger.info(f"SendGrid message object created (from: {self.from_email}, to: {to_email})")
-            
-            response = self.sg.send(message)
-            logger.info(f"SendGrid API response: status_code={response.status_code}")
-            
-            return {
-                "success": True,
-                "message": "Email sent successfully",
-                "email_sent": True,
-                "status_code": response.status_code
-            }
-            
-        except Exception as e:
-            logger.error(f"Failed to send email via SendGrid: {str(e)}")
+        """Hand the email to the background dispatcher; delivery happens off the request path"""
+        message = {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": self.from_email},
+            "subject": subject,
+            # SendGrid requires text/plain before text/html
+            "content": [
+                {"type": "text/plain", "value": plain_content},
+                {"type": "text/html", "value": html_content}
+            ]
+        }
+        
+        if not self.dispatcher.enqueue(message, on_dead_letter=on_failure):
             return {
                 "success": False,
-                "message": f"Failed to send email: {str(e)}",
+                "message": "Email queue is full - try again later",
                 "email_sent": False
             }
+        
+        return {
+            "success": True,
+            "message": "Email queued for delivery",
+            "email_sent": False,
+            "queued": True
+        }
     
     async def _mock_send_email(self, to_email: str, subject: str, content: str) -> dict:
         """Mock email sending for development/testing"""
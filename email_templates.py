@@ -0,0 +1,181 @@
+from models import EnrichedPackage
+from collections import OrderedDict
+from functools import lru_cache
+from string import Template
+from typing import Dict, List, Sequence, Tuple
+import html
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Per-package fields filled in at send time
+PACKAGE_FIELDS = ("package_id", "destination_city", "destination_zip", "carrier",
+                  "expected_delivery_date", "risk_score")
+
+ALERT_HTML = Template("""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px;">
+                <h2 style="color: #e74c3c;">⚠️ Package Delivery Alert</h2>
+                
+                <div style="background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                    <h3>Package Details:</h3>
+                    <ul>
+                        <li><strong>Package ID:</strong> $package_id</li>
+                        <li><strong>Destination:</strong> $destination_city, $destination_zip</li>
+                        <li><strong>Carrier:</strong> $carrier</li>
+                        <li><strong>Expected Delivery:</strong> $expected_delivery_date</li>
+                        <li><strong>Risk Level:</strong> $risk_score/100</li>
+                    </ul>
+                </div>
+                
+                <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                    <h3>Potential Delay Reasons:</h3>
+                    <ul>
+                        <li>$reasons</li>
+                    </ul>
+                </div>
+                
+                <div style="margin: 20px 0; text-align: center;">
+                    <h3>What would you like to do?</h3>
+                    <p>Please visit our customer portal to choose your preferred action:</p>
+                    
+                    <div style="margin: 10px 0;">
+                        <a href="#" style="background-color: #28a745; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Accept Delay</a>
+                        <a href="#" style="background-color: #dc3545; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Request Refund</a>
+                        <a href="#" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin: 5px;">Resend Package</a>
+                    </div>
+                </div>
+                
+                <footer style="margin-top: 20px; font-size: 12px; color: #666;">
+                    <p>This is an automated message from ShipStation. Please do not reply to this email.</p>
+                </footer>
+            </div>
+        </body>
+        </html>
+        """)
+
+ALERT_TEXT = Template("""
+PACKAGE DELIVERY ALERT
+
+Your package may be delayed:
+
+Package Details:
+- Package ID: $package_id
+- Destination: $destination_city, $destination_zip
+- Carrier: $carrier
+- Expected Delivery: $expected_delivery_date
+- Risk Level: $risk_score/100
+
+Potential Delay Reasons:
+- $reasons
+
+What would you like to do?
+Please visit our customer portal to choose your preferred action:
+1. Accept Delay
+2. Request Refund  
+3. Resend Package
+
+This is an automated message from ShipStation.
+        """)
+
+
+def risk_bucket(risk_score: int) -> str:
+    """Same bands as RiskScoringEngine.get_risk_level_description"""
+    if risk_score >= 70:
+        return "High Risk"
+    elif risk_score >= 40:
+        return "Medium Risk"
+    return "Low Risk"
+
+
+@lru_cache(maxsize=4096)
+def reasons_fragments(reasons: Tuple[str, ...]) -> Tuple[str, str]:
+    """(escaped HTML list items, text lines) for a reasons list"""
+    return (
+        "</li><li>".join(html.escape(reason) for reason in reasons),
+        "\n- ".join(reasons)
+    )
+
+
+def _literal(value: str) -> str:
+    """Protect text placed into a template that will be substituted again"""
+    return value.replace("$", "$$")
+
+
+class AlertEmailRenderer:
+    """
+    Renders the delay alert emails from templates compiled at import time, with the same
+    content as the original inline templates. Bodies are built in two steps: the reasons part
+    is rendered once per (risk bucket, reasons) cache key and kept as a template, then only the
+    package fields are substituted. All HTML values are escaped.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self.cache_size = cache_size
+        self._bodies: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[Template, Template]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _bodies_for(self, bucket: str, reasons: Sequence[str]) -> Tuple[Template, Template]:
+        key = (bucket, tuple(reasons))
+        bodies = self._bodies.get(key)
+        if bodies is not None:
+            self.hits += 1
+            self._bodies.move_to_end(key)
+            return bodies
+
+        self.misses += 1
+        html_reasons, text_reasons = reasons_fragments(key[1])
+        bodies = (
+            Template(ALERT_HTML.safe_substitute(reasons=_literal(html_reasons))),
+            Template(ALERT_TEXT.safe_substitute(reasons=_literal(text_reasons)))
+        )
+        self._bodies[key] = bodies
+        while len(self._bodies) > self.cache_size:
+            self._bodies.popitem(last=False)
+        return bodies
+
+    @staticmethod
+    def package_fields(package: EnrichedPackage) -> Dict[str, str]:
+        return {
+            "package_id": package.package_id,
+            "destination_city": package.destination_city,
+            "destination_zip": package.destination_zip,
+            # Formatted exactly as the original f-string templates did
+            "carrier": f"{package.carrier}",
+            "expected_delivery_date": package.expected_delivery_date,
+            "risk_score": str(package.risk_score)
+        }
+
+    def render(self, package: EnrichedPackage) -> Tuple[str, str]:
+        """(HTML, plain text) alert bodies for one package"""
+        html_body, text_body = self._bodies_for(risk_bucket(package.risk_score), package.reasons)
+        fields = self.package_fields(package)
+        return (
+            html_body.substitute({name: html.escape(value) for name, value in fields.items()}),
+            text_body.substitute(fields)
+        )
+
+    def render_tagged(self) -> List[Dict[str, str]]:
+        """
+        SendGrid content for bulk sends: every variable part is a substitution tag,
+        -t_<name>- in the text body and -h_<name>- in the HTML body (see bulk_substitutions)
+        """
+        names = PACKAGE_FIELDS + ("reasons",)
+        return [
+            {"type": "text/plain", "value": ALERT_TEXT.substitute({name: f"-t_{name}-" for name in names})},
+            {"type": "text/html", "value": ALERT_HTML.substitute({name: f"-h_{name}-" for name in names})}
+        ]
+
+    def bulk_substitutions(self, fields: Dict[str, str], reasons: Sequence[str]) -> Dict[str, str]:
+        """Substitution values for one recipient of render_tagged() content"""
+        html_reasons, text_reasons = reasons_fragments(tuple(reasons))
+        substitutions = {f"-t_{name}-": value for name, value in fields.items()}
+        substitutions.update({f"-h_{name}-": html.escape(value) for name, value in fields.items()})
+        substitutions.update({
+            "-t_reasons-": text_reasons,
+            "-h_reasons-": html_reasons
+        })
+        return substitutions
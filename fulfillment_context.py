@@ -0,0 +1,46 @@
+from models import Package
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FulfillmentContextStore:
+    """
+    Recently enriched ShipStation orders keyed by fulfillmentPlanId: the package mapped for the
+    grid. Bounded by size (least recently enriched evicted first) and by TTL (expired entries are
+    dropped on every put), so the order drill-down scores the same package (whose factors are
+    normally still memoized).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Package]]" = OrderedDict()
+        logger.info(f"FulfillmentContextStore initialized (max entries: {max_entries}, TTL: {ttl_seconds}s)")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, fulfillment_plan_id: str, package: Package):
+        now = time.monotonic()
+        self._entries[fulfillment_plan_id] = (now + self.ttl_seconds, package)
+        self._entries.move_to_end(fulfillment_plan_id)
+        # Entries are in expiry order, so expired ones are always at the front
+        while self._entries and (len(self._entries) > self.max_entries or next(iter(self._entries.values()))[0] <= now):
+            self._entries.popitem(last=False)
+
+    def get(self, fulfillment_plan_id: str) -> Optional[Package]:
+        """The enriched package, or None if never enriched or expired"""
+        entry = self._entries.get(fulfillment_plan_id)
+        if entry is None:
+            return None
+
+        expires_at, package = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[fulfillment_plan_id]
+            logger.info(f"Enrichment context EXPIRED for {fulfillment_plan_id}")
+            return None
+        return package
@@ -1,21 +1,36 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 from models import (
-    EnrichedPackage, AlertRequest, AlertResponse, 
-    ActionRequest, ActionResponse, Package, EnhancedRiskAssessment,
+    CarrierType, EnrichedPackage, AlertRequest, AlertResponse, 
+    ActionRequest, ActionResponse, Package, EnhancedRiskAssessment, BulkAlertRequest,
     ShipStationResponse, ShipStationShipment, ShipStationAwaitingShipmentResponse,
     ShipStationSalesOrder
 )
 from mock_data import MOCK_PACKAGES
+from package_store import package_store
+from package_scorer import PackageScorer
+from score_events import ScoreEventBroker, stream_score_events
+from fulfillment_context import FulfillmentContextStore
 from risk_engine import RiskScoringEngine
-from email_service import EmailService
+from email_service import EmailService, DEFAULT_RECIPIENT
+from alert_ledger import AlertLedger
+from action_processor import ActionProcessor
+from alert_jobs import BulkAlertJobManager
 from database import risk_db
-from typing import List, Optional
+from profiler import profiling_service
+from json_response import ORJSONModelResponse, dumps as json_dumps
+from typing import Annotated, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 import logging
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import hashlib
+import time
+import hmac
+import orjson
+import base64
 
 # Load environment variables
 load_dotenv()
@@ -32,7 +47,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Shipment Risk Prediction Engine",
     description="Microservice for predicting delivery risk scores and managing shipment alerts",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONModelResponse
 )
 
 # Add CORS middleware
@@ -50,12 +66,53 @@ logger.info(f"Environment variables:")
 logger.info(f"   OPENWEATHER_API_KEY: {'SET' if os.getenv('OPENWEATHER_API_KEY') else 'NOT SET (will use mock)'}")
 logger.info(f"   SENDGRID_API_KEY: {'SET' if os.getenv('SENDGRID_API_KEY') else 'NOT SET (will use mock)'}")
 logger.info(f"   FROM_EMAIL: {os.getenv('FROM_EMAIL', 'noreply@shipstation.com')}")
+logger.info(f"   ADMIN_API_KEY: {'SET' if os.getenv('ADMIN_API_KEY') else 'NOT SET (admin-only endpoints disabled)'}")
 
 risk_engine = RiskScoringEngine()
 email_service = EmailService()
+alert_ledger = AlertLedger(
+    risk_db,
+    window_seconds=float(os.getenv("ALERT_SUPPRESSION_WINDOW_SECONDS", "86400"))
+)
+bulk_alert_jobs = BulkAlertJobManager(
+    risk_db,
+    email_service,
+    alert_ledger,
+    requests_per_second=float(os.getenv("BULK_ALERT_REQUESTS_PER_SECOND", "2"))
+)
+action_processor = ActionProcessor(
+    risk_db,
+    batch_size=int(os.getenv("ACTION_BATCH_SIZE", "100")),
+    concurrency=int(os.getenv("ACTION_WORKER_CONCURRENCY", "4")),
+    interval_seconds=float(os.getenv("ACTION_PROCESSING_INTERVAL_SECONDS", "5"))
+)
+package_scorer = PackageScorer(
+    risk_engine,
+    package_store,
+    interval_seconds=float(os.getenv("BACKGROUND_SCORING_INTERVAL_SECONDS", "60")),
+    weather_refresh_seconds=float(os.getenv("WEATHER_REFRESH_INTERVAL_SECONDS", "3600"))
+)
+score_event_broker = ScoreEventBroker(max_subscriptions=int(os.getenv("SCORE_PUSH_MAX_SUBSCRIPTIONS", "1000")))
+package_scorer.add_listener(score_event_broker.publish)
+
+# Recently enriched ShipStation orders, for the /orders/{fulfillmentPlanId} drill-down
+fulfillment_contexts = FulfillmentContextStore(
+    max_entries=int(os.getenv("ENRICHMENT_CONTEXT_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("ENRICHMENT_CONTEXT_TTL_SECONDS", "3600"))
+)
+
+# Score push channel: minimum score move that is pushed, and idle heartbeat period
+SCORE_PUSH_MIN_DELTA = int(os.getenv("SCORE_PUSH_MIN_DELTA", "5"))
+SCORE_PUSH_HEARTBEAT_SECONDS = float(os.getenv("SCORE_PUSH_HEARTBEAT_SECONDS", "15"))
 
 # Customer actions now stored in database (removed in-memory storage)
 
+# Media type clients send in Accept to get streamed, one-item-per-line responses
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Page size for /packages when paging or filtering without an explicit limit
+DEFAULT_PAGE_SIZE = 50
+
 # Simple in-memory cache for risk assessments (1-hour TTL)
 risk_assessment_cache = {}
 
@@ -90,9 +147,33 @@ def cache_assessment(package_id: str, delivery_date: str, assessment: EnhancedRi
     }
     logger.info(f"Cached assessment for package {package_id}")
 
+# Assembled dashboard statistics, reused across refreshes for a few seconds
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+dashboard_cache = {}
+
+async def get_dashboard_stats(name: str, load):
+    """Return cached dashboard data for name, or load and cache it"""
+    cached = dashboard_cache.get(name)
+    if cached and time.monotonic() < cached["expires_at"]:
+        return cached["data"]
+    data = await load()
+    dashboard_cache[name] = {"data": data, "expires_at": time.monotonic() + DASHBOARD_CACHE_TTL_SECONDS}
+    return data
+
 logger.info("All services initialized successfully")
 
 
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow the request only if X-Admin-Token matches the ADMIN_API_KEY environment variable"""
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key:
+        logger.warning("Admin-only endpoint called but ADMIN_API_KEY is not configured")
+        raise HTTPException(status_code=403, detail="Admin API is disabled (ADMIN_API_KEY not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_key):
+        logger.warning("Admin-only endpoint called with missing or invalid admin token")
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 # Commented out automatic startup - use manual endpoint instead
 # @app.on_event("startup")
 # async def startup_event():
@@ -109,9 +190,63 @@ logger.info("All services initialized successfully")
 #         logger.warning("Server starting without database initialization")
 
 
+@app.on_event("startup")
+async def warm_package_store():
+    """Warm the package cache from earlier runs (lookups read through to the database for the rest)"""
+    try:
+        await package_store.load_from_database()
+    except Exception as e:
+        logger.warning(f"Could not load packages from the database: {str(e)}")
+
+
+@app.on_event("startup")
+async def start_background_scoring():
+    """Keep stored package risk scores fresh (set BACKGROUND_SCORING_INTERVAL_SECONDS=0 to disable)"""
+    if package_scorer.interval_seconds > 0:
+        package_scorer.track_all(package_store.all())
+        package_scorer.start()
+    else:
+        logger.info("Background package scoring disabled")
+
+
+@app.on_event("shutdown")
+async def stop_background_scoring():
+    await package_scorer.stop()
+
+
+@app.on_event("startup")
+async def start_email_workers():
+    """Start the SendGrid delivery workers (not used in mock mode)"""
+    if not email_service.mock_mode:
+        email_service.dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_email_workers():
+    if not email_service.mock_mode:
+        await email_service.dispatcher.stop()
+
+
+@app.on_event("startup")
+async def start_action_processor():
+    """Process logged customer actions in the background (ACTION_PROCESSING_INTERVAL_SECONDS=0 disables)"""
+    if action_processor.interval_seconds > 0:
+        action_processor.start()
+    else:
+        logger.info("Customer action processing disabled")
+
+
+@app.on_event("shutdown")
+async def stop_action_processor():
+    await action_processor.stop()
+
+
 async def get_enriched_package(package: Package) -> EnrichedPackage:
     """Convert a Package to an EnrichedPackage with risk assessment"""
-    risk_assessment = await risk_engine.calculate_risk_score(package)
+    # Serve the scheduler's materialized score when it is fresh, otherwise compute it
+    risk_assessment = package_scorer.get_fresh_assessment(package.package_id)
+    if risk_assessment is None:
+        risk_assessment = await risk_engine.calculate_risk_score(package)
     
     return EnrichedPackage(
         package_id=package.package_id,
@@ -124,6 +259,35 @@ async def get_enriched_package(package: Package) -> EnrichedPackage:
     )
 
 
+async def enrich_package_or_default(package: Package) -> EnrichedPackage:
+    """Enrich a package, falling back to a default medium risk if assessment fails"""
+    try:
+        return await get_enriched_package(package)
+    except Exception as e:
+        logger.error(f"Error enriching package {package.package_id}: {str(e)}")
+        # Add package with default risk if enrichment fails
+        return EnrichedPackage(
+            **package.dict(),
+            risk_score=25,
+            reasons=["assessment unavailable"]
+        )
+
+
+def wants_ndjson(request: Optional[Request]) -> bool:
+    """Check whether the client asked for a streamed NDJSON response"""
+    return request is not None and NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def ndjson_lines(items: AsyncIterator[BaseModel]) -> AsyncIterator[bytes]:
+    """Encode each item as one JSON line as soon as it is produced"""
+    async for item in items:
+        yield json_dumps(item) + b"\n"
+
+
+def ndjson_response(items: AsyncIterator[BaseModel], headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(ndjson_lines(items), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
 @app.get("/", summary="Root endpoint")
 async def root():
     """Root endpoint with basic service information"""
@@ -137,6 +301,7 @@ async def root():
             "/packages/{id}/risk-assessment",
             "/enrich-shipments",
             "/enrich-awaiting-shipments",
+            "/enrich-awaiting-shipments/passthrough",
             "/orders/{fulfillmentPlanId}/risk-assessment",
             "/send-alert",
             "/action",
@@ -146,36 +311,123 @@ async def root():
 
 
 @app.get("/packages", response_model=List[EnrichedPackage], summary="Get all packages with risk scores")
-async def get_packages() -> List[EnrichedPackage]:
+async def get_packages(
+    request: Request = None,
+    response: Response = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=500, description="Page size; enables stored-score paging")] = None,
+    cursor: Annotated[Optional[str], Query(description="X-Next-Cursor value from the previous page")] = None,
+    sort: Annotated[str, Query(pattern="^(package_id|risk)$", description="'package_id' or 'risk' (highest first)")] = "package_id",
+    carrier: Annotated[Optional[CarrierType], Query()] = None,
+    zip_prefix: Annotated[Optional[str], Query(pattern=r"^\d{1,5}$")] = None,
+    date_from: Annotated[Optional[str], Query(pattern=r"^\d{4}-\d{2}-\d{2}$", description="Earliest expected delivery date")] = None,
+    date_to: Annotated[Optional[str], Query(pattern=r"^\d{4}-\d{2}-\d{2}$", description="Latest expected delivery date")] = None,
+    min_risk: Annotated[Optional[int], Query(ge=0, le=100)] = None
+) -> List[EnrichedPackage]:
     """
     Returns mocked shipment list enriched with:
     - risk_score (0–100)
     - list of reasons (e.g., ["storm", "known UPS delays"])
+    
+    Paging, filtering or sorting parameters switch to the stored-score path: one indexed
+    query over precomputed scores, with the next page's cursor in the X-Next-Cursor header.
+    
+    Send `Accept: application/x-ndjson` to stream one package per line as it is scored.
     """
+    if limit is not None or cursor or sort != "package_id" or any(
+        value is not None for value in (carrier, zip_prefix, date_from, date_to, min_risk)
+    ):
+        return await get_packages_page(
+            response, limit or DEFAULT_PAGE_SIZE, cursor, sort,
+            carrier=carrier.value if carrier else None, zip_prefix=zip_prefix,
+            date_from=date_from, date_to=date_to, min_risk=min_risk
+        )
+    
     logger.info("GET /packages - Fetching all packages with risk assessments")
-    logger.info(f"Processing {len(MOCK_PACKAGES)} packages")
+    # Snapshot the index so concurrent upserts can't change it mid-iteration
+    packages = list(package_store.all())
+    logger.info(f"Processing {len(packages)} packages")
+    
+    if wants_ndjson(request):
+        logger.info("GET /packages - Streaming NDJSON response")
+        return ndjson_response(stream_enriched_packages(packages))
     
     enriched_packages = []
     
-    for i, package in enumerate(MOCK_PACKAGES, 1):
-        try:
-            logger.info(f"Processing package {i}/{len(MOCK_PACKAGES)}: {package.package_id}")
-            enriched_package = await get_enriched_package(package)
-            enriched_packages.append(enriched_package)
-            logger.info(f"Package {package.package_id} processed successfully (risk: {enriched_package.risk_score})")
-        except Exception as e:
-            logger.error(f"Error enriching package {package.package_id}: {str(e)}")
-            # Add package with default risk if enrichment fails
-            enriched_packages.append(EnrichedPackage(
-                **package.dict(),
-                risk_score=25,
-                reasons=["assessment unavailable"]
-            ))
+    for i, package in enumerate(packages, 1):
+        logger.info(f"Processing package {i}/{len(packages)}: {package.package_id}")
+        enriched_package = await enrich_package_or_default(package)
+        enriched_packages.append(enriched_package)
+        logger.info(f"Package {package.package_id} processed (risk: {enriched_package.risk_score})")
     
     logger.info(f"GET /packages completed - returning {len(enriched_packages)} enriched packages")
     return enriched_packages
 
 
+def encode_page_cursor(sort: str, row: dict) -> str:
+    """Opaque keyset cursor pointing just past the given row"""
+    key = [row["risk_score"], row["package_id"]] if sort == "risk" else [row["package_id"]]
+    return base64.urlsafe_b64encode(orjson.dumps([sort, *key])).decode()
+
+
+def decode_page_cursor(cursor: Optional[str], sort: str) -> Optional[Tuple]:
+    if not cursor:
+        return None
+    try:
+        cursor_sort, *key = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort or len(key) != (2 if sort == "risk" else 1):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return tuple(key)
+
+
+async def get_packages_page(response: Optional[Response], limit: int, cursor: Optional[str],
+                            sort: str, **filters) -> List[EnrichedPackage]:
+    """Serve one page of /packages from the stored, indexed risk scores"""
+    logger.info(f"GET /packages - Stored-score page (limit={limit}, sort={sort}, filters={filters})")
+    after = decode_page_cursor(cursor, sort)
+    
+    try:
+        rows = await risk_db.query_packages(limit=limit, sort_by=sort, after=after, **filters)
+    except Exception as e:
+        logger.error(f"Error querying stored packages: {str(e)}")
+        raise HTTPException(status_code=503, detail="Package store unavailable - initialize the database first")
+    
+    # The cursor points past the last row's position in this query, before any scoring below
+    if response is not None and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_page_cursor(sort, rows[-1])
+    
+    # Rows not yet reached by the background scorer (last in the risk sort) are scored now and stored
+    unscored = [Package(**{k: row[k] for k in Package.model_fields}) for row in rows if row["risk_score"] is None]
+    if unscored:
+        fresh = {package_id: (score, reasons) for package_id, score, reasons in await package_scorer.score_packages(unscored)}
+        for row in rows:
+            if row["package_id"] in fresh:
+                row["risk_score"], row["reasons"] = fresh[row["package_id"]]
+    
+    return [
+        EnrichedPackage(
+            package_id=row["package_id"],
+            destination_zip=row["destination_zip"],
+            destination_city=row["destination_city"],
+            carrier=row["carrier"],
+            expected_delivery_date=row["expected_delivery_date"],
+            risk_score=row["risk_score"] if row["risk_score"] is not None else 25,
+            reasons=row["reasons"] or ["assessment unavailable"]
+        )
+        for row in rows
+    ]
+
+
+async def stream_enriched_packages(packages: Iterable[Package]) -> AsyncIterator[EnrichedPackage]:
+    """Yield each package as soon as it is scored, holding only one at a time"""
+    count = 0
+    for package in packages:
+        yield await enrich_package_or_default(package)
+        count += 1
+    logger.info(f"GET /packages completed - streamed {count} enriched packages")
+
+
 @app.get("/packages/{package_id}", response_model=EnrichedPackage, summary="Get single package risk assessment")
 async def get_package(package_id: str) -> EnrichedPackage:
     """
@@ -183,11 +435,11 @@ async def get_package(package_id: str) -> EnrichedPackage:
     """
     logger.info(f"GET /packages/{package_id} - Fetching single package risk assessment")
     
-    # Find package in mock data
-    package = next((p for p in MOCK_PACKAGES if p.package_id == package_id), None)
+    # Find package in the package store
+    package = await package_store.get(package_id)
     
     if not package:
-        logger.warning(f"Package {package_id} not found in mock data")
+        logger.warning(f"Package {package_id} not found in package store")
         raise HTTPException(status_code=404, detail=f"Package {package_id} not found")
     
     logger.info(f"Found package {package_id}: {package.destination_city}, {package.carrier}")
@@ -209,8 +461,8 @@ async def get_enhanced_risk_assessment(package_id: str) -> EnhancedRiskAssessmen
     """
     logger.info(f"GET /packages/{package_id}/risk-assessment - Enhanced risk assessment request")
     
-    # Find package in mock data
-    package = next((p for p in MOCK_PACKAGES if p.package_id == package_id), None)
+    # Find package in the package store
+    package = await package_store.get(package_id)
     
     if not package:
         logger.warning(f"Package {package_id} not found for enhanced risk assessment")
@@ -245,42 +497,139 @@ async def get_enhanced_risk_assessment(package_id: str) -> EnhancedRiskAssessmen
         )
 
 
+@app.get("/risk-scores/changes", summary="Get package risk scores changed since a sequence number")
+async def get_risk_score_changes(
+    since: Annotated[int, Query(ge=0, description="Last sequence number already seen (0 for a full snapshot)")] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 500
+):
+    """
+    Change feed over the materialized package_risk_scores table.
+    Poll with `since` = the returned `next_since` to receive only scores that changed.
+    """
+    logger.info(f"GET /risk-scores/changes - since={since}, limit={limit}")
+    
+    try:
+        changes = await risk_db.get_risk_score_changes(since_seq=since, limit=limit)
+    except Exception as e:
+        logger.error(f"Error reading risk score changes: {str(e)}")
+        raise HTTPException(status_code=503, detail="Risk score feed unavailable - initialize the database first")
+    
+    return {
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if changes else since,
+        "has_more": len(changes) == limit
+    }
+
+
+async def watch_enriched_orders(package_ids: Set[str]) -> Dict[str, int]:
+    """
+    Start background re-scoring for enriched orders that are being watched and return their
+    current scores (the push baselines). Only watched orders are tracked, and they stay out of
+    the stored score change feed.
+    """
+    baselines = {}
+    for package_id in package_ids:
+        assessment = package_scorer.get_fresh_assessment(package_id)
+        if assessment is None:
+            package = fulfillment_contexts.get(package_id)
+            if package is None:
+                continue
+            try:
+                # Same package as the grid row, so its factor vector is normally still memoized
+                assessment = await risk_engine.calculate_risk_score(package)
+            except Exception as e:
+                logger.warning(f"Could not score watched order {package_id}: {str(e)}")
+                continue
+            package_scorer.track_transient(package, assessment)
+        baselines[package_id] = assessment.risk_score
+    return baselines
+
+
+@app.get("/risk-scores/stream", summary="Push risk-score changes for ShipStation orders (Server-Sent Events)")
+async def stream_risk_score_changes(
+    fulfillmentPlanIds: Annotated[Optional[List[str]], Query(description="IDs to watch; repeat the parameter or comma-separate")] = None,
+    min_delta: Annotated[Optional[int], Query(ge=1, le=100, description="Smallest score move that is pushed")] = None
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of `score` events for the subscribed fulfillmentPlanIds.
+    An event is pushed only when background re-scoring moves an order's risk by at least
+    min_delta from the score the client last received (the score at subscription is the baseline).
+    Orders must have been enriched by this process to be re-scored.
+    Updates for a slow client are coalesced per order; idle connections get heartbeat comments.
+    """
+    package_ids = {package_id.strip() for value in fulfillmentPlanIds or [] for package_id in value.split(",") if package_id.strip()}
+    if not package_ids or len(package_ids) > 1000:
+        raise HTTPException(status_code=422, detail="Subscribe to between 1 and 1000 fulfillmentPlanIds")
+    
+    baselines = await watch_enriched_orders(package_ids)
+    
+    try:
+        subscription = score_event_broker.subscribe(package_ids, min_delta or SCORE_PUSH_MIN_DELTA, baselines)
+    except RuntimeError as e:
+        logger.warning(f"GET /risk-scores/stream - Rejecting subscription: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    logger.info(f"GET /risk-scores/stream - Subscribed to {len(package_ids)} orders ({len(baselines)} with known scores)")
+    return StreamingResponse(
+        stream_score_events(score_event_broker, subscription, SCORE_PUSH_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def enrich_shipment(shipment: ShipStationShipment) -> ShipStationShipment:
+    """Return a copy of the shipment with its riskScore set"""
+    try:
+        # Score straight from the validated model fields (no dict round-trip)
+        package = risk_engine.map_shipstation_shipment_to_package(shipment)
+        risk_assessment = await risk_engine.calculate_risk_score(package)
+        risk_score = risk_assessment.risk_score
+        # Keep its context for the drill-down view and the push channel
+        fulfillment_contexts.put(shipment.fulfillmentPlanId, package)
+        logger.debug(f"Enriched shipment {shipment.fulfillmentPlanId} with risk score: {risk_score}")
+        
+    except Exception as e:
+        # If risk calculation fails, add default risk score
+        logger.warning(f"Failed to calculate risk for {shipment.fulfillmentPlanId}: {str(e)}")
+        risk_score = 50  # Default medium risk
+    
+    # Shallow copy with the score set - the source row is already validated
+    return shipment.model_copy(update={"riskScore": risk_score})
+
+
+async def stream_enriched_shipments(shipments: List[ShipStationShipment]) -> AsyncIterator[ShipStationShipment]:
+    for shipment in shipments:
+        yield await enrich_shipment(shipment)
+
+
 @app.post("/enrich-shipments", response_model=ShipStationResponse, summary="Enrich ShipStation shipments with risk scores")
-async def enrich_shipments(shipstation_data: ShipStationResponse) -> ShipStationResponse:
+async def enrich_shipments(shipstation_data: ShipStationResponse, request: Request = None) -> ShipStationResponse:
     """
     Enrich ShipStation shipments with risk scores for grid display.
     Takes the output from /ordergrid/shipmentmode/simple and adds riskScore to each shipment.
+    
+    Send `Accept: application/x-ndjson` to stream one enriched shipment per line;
+    page metadata is returned in the X-Page, X-Page-Size and X-Total-Count headers.
     """
     logger.info(f"POST /enrich-shipments - Enriching {len(shipstation_data.pageData)} shipments with risk scores")
     
-    enriched_shipments = []
+    if wants_ndjson(request):
+        logger.info("POST /enrich-shipments - Streaming NDJSON response")
+        return ndjson_response(
+            stream_enriched_shipments(shipstation_data.pageData),
+            headers={
+                "X-Page": str(shipstation_data.page),
+                "X-Page-Size": str(shipstation_data.pageSize),
+                "X-Total-Count": str(shipstation_data.totalCount)
+            }
+        )
     
-    for shipment in shipstation_data.pageData:
-        try:
-            # Calculate risk score for this shipment
-            risk_score = await risk_engine.calculate_shipstation_risk_score(shipment.dict())
-            
-            # Add risk score to shipment
-            shipment_dict = shipment.dict()
-            shipment_dict['riskScore'] = risk_score
-            
-            enriched_shipment = ShipStationShipment(**shipment_dict)
-            enriched_shipments.append(enriched_shipment)
-            
-            logger.debug(f"Enriched shipment {shipment.fulfillmentPlanId} with risk score: {risk_score}")
-            
-        except Exception as e:
-            # If risk calculation fails, add default risk score
-            logger.warning(f"Failed to calculate risk for {shipment.fulfillmentPlanId}: {str(e)}")
-            shipment_dict = shipment.dict()
-            shipment_dict['riskScore'] = 50  # Default medium risk
-            enriched_shipment = ShipStationShipment(**shipment_dict)
-            enriched_shipments.append(enriched_shipment)
+    enriched_shipments = [await enrich_shipment(shipment) for shipment in shipstation_data.pageData]
     
     logger.info(f"Successfully enriched {len(enriched_shipments)} shipments with risk scores")
     
-    # Return same structure with enriched data
-    return ShipStationResponse(
+    # Return same structure with enriched data (rows are validated already, skip revalidation)
+    return ShipStationResponse.model_construct(
         page=shipstation_data.page,
         pageSize=shipstation_data.pageSize,
         totalCount=shipstation_data.totalCount,
@@ -288,88 +637,165 @@ async def enrich_shipments(shipstation_data: ShipStationResponse) -> ShipStation
     )
 
 
+async def enrich_sales_order(order: ShipStationSalesOrder) -> ShipStationSalesOrder:
+    """Set riskScore on the sales order in place and return it"""
+    try:
+        # Calculate risk score for this sales order
+        # Convert sales order to a format the risk engine can understand
+        risk_data = {
+            "fulfillmentPlanId": order.fulfillmentPlanIds[0] if order.fulfillmentPlanIds else "",
+            "orderNumber": order.orderNumber,
+            "derivedStatus": order.derivedStatus,
+            "countryCode": order.shipTos[0].countryCode if order.shipTos and order.shipTos[0].countryCode else "US",
+            "state": order.shipTos[0].state if order.shipTos and order.shipTos[0].state else "",
+            "city": order.shipTos[0].city if order.shipTos and order.shipTos[0].city else "",
+            "postalCode": order.shipTos[0].postalCode if order.shipTos and order.shipTos[0].postalCode else "",
+            "serviceName": order.requestedService or "Standard",
+            "orderDateTime": order.orderDateTime,
+            "shipByDateTime": order.shipByDateTime
+        }
+        
+        package = risk_engine.map_shipstation_to_package(risk_data)
+        risk_assessment = await risk_engine.calculate_risk_score(package)
+        risk_score = risk_assessment.risk_score
+        for fulfillment_plan_id in order.fulfillmentPlanIds:
+            fulfillment_contexts.put(fulfillment_plan_id, package)
+        
+        # Add risk score to sales order
+        order.riskScore = risk_score
+        
+        logger.debug(f"Enriched sales order {order.orderNumber} with risk score: {risk_score}")
+        
+    except Exception as e:
+        # If risk calculation fails, add default risk score
+        logger.warning(f"Failed to calculate risk for order {order.orderNumber}: {str(e)}")
+        order.riskScore = 50  # Default medium risk
+    
+    return order
+
+
+async def stream_enriched_sales_orders(orders: List[ShipStationSalesOrder]) -> AsyncIterator[ShipStationSalesOrder]:
+    for order in orders:
+        yield await enrich_sales_order(order)
+
+
 @app.post("/enrich-awaiting-shipments", response_model=ShipStationAwaitingShipmentResponse, summary="Enrich awaiting shipment data with risk scores")
-async def enrich_awaiting_shipments(shipstation_data: ShipStationAwaitingShipmentResponse) -> ShipStationAwaitingShipmentResponse:
+async def enrich_awaiting_shipments(shipstation_data: ShipStationAwaitingShipmentResponse, request: Request = None) -> ShipStationAwaitingShipmentResponse:
     """
     Enrich ShipStation awaiting shipment data with risk scores.
     Takes the output from frontend 'awaiting shipment' call and adds riskScore to each sales order.
     This handles the format: {"currentPageFulfillmentPlanIds": [...], "salesOrders": [...]}
+    
+    Send `Accept: application/x-ndjson` to stream one enriched sales order per line.
     """
     logger.info(f"POST /enrich-awaiting-shipments - Enriching {len(shipstation_data.salesOrders)} sales orders with risk scores")
     
-    enriched_orders = []
+    if wants_ndjson(request):
+        logger.info("POST /enrich-awaiting-shipments - Streaming NDJSON response")
+        return ndjson_response(stream_enriched_sales_orders(shipstation_data.salesOrders))
     
-    for order in shipstation_data.salesOrders:
-        try:
-            # Calculate risk score for this sales order
-            # Convert sales order to a format the risk engine can understand
-            risk_data = {
-                "fulfillmentPlanId": order.fulfillmentPlanIds[0] if order.fulfillmentPlanIds else "",
-                "orderNumber": order.orderNumber,
-                "derivedStatus": order.derivedStatus,
-                "countryCode": order.shipTos[0].countryCode if order.shipTos and order.shipTos[0].countryCode else "US",
-                "state": order.shipTos[0].state if order.shipTos and order.shipTos[0].state else "",
-                "city": order.shipTos[0].city if order.shipTos and order.shipTos[0].city else "",
-                "serviceName": order.requestedService or "Standard",
-                "orderDateTime": order.orderDateTime,
-                "shipByDateTime": order.shipByDateTime
-            }
-            
-            risk_score = await risk_engine.calculate_shipstation_risk_score(risk_data)
-            
-            # Add risk score to sales order
-            order.riskScore = risk_score
-            enriched_orders.append(order)
-            
-            logger.debug(f"Enriched sales order {order.orderNumber} with risk score: {risk_score}")
-            
-        except Exception as e:
-            # If risk calculation fails, add default risk score
-            logger.warning(f"Failed to calculate risk for order {order.orderNumber}: {str(e)}")
-            order.riskScore = 50  # Default medium risk
-            enriched_orders.append(order)
+    enriched_orders = [await enrich_sales_order(order) for order in shipstation_data.salesOrders]
     
     logger.info(f"Successfully enriched {len(enriched_orders)} sales orders with risk scores")
     
-    # Return same structure with enriched data
-    return ShipStationAwaitingShipmentResponse(
+    # Return same structure with enriched data (orders were validated on the way in)
+    return ShipStationAwaitingShipmentResponse.model_construct(
         currentPageFulfillmentPlanIds=shipstation_data.currentPageFulfillmentPlanIds,
         salesOrders=enriched_orders
     )
 
 
+def _raw_sales_order_risk_data(order: dict) -> dict:
+    """Pick the fields the risk engine needs from an unvalidated sales order dict"""
+    fulfillment_plan_ids = order.get("fulfillmentPlanIds") or []
+    ship_tos = order.get("shipTos") or []
+    ship_to = (ship_tos[0] if ship_tos else None) or {}
+    
+    return {
+        "fulfillmentPlanId": fulfillment_plan_ids[0] if fulfillment_plan_ids else "",
+        "orderNumber": order.get("orderNumber"),
+        "derivedStatus": order.get("derivedStatus"),
+        "countryCode": ship_to.get("countryCode") or "US",
+        "state": ship_to.get("state") or "",
+        "city": ship_to.get("city") or "",
+        "postalCode": ship_to.get("postalCode") or "",
+        "serviceName": order.get("requestedService") or "Standard",
+        "orderDateTime": order.get("orderDateTime"),
+        "shipByDateTime": order.get("shipByDateTime")
+    }
+
+
+@app.post("/enrich-awaiting-shipments/passthrough", summary="Enrich awaiting shipment data without full model parsing")
+async def enrich_awaiting_shipments_passthrough(request: Request) -> Response:
+    """
+    Opt-in fast mode of /enrich-awaiting-shipments.
+    Parses the body with orjson, reads only the fields needed for scoring, injects riskScore
+    into each sales order and returns everything else unchanged in content (the body is
+    re-serialized, so whitespace, number formatting and duplicate keys are not preserved).
+    Produces the same output as /enrich-awaiting-shipments for complete ShipStation payloads,
+    but performs no schema validation of the nested objects (items, store, amountSummary, ...).
+    """
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        logger.warning(f"POST /enrich-awaiting-shipments/passthrough - Invalid JSON body: {str(e)}")
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    
+    sales_orders = payload.get("salesOrders") if isinstance(payload, dict) else None
+    if not isinstance(sales_orders, list) or not isinstance(payload.get("currentPageFulfillmentPlanIds"), list):
+        raise HTTPException(status_code=422, detail="Expected 'currentPageFulfillmentPlanIds' and 'salesOrders' arrays")
+    
+    logger.info(f"POST /enrich-awaiting-shipments/passthrough - Enriching {len(sales_orders)} sales orders with risk scores")
+    
+    for order in sales_orders:
+        if not isinstance(order, dict):
+            raise HTTPException(status_code=422, detail="Each sales order must be a JSON object")
+        try:
+            package = risk_engine.map_shipstation_to_package(_raw_sales_order_risk_data(order))
+            risk_assessment = await risk_engine.calculate_risk_score(package)
+            risk_score = risk_assessment.risk_score
+            for fulfillment_plan_id in order.get("fulfillmentPlanIds") or []:
+                fulfillment_contexts.put(fulfillment_plan_id, package)
+            logger.debug(f"Enriched sales order {order.get('orderNumber')} with risk score: {risk_score}")
+        except Exception as e:
+            logger.warning(f"Failed to calculate risk for order {order.get('orderNumber')}: {str(e)}")
+            risk_score = 50  # Default medium risk
+        
+        order["riskScore"] = risk_score
+    
+    logger.info(f"Successfully enriched {len(sales_orders)} sales orders with risk scores (passthrough)")
+    
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+
 @app.get("/orders/{fulfillmentPlanId}/risk-assessment", response_model=EnhancedRiskAssessment, summary="Get detailed risk assessment for ShipStation order")
 async def get_order_risk_assessment(fulfillmentPlanId: str) -> EnhancedRiskAssessment:
     """
     Get detailed risk assessment for a specific ShipStation order.
     Used when user clicks into the detailed risk view from the grid.
+    Scores the package mapped when the grid was enriched; orders not enriched recently by this
+    process fall back to a stored package with that ID, then to a default CA / UPS Ground shipment.
     """
     logger.info(f"GET /orders/{fulfillmentPlanId}/risk-assessment - Detailed risk assessment request")
     
-    # For now, we need to mock this since we don't have the original shipment data
-    # In your actual implementation, you might:
-    # 1. Store the enrichment data temporarily
-    # 2. Make another call to ShipStation API to get the full shipment details
-    # 3. Use fulfillmentPlanId to look up cached data
-    
-    # For demo purposes, create a mock shipment based on fulfillmentPlanId
-    mock_shipment = {
-        "fulfillmentPlanId": fulfillmentPlanId,
-        "orderNumber": f"ORDER-{fulfillmentPlanId}",
-        "recipientName": "Demo Customer",
-        "countryCode": "US",
-        "state": "CA",  # Default to California for demo
-        "requestedService": "UPS Ground",
-        "serviceName": "UPS",
-        "shipByDateTime": "2025-08-03T16:00:00Z",
-        "weight": {"unit": "Ounces", "value": 16}
-    }
+    # Resolve the package mapped when the grid was enriched
+    package = fulfillment_contexts.get(fulfillmentPlanId)
+    if package is None:
+        package = await package_store.get(fulfillmentPlanId)
+    if package is None:
+        logger.info(f"No enrichment context for order {fulfillmentPlanId} - using a default shipment")
+        package = risk_engine.map_shipstation_to_package({
+            "fulfillmentPlanId": fulfillmentPlanId,
+            "orderNumber": f"ORDER-{fulfillmentPlanId}",
+            "countryCode": "US",
+            "state": "CA",
+            "requestedService": "UPS Ground",
+            "serviceName": "UPS",
+            "shipByDateTime": "2025-08-03T16:00:00Z"
+        })
     
     try:
-        # Convert to our package format
-        package = risk_engine._map_shipstation_to_package(mock_shipment)
-        
-        # Calculate enhanced risk assessment
+        # Same package as the grid row, so its factor vector is normally already memoized
         enhanced_assessment = await risk_engine.calculate_enhanced_risk_assessment(package)
         
         logger.info(f"Enhanced risk assessment completed for order {fulfillmentPlanId}: score={enhanced_assessment.score}")
@@ -389,17 +815,31 @@ async def send_alert(alert_request: AlertRequest) -> AlertResponse:
     """
     Sends an email warning for a high-risk shipment
     Accepts package_id and optional customer_email
+    Repeat alerts for the same package and recipient within the suppression window get 409
     """
     logger.info(f"POST /send-alert - Sending alert for package {alert_request.package_id}")
     logger.info(f"Customer email: {alert_request.customer_email or 'Not provided (will use default)'}")
     
     # Find the package
-    package = next((p for p in MOCK_PACKAGES if p.package_id == alert_request.package_id), None)
+    package = await package_store.get(alert_request.package_id)
     
     if not package:
         logger.warning(f"Package {alert_request.package_id} not found for alert")
         raise HTTPException(status_code=404, detail=f"Package {alert_request.package_id} not found")
     
+    # Reject repeats before rescoring or calling the email provider
+    recipient = alert_request.customer_email or DEFAULT_RECIPIENT
+    try:
+        claimed = await alert_ledger.claim(alert_request.package_id, recipient)
+    except Exception as e:
+        logger.error(f"Could not check the alert ledger for package {alert_request.package_id}: {str(e)}")
+        raise HTTPException(status_code=503, detail="Alert ledger unavailable, try again later")
+    if not claimed:
+        raise HTTPException(
+            status_code=409,
+            detail=f"An alert for package {alert_request.package_id} was already sent to {recipient} recently"
+        )
+    
     try:
         # Get enriched package data
         logger.info(f"Getting enriched data for package {alert_request.package_id}")
@@ -407,13 +847,17 @@ async def send_alert(alert_request: AlertRequest) -> AlertResponse:
         
         # Send alert email
         logger.info(f"Sending delay alert email (risk score: {enriched_package.risk_score})")
+        # A queued email can still be dead-lettered later; give the claim back if it is
         email_result = await email_service.send_delay_alert(
             enriched_package, 
-            alert_request.customer_email
+            alert_request.customer_email,
+            on_failure=lambda: alert_ledger.release(alert_request.package_id, recipient)
         )
         
         # Log the alert
         logger.info(f"Alert processing completed for package {alert_request.package_id}: {email_result}")
+        if not email_result["success"]:
+            await alert_ledger.release(alert_request.package_id, recipient)
         
         return AlertResponse(
             success=email_result["success"],
@@ -423,9 +867,40 @@ async def send_alert(alert_request: AlertRequest) -> AlertResponse:
         
     except Exception as e:
         logger.error(f"Error sending alert for package {alert_request.package_id}: {str(e)}")
+        await alert_ledger.release(alert_request.package_id, recipient)
         raise HTTPException(status_code=500, detail="Error sending alert")
 
 
+@app.post("/alerts/bulk", status_code=202, summary="Start a bulk alert campaign", dependencies=[Depends(require_admin)])
+async def start_bulk_alerts(bulk_request: BulkAlertRequest):
+    """
+    Email every package whose stored risk score is at least min_risk (optionally one carrier
+    and/or a destination zip prefix), highest risk first, in SendGrid batches of up to 1000
+    recipients. Packages with no entry in recipients are skipped (reported as packages_skipped), and
+    packages already alerted to that recipient within the suppression window are not alerted
+    again (packages_suppressed).
+    Runs in the background; poll GET /alerts/bulk/{job_id} for progress.
+    Admin-only (X-Admin-Token header).
+    """
+    logger.info(f"POST /alerts/bulk - min_risk={bulk_request.min_risk}, carrier={bulk_request.carrier}, zip_prefix={bulk_request.zip_prefix}")
+    
+    job = bulk_alert_jobs.start_job(
+        min_risk=bulk_request.min_risk,
+        carrier=bulk_request.carrier.value if bulk_request.carrier else None,
+        zip_prefix=bulk_request.zip_prefix,
+        recipients=bulk_request.recipients
+    )
+    return job.to_dict()
+
+
+@app.get("/alerts/bulk/{job_id}", summary="Get bulk alert campaign progress", dependencies=[Depends(require_admin)])
+async def get_bulk_alert_job(job_id: str):
+    job = bulk_alert_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Bulk alert job {job_id} not found")
+    return job.to_dict()
+
+
 @app.post("/action", response_model=ActionResponse, summary="Log customer action")
 async def log_customer_action(action_request: ActionRequest) -> ActionResponse:
     """
@@ -435,7 +910,7 @@ async def log_customer_action(action_request: ActionRequest) -> ActionResponse:
     logger.info(f"Action: {action_request.action.value}, Customer: {action_request.customer_id or 'Anonymous'}")
     
     # Verify package exists
-    package = next((p for p in MOCK_PACKAGES if p.package_id == action_request.package_id), None)
+    package = await package_store.get(action_request.package_id)
     
     if not package:
         logger.warning(f"Package {action_request.package_id} not found for action logging")
@@ -452,6 +927,8 @@ async def log_customer_action(action_request: ActionRequest) -> ActionResponse:
         
         # Log the action
         logger.info(f"Customer action logged successfully: {action_record}")
+        action_processor.wake()
+        dashboard_cache.clear()
         
         return ActionResponse(
             success=True,
@@ -492,7 +969,7 @@ async def get_customer_actions(limit: int = 20):
     """Get recent customer actions from database"""
     try:
         actions = await risk_db.get_customer_actions(limit=limit)
-        action_stats = await risk_db.get_customer_action_stats()
+        action_stats = await get_dashboard_stats("customer_actions", risk_db.get_customer_action_stats)
         
         return {
             "total_actions": action_stats["processing_stats"]["total"],
@@ -508,7 +985,7 @@ async def get_customer_actions(limit: int = 20):
 async def get_performance_stats():
     """Get comprehensive performance statistics for dashboard"""
     try:
-        stats = await risk_db.get_performance_stats()
+        stats = await get_dashboard_stats("performance", risk_db.get_performance_stats)
         return {
             "success": True,
             "data": stats
@@ -532,7 +1009,7 @@ async def record_delivery_outcome(
     try:
         # Find package details if not provided
         if not destination_zip or not scheduled_date:
-            package = next((p for p in MOCK_PACKAGES if p.package_id == package_id), None)
+            package = await package_store.get(package_id)
             if package:
                 destination_zip = destination_zip or package.destination_zip
                 scheduled_date = scheduled_date or package.expected_delivery_date
@@ -547,6 +1024,10 @@ async def record_delivery_outcome(
             scheduled_date, actual_date, delay_reasons or []
         )
         
+        # Only packages on this carrier x zip lane depend on the updated aggregates
+        package_scorer.invalidate_performance(carrier, destination_zip)
+        dashboard_cache.clear()
+        
         logger.info(f"Recorded delivery outcome for package {package_id}")
         
         return {
@@ -567,22 +1048,44 @@ async def record_delivery_outcome(
         raise HTTPException(status_code=500, detail="Error recording delivery outcome")
 
 
+# Default comparison sets for the single-zip / single-carrier analysis endpoints
+ANALYSIS_CARRIERS = ["UPS", "FedEx", "USPS", "DHL"]
+ANALYSIS_ZIP_CODES = ["98101", "10001", "90210", "33101", "60601"]
+
+
+@app.get("/admin/risk-matrix", summary="Get carrier x zip risk for many carriers and zips at once")
+async def get_risk_matrix(
+    carriers: Annotated[Optional[List[str]], Query(description="Carriers to include (repeatable); all known when omitted")] = None,
+    zip_codes: Annotated[Optional[List[str]], Query(description="Zip codes to include (repeatable); all known when omitted")] = None
+):
+    """
+    Carrier risk, geographic risk and carrier x zip delivery performance risk, computed from
+    one grouped query and cached until the next recorded delivery outcome
+    """
+    logger.info(f"GET /admin/risk-matrix - carriers={carriers or 'all'}, zip_codes={zip_codes or 'all'}")
+    try:
+        matrix = await risk_db.get_risk_matrix(carriers, zip_codes)
+        return {**matrix, "analysis_timestamp": datetime.now().isoformat()}
+    except Exception as e:
+        logger.error(f"Error building risk matrix: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error building risk matrix")
+
+
 @app.get("/admin/risk-factors/{zip_code}", summary="Get risk factors for specific zip code")
-async def get_zip_risk_factors(zip_code: str):
+async def get_zip_risk_factors(
+    zip_code: str,
+    carriers: Annotated[Optional[List[str]], Query(description="Carriers to compare (repeatable)")] = None
+):
     """Get detailed risk analysis for a specific zip code"""
     try:
-        geographic_risk = await risk_db.get_geographic_risk(zip_code)
-        
-        # Get carrier-specific performance for this zip
-        carrier_performance = {}
-        for carrier in ["UPS", "FedEx", "USPS", "DHL"]:
-            performance_risk = await risk_db.get_delivery_performance_risk(carrier, zip_code)
-            carrier_performance[carrier] = performance_risk
+        matrix = await risk_db.get_risk_matrix(carriers or ANALYSIS_CARRIERS, [zip_code])
         
         return {
             "zip_code": zip_code,
-            "geographic_risk": geographic_risk,
-            "carrier_performance": carrier_performance,
+            "geographic_risk": matrix["geographic_risk"][zip_code],
+            "carrier_performance": {
+                carrier: matrix["performance_risk"][carrier][zip_code] for carrier in matrix["carriers"]
+            },
             "analysis_timestamp": datetime.now().isoformat()
         }
         
@@ -592,21 +1095,18 @@ async def get_zip_risk_factors(zip_code: str):
 
 
 @app.get("/admin/carrier-analysis/{carrier}", summary="Get detailed carrier performance analysis")
-async def get_carrier_analysis(carrier: str):
+async def get_carrier_analysis(
+    carrier: str,
+    zip_codes: Annotated[Optional[List[str]], Query(description="Zip codes to compare (repeatable)")] = None
+):
     """Get comprehensive analysis of carrier performance"""
     try:
-        carrier_risk = await risk_db.get_carrier_risk(carrier)
-        
-        # Get performance across different zip codes
-        zip_performance = {}
-        for zip_code in ["98101", "10001", "90210", "33101", "60601"]:
-            performance_risk = await risk_db.get_delivery_performance_risk(carrier, zip_code)
-            zip_performance[zip_code] = performance_risk
+        matrix = await risk_db.get_risk_matrix([carrier], zip_codes or ANALYSIS_ZIP_CODES)
         
         return {
             "carrier": carrier,
-            "overall_risk": carrier_risk,
-            "zip_code_performance": zip_performance,
+            "overall_risk": matrix["carrier_risk"][carrier],
+            "zip_code_performance": matrix["performance_risk"][carrier],
             "analysis_timestamp": datetime.now().isoformat()
         }
         
@@ -615,16 +1115,91 @@ async def get_carrier_analysis(carrier: str):
         raise HTTPException(status_code=500, detail="Error analyzing carrier")
 
 
+@app.get("/admin/email/dead-letters", summary="Get emails that could not be delivered", dependencies=[Depends(require_admin)])
+async def get_email_dead_letters(limit: int = Query(default=50, ge=1, le=500)):
+    """Most recent dead-lettered emails plus the dispatcher's queue statistics. Admin-only (X-Admin-Token header)."""
+    logger.info(f"GET /admin/email/dead-letters - limit={limit}")
+    
+    try:
+        dead_letters = await risk_db.get_email_dead_letters(limit)
+    except Exception as e:
+        logger.error(f"Error reading email dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error reading email dead letters")
+    
+    dispatcher = None if email_service.mock_mode else email_service.dispatcher
+    return {
+        "dead_letters": dead_letters,
+        "mock_mode": email_service.mock_mode,
+        "queued": dispatcher.pending if dispatcher else 0,
+        "sent": dispatcher.sent if dispatcher else 0,
+        "dead_lettered": dispatcher.dead_lettered if dispatcher else 0
+    }
+
+
+@app.post("/admin/packages/bulk-upsert", summary="Bulk insert or update packages", dependencies=[Depends(require_admin)])
+async def bulk_upsert_packages(packages: List[Package]):
+    """Persist packages to the database and make them available for O(1) lookups (admin only)"""
+    logger.info(f"POST /admin/packages/bulk-upsert - Upserting {len(packages)} packages")
+    
+    try:
+        upserted = await package_store.upsert_many(packages)
+        package_scorer.track_all(packages)
+        return {
+            "success": True,
+            "upserted": upserted,
+            "total_packages": len(package_store)
+        }
+    except Exception as e:
+        logger.error(f"Error upserting packages: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error upserting packages")
+
+
+@app.post("/admin/profile", summary="Profile the running service", dependencies=[Depends(require_admin)])
+async def profile_service(
+    duration: float = Query(default=10.0, gt=0, le=120, description="Profiling window in seconds"),
+    format: str = Query(default="json", pattern="^(json|collapsed)$", description="'json' or 'collapsed' (flamegraph input)"),
+    top: int = Query(default=25, ge=1, le=200, description="Number of allocation sites to return")
+):
+    """
+    Sample the event loop's call stacks and track allocations for `duration` seconds
+    while the service keeps handling traffic. Admin-only (X-Admin-Token header).
+    """
+    if profiling_service.is_running:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    
+    logger.info(f"POST /admin/profile - Profiling for {duration}s (format: {format})")
+    
+    try:
+        profile = await profiling_service.profile(duration, top_allocations=top)
+    except Exception as e:
+        logger.error(f"Profiling failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error profiling service")
+    
+    if format == "collapsed":
+        return PlainTextResponse(
+            profile["collapsed_stacks"],
+            headers={"Content-Disposition": "attachment; filename=profile.collapsed"}
+        )
+    
+    return profile
+
+
 @app.post("/admin/initialize-database", summary="Manually initialize database")
 async def initialize_database():
     """Manually initialize the database if startup failed"""
     try:
         logger.info("Manual database initialization requested")
         await risk_db.initialize()
-        logger.info("Manual database initialization completed")
+        
+        # Persist the indexed packages, then pick up any stored in earlier runs
+        persisted = await package_store.persist_index()
+        await package_store.load_from_database()
+        package_scorer.track_all(package_store.all())
+        logger.info(f"Manual database initialization completed ({persisted} packages persisted, {len(package_store)} indexed)")
         return {
             "success": True,
-            "message": "Database initialized successfully"
+            "message": "Database initialized successfully",
+            "packages_indexed": len(package_store)
         }
     except Exception as e:
         logger.error(f"Manual database initialization failed: {e}")
@@ -649,7 +1224,8 @@ async def get_database_status():
                 # Get table counts
                 tables = {}
                 table_names = ["carrier_performance", "geographic_risk", "delivery_performance", 
-                             "temporal_risk", "delivery_outcomes"]
+                             "temporal_risk", "delivery_outcomes", "packages", "package_risk_scores",
+                             "email_dead_letters"]
                 
                 for table in table_names:
                     cursor = await db.execute(f"SELECT COUNT(*) FROM {table}")
@@ -135,6 +135,90 @@ def generate_demo_packages() -> List[Package]:
     return demo_packages
 
 
+def build_awaiting_shipment_payload() -> dict:
+    """Build a fully populated awaiting-shipment page (every model field present)"""
+    sales_order = {
+        "fulfillmentPlanIds": ["1147831"],
+        "salesOrderId": "114bee91-3d21-58f4-8f5e-7d97b0405bc2",
+        "orderNumber": "100083598",
+        "createdDateTime": "2025-08-01T21:48:29",
+        "modifiedDateTime": "2025-08-01T21:50:00",
+        "orderDateTime": "2025-08-01T21:48:29",
+        "paidDateTime": "2025-08-01T21:49:00",
+        "shipByDateTime": "2025-08-02T16:02:37",
+        "holdUntilDateTime": None,
+        "assignedToUser": None,
+        "assignedToUserId": None,
+        "requestedService": "UPS Ground",
+        "isGift": False,
+        "isCanceled": False,
+        "derivedStatus": "AWP",
+        "items": [{
+            "salesOrderItemId": "item-1",
+            "productId": "prod-1",
+            "sku": "SKU-1",
+            "name": "Widget",
+            "originalQuantity": 2,
+            "quantity": 2,
+            "productThumbnailUrl": None,
+            "unitPrice": {"amount": 10.5, "currency": "USD"},
+            "totalPrice": {"amount": 21.0, "currency": "USD"},
+            "isGift": False,
+            "attributes": []
+        }],
+        "store": {
+            "storeGuid": "0b5755f1-b33d-48b9-bba7-04d5306bbd10",
+            "marketplaceId": None,
+            "marketplaceCode": None,
+            "externalUrl": None,
+            "source": None
+        },
+        "soldTo": {
+            "customerId": "cust-1",
+            "name": "Michel Cheve",
+            "phone": None,
+            "username": None,
+            "email": "michel@example.com"
+        },
+        "shipTos": [{
+            "isModified": False,
+            "name": "Michel Cheve",
+            "company": None,
+            "phone": None,
+            "line1": "1 Main St",
+            "line2": None,
+            "line3": None,
+            "city": "Seattle",
+            "state": "WA",
+            "postalCode": "98101",
+            "countryCode": "US",
+            "residentialIndicator": "yes",
+            "verificationStatus": None,
+            "verificationMessage": None,
+            "verificationUtc": None,
+            "lockAddress": False
+        }],
+        "amountSummary": {
+            "productTotal": {"amount": 21.0, "currency": "USD"},
+            "orderTotal": {"amount": 26.0, "currency": "USD"},
+            "shippingPaid": {"amount": 5.0, "currency": "USD"},
+            "taxPaid": None,
+            "totalPaid": {"amount": 26.0, "currency": "USD"}
+        },
+        "discounts": [],
+        "premiumAttributes": [],
+        "tagIds": [],
+        "originalSource": None,
+        "otherIdentifiers": [],
+        "restrictions": None,
+        "riskScore": None
+    }
+    return {
+        "currentPageFulfillmentPlanIds": ["1147831"],
+        "salesOrders": [sales_order]
+    }
+
+
 # Generate full dataset for production demo
 MOCK_PACKAGES = generate_mock_packages(75)
 
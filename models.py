@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -9,6 +9,9 @@ class CarrierType(str, Enum):
     FEDEX = "FedEx"
     USPS = "USPS"
     DHL = "DHL"
+    ONTRAC = "OnTrac"
+    LASERSHIP = "LaserShip"
+    CANADA_POST = "Canada Post"
 
 
 class ActionType(str, Enum):
@@ -23,11 +26,27 @@ class Package(BaseModel):
     destination_city: str
     carrier: CarrierType
     expected_delivery_date: str
+    origin_zip: Optional[str] = Field(default=None, description="Ship-from zip; DEFAULT_ORIGIN_ZIP when omitted")
     
 
 class RiskAssessment(BaseModel):
     risk_score: int = Field(ge=0, le=100, description="Risk score from 0-100")
     reasons: List[str] = Field(description="List of risk factors")
+    factors: Dict[str, int] = Field(default_factory=dict, description="Points contributed by each risk factor")
+
+
+class RiskFactorVector(BaseModel):
+    """Raw risk factors for one package; both score formulas are projections of this"""
+    carrier: int
+    geographic: int
+    performance: int
+    weather: int
+    weather_reasons: List[str]
+    weather_available: bool
+    temporal: int
+    temporal_reasons: List[str]
+    timeline: int
+    route: int
 
 
 class EnrichedPackage(Package):
@@ -40,6 +59,13 @@ class AlertRequest(BaseModel):
     customer_email: Optional[str] = None
 
 
+class BulkAlertRequest(BaseModel):
+    min_risk: int = Field(default=70, ge=0, le=100, description="Alert packages with a stored risk score at or above this")
+    carrier: Optional[CarrierType] = None
+    zip_prefix: Optional[str] = Field(default=None, pattern=r"^\d{1,5}$", description="Region filter on destination zip")
+    recipients: Dict[str, str] = Field(default_factory=dict, description="package_id -> customer email")
+
+
 class ActionRequest(BaseModel):
     package_id: str
     action: ActionType
@@ -0,0 +1,270 @@
+from models import Package, RiskAssessment
+from risk_engine import RiskScoringEngine
+from package_store import PackageStore
+from datetime import date, timedelta
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PackageScorer:
+    """
+    Background re-scoring scheduler with incremental invalidation.
+
+    Tracks which packages depend on which risk inputs and re-scores only the affected ones:
+    - destination city      -> weather (refreshed every weather_refresh_seconds)
+    - carrier x destination -> delivery performance (changes when outcomes are recorded)
+    - delivery date         -> timeline proximity (changes at midnight)
+    Fresh scores are written to package_risk_scores (change feed), kept in memory for lookups
+    and passed to registered listeners (e.g. the score push channel).
+    """
+
+    # Timeline proximity buckets only differ for deliveries due within this many days
+    DATE_PROXIMITY_WINDOW_DAYS = 3
+
+    def __init__(self, risk_engine: RiskScoringEngine, store: PackageStore,
+                 interval_seconds: float = 60, weather_refresh_seconds: float = 3600,
+                 batch_size: int = 500, max_transient: int = 10000):
+        self.risk_engine = risk_engine
+        self.store = store
+        self.db = store.db
+        self.interval_seconds = interval_seconds
+        self.weather_refresh_seconds = weather_refresh_seconds
+        self.batch_size = batch_size
+
+        # Dependency indexes: input -> package IDs
+        self._by_city: Dict[str, Set[str]] = {}
+        self._by_carrier_zip: Dict[Tuple[str, str], Set[str]] = {}
+        self._by_date: Dict[str, Set[str]] = {}
+        self._tracked: Dict[str, Package] = {}
+
+        self._dirty: Set[str] = set()
+        self._scores: Dict[str, RiskAssessment] = {}
+        self._listeners: List[Callable[[str, RiskAssessment], None]] = []
+
+        # Unstored packages (watched ShipStation orders), least recently tracked first
+        self.max_transient = max_transient
+        self._transient: "OrderedDict[str, None]" = OrderedDict()
+
+        self._today = date.today()
+        self._next_weather_refresh = time.monotonic() + weather_refresh_seconds
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        logger.info(f"PackageScorer initialized (tick: {interval_seconds}s, weather refresh: {weather_refresh_seconds}s)")
+
+    # -- dependency tracking ------------------------------------------------
+
+    def track(self, package: Package, assessment: Optional[RiskAssessment] = None):
+        """Start (or refresh) tracking a package's inputs; queue it for scoring unless a fresh assessment is given"""
+        self.untrack(package.package_id)
+        self._tracked[package.package_id] = package
+        self._by_city.setdefault(package.destination_city, set()).add(package.package_id)
+        self._by_carrier_zip.setdefault((package.carrier.value, package.destination_zip), set()).add(package.package_id)
+        self._by_date.setdefault(package.expected_delivery_date, set()).add(package.package_id)
+        if assessment is None:
+            self._mark_dirty([package.package_id])
+        else:
+            self._scores[package.package_id] = assessment
+
+    def track_transient(self, package: Package, assessment: RiskAssessment):
+        """
+        Track an unstored package (a watched ShipStation order): re-scores reach listeners but not
+        the stored change feed. Only the max_transient most recent are kept.
+        """
+        self.track(package, assessment)
+        self._transient[package.package_id] = None
+        self._transient.move_to_end(package.package_id)
+        while len(self._transient) > self.max_transient:
+            package_id, _ = self._transient.popitem(last=False)
+            if package_id not in self.store:
+                self.untrack(package_id)
+
+    def track_all(self, packages: Iterable[Package]) -> int:
+        count = 0
+        for package in packages:
+            self.track(package)
+            count += 1
+        return count
+
+    def untrack(self, package_id: str):
+        self._transient.pop(package_id, None)
+        package = self._tracked.pop(package_id, None)
+        if package is None:
+            return
+        self._discard(self._by_city, package.destination_city, package_id)
+        self._discard(self._by_carrier_zip, (package.carrier.value, package.destination_zip), package_id)
+        self._discard(self._by_date, package.expected_delivery_date, package_id)
+        self._scores.pop(package_id, None)
+        self._dirty.discard(package_id)
+
+    @staticmethod
+    def _discard(index: Dict, key, package_id: str):
+        dependents = index.get(key)
+        if dependents is not None:
+            dependents.discard(package_id)
+            if not dependents:
+                del index[key]
+
+    def _mark_dirty(self, package_ids: Iterable[str]) -> int:
+        before = len(self._dirty)
+        for package_id in package_ids:
+            self._dirty.add(package_id)
+            # A queued package no longer has a fresh score to serve
+            self._scores.pop(package_id, None)
+        added = len(self._dirty) - before
+        if added:
+            self._wakeup.set()
+        return added
+
+    # -- invalidation -------------------------------------------------------
+
+    def invalidate_performance(self, carrier: str, zip_code: str) -> int:
+        """A delivery outcome changed the carrier x zip aggregates"""
+        marked = self._mark_dirty(list(self._by_carrier_zip.get((carrier, zip_code), ())))
+        logger.info(f"Performance change for {carrier} -> {zip_code}: {marked} packages queued for re-scoring")
+        return marked
+
+    def invalidate_city_weather(self, city: str) -> int:
+        marked = self._mark_dirty(list(self._by_city.get(city, ())))
+        logger.info(f"Weather change for {city}: {marked} packages queued for re-scoring")
+        return marked
+
+    def invalidate_all(self) -> int:
+        return self._mark_dirty(list(self._tracked))
+
+    async def refresh_weather(self) -> int:
+        """Re-fetch weather for every tracked city; re-score only cities whose risk changed"""
+        weather_service = self.risk_engine.weather_service
+        marked = 0
+        for city in list(self._by_city):
+            previous = weather_service.invalidate(city)
+            try:
+                current = await weather_service.get_weather_risk(city)
+            except Exception as e:
+                logger.warning(f"Weather refresh failed for {city}: {str(e)}")
+                continue
+            if previous is None or (previous.get("risk_score"), previous.get("reasons")) != \
+                    (current.get("risk_score"), current.get("reasons")):
+                marked += self.invalidate_city_weather(city)
+        return marked
+
+    def on_day_rollover(self, today: date) -> int:
+        """Midnight: timeline proximity shifts for deliveries due soon; carrier seasonality shifts monthly"""
+        previous_day, self._today = self._today, today
+        if today.month != previous_day.month:
+            logger.info("Month changed - re-scoring all tracked packages")
+            return self.invalidate_all()
+
+        affected = []
+        for offset in range(self.DATE_PROXIMITY_WINDOW_DAYS + 1):
+            affected.extend(self._by_date.get((today + timedelta(days=offset)).strftime("%Y-%m-%d"), ()))
+        marked = self._mark_dirty(affected)
+        logger.info(f"Day rollover to {today}: {marked} packages queued for re-scoring")
+        return marked
+
+    # -- scoring ------------------------------------------------------------
+
+    def add_listener(self, listener: Callable[[str, RiskAssessment], None]):
+        """Call listener(package_id, assessment) for every package the scorer scores"""
+        self._listeners.append(listener)
+
+    def _notify(self, package_id: str, assessment: RiskAssessment):
+        for listener in self._listeners:
+            try:
+                listener(package_id, assessment)
+            except Exception as e:
+                logger.warning(f"Score listener failed for {package_id}: {str(e)}")
+
+    def get_fresh_assessment(self, package_id: str) -> Optional[RiskAssessment]:
+        """Latest stored score for a package, or None if it is untracked or queued"""
+        return self._scores.get(package_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    async def score_packages(self, packages: List[Package], persist_routes: bool = False) -> List[Tuple[str, int, List[str]]]:
+        """
+        Score packages, store the results (and change feed entries) and return them.
+        Route distances are only stored with persist_routes (background re-scoring).
+        """
+        scores = []
+        await self.risk_engine.prefetch_routes(packages, persist=persist_routes)
+        for package in packages:
+            try:
+                assessment = await self.risk_engine.calculate_risk_score(package)
+                scores.append((package.package_id, assessment.risk_score, assessment.reasons, assessment.factors))
+                # Only cache if the package wasn't replaced while we were scoring it
+                if self._tracked.get(package.package_id) is package:
+                    self._scores[package.package_id] = assessment
+                self._notify(package.package_id, assessment)
+            except Exception as e:
+                logger.warning(f"Background scoring failed for {package.package_id}: {str(e)}")
+
+        # Unstored packages have no row to update and must not produce change feed entries
+        await self.db.record_risk_scores([score for score in scores if score[0] not in self._transient])
+        return [(package_id, risk_score, reasons) for package_id, risk_score, reasons, _ in scores]
+
+    async def process_dirty(self) -> int:
+        """Re-score queued packages in batches, yielding to the event loop between batches"""
+        scored = 0
+        while self._dirty:
+            batch_ids = [self._dirty.pop() for _ in range(min(self.batch_size, len(self._dirty)))]
+            batch = [self._tracked[package_id] for package_id in batch_ids if package_id in self._tracked]
+            try:
+                scored += len(await self.score_packages(batch, persist_routes=True))
+            except Exception:
+                # Keep them queued (e.g. database not initialized yet) and retry next tick
+                self._dirty.update(batch_ids)
+                raise
+            await asyncio.sleep(0)
+
+        if scored:
+            logger.info(f"Background scorer re-scored {scored} packages")
+        return scored
+
+    async def run_once(self) -> int:
+        """Apply any due clock-driven invalidations, then drain the queue"""
+        today = date.today()
+        if today != self._today:
+            self.on_day_rollover(today)
+
+        if time.monotonic() >= self._next_weather_refresh:
+            self._next_weather_refresh = time.monotonic() + self.weather_refresh_seconds
+            await self.refresh_weather()
+
+        return await self.process_dirty()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Background scoring cycle failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            logger.info(f"Starting background package scorer ({len(self._tracked)} packages tracked)")
+            self._wakeup = asyncio.Event()
+            if self._dirty:
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Background package scorer stopped")
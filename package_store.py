@@ -0,0 +1,109 @@
+from models import Package
+from database import RiskDatabase, risk_db
+from mock_data import MOCK_PACKAGES
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class PackageStore:
+    """
+    Package repository: persisted in RiskDatabase, fronted by a bounded in-memory LRU.
+    Lookups that miss the LRU read through to the database. Packages indexed without being
+    persisted (the demo shipments) are pinned in memory, since the database can't reload them.
+    """
+
+    def __init__(self, db: RiskDatabase, cache_size: int = 100000):
+        self.db = db
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Package]" = OrderedDict()
+        self._pinned: Dict[str, Package] = {}
+        logger.info(f"PackageStore initialized (cache size: {cache_size})")
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._cache)
+
+    def __contains__(self, package_id: str) -> bool:
+        """In-memory check only"""
+        return package_id in self._pinned or package_id in self._cache
+
+    def _remember(self, package: Package):
+        self._pinned.pop(package.package_id, None)
+        self._cache[package.package_id] = package
+        self._cache.move_to_end(package.package_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def get(self, package_id: str) -> Optional[Package]:
+        """Lookup by package ID: memory first, then the database"""
+        package = self._pinned.get(package_id)
+        if package is not None:
+            return package
+        package = self._cache.get(package_id)
+        if package is not None:
+            self._cache.move_to_end(package_id)
+            return package
+
+        try:
+            row = await self.db.get_package(package_id)
+        except Exception as e:
+            logger.warning(f"Package lookup for {package_id} failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        package = Package(**row)
+        self._remember(package)
+        return package
+
+    def all(self) -> List[Package]:
+        """Packages currently held in memory (pinned first, then least recently used first)"""
+        return list(self._pinned.values()) + list(self._cache.values())
+
+    def index_packages(self, packages: Iterable[Package]) -> int:
+        """Pin packages in memory without persisting them"""
+        count = 0
+        for package in packages:
+            self._cache.pop(package.package_id, None)
+            self._pinned[package.package_id] = package
+            count += 1
+        return count
+
+    async def upsert_many(self, packages: List[Package]) -> int:
+        """Bulk insert/update packages in the database, then in the LRU"""
+        await self.db.upsert_packages([
+            {**package.model_dump(), "carrier": package.carrier.value}
+            for package in packages
+        ])
+        for package in packages:
+            self._remember(package)
+        return len(packages)
+
+    async def persist_index(self) -> int:
+        """Write every in-memory package to the database"""
+        return await self.upsert_many(self.all())
+
+    async def load_from_database(self, batch_size: int = 10000, limit: Optional[int] = None) -> int:
+        """Warm the LRU from the database in primary-key batches (at most cache_size packages)"""
+        limit = self.cache_size if limit is None else min(limit, self.cache_size)
+        loaded = 0
+        batches = self.db.iter_packages(batch_size=batch_size)
+        try:
+            async for batch in batches:
+                for row in batch[:limit - loaded]:
+                    self._remember(Package(**row))
+                    loaded += 1
+                if loaded >= limit:
+                    break
+        finally:
+            await batches.aclose()
+
+        logger.info(f"Loaded {loaded} packages from database ({len(self)} in memory)")
+        return loaded
+
+
+# Global package store, seeded with the demo shipments
+package_store = PackageStore(risk_db, int(os.getenv("PACKAGE_CACHE_SIZE", "100000")))
+package_store.index_packages(MOCK_PACKAGES)
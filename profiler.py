@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingService:
+    """On-demand sampling CPU profiler and allocation tracker for the running app"""
+
+    def __init__(self, sample_interval: float = 0.005, stack_depth: int = 64):
+        self.sample_interval = sample_interval
+        self.stack_depth = stack_depth
+        self._lock = asyncio.Lock()
+        logger.info(f"ProfilingService initialized (sample interval: {sample_interval * 1000:.1f}ms)")
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, duration_seconds: float, top_allocations: int = 25) -> Dict[str, Any]:
+        """Profile the event loop thread for duration_seconds while it keeps serving requests"""
+        async with self._lock:
+            # The coroutine runs on the event loop thread - that is the thread we sample
+            target_thread_id = threading.get_ident()
+            stacks: Counter = Counter()
+            stop_event = threading.Event()
+
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            baseline_snapshot = tracemalloc.take_snapshot()
+
+            sampler = threading.Thread(
+                target=self._sample_loop,
+                args=(target_thread_id, stacks, stop_event),
+                name="profiling-sampler",
+                daemon=True
+            )
+
+            logger.info(f"Starting {duration_seconds}s profile of thread {target_thread_id}")
+            started_at = time.perf_counter()
+            sampler.start()
+            try:
+                await asyncio.sleep(duration_seconds)
+            finally:
+                stop_event.set()
+                sampler.join()
+                final_snapshot = tracemalloc.take_snapshot()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+
+            elapsed = time.perf_counter() - started_at
+            allocations = self._top_allocation_sites(baseline_snapshot, final_snapshot, top_allocations)
+            total_samples = sum(stacks.values())
+            logger.info(f"Profile completed: {total_samples} samples, {len(stacks)} unique stacks in {elapsed:.2f}s")
+
+            return {
+                "duration_seconds": round(elapsed, 3),
+                "sample_interval_ms": self.sample_interval * 1000,
+                "total_samples": total_samples,
+                "unique_stacks": len(stacks),
+                "collapsed_stacks": self.format_collapsed(stacks),
+                "top_allocations": allocations
+            }
+
+    def _sample_loop(self, target_thread_id: int, stacks: Counter, stop_event: threading.Event):
+        """Periodically capture the target thread's stack until stop_event is set"""
+        while not stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(target_thread_id)
+            if frame is None:
+                continue
+
+            stack: List[str] = []
+            while frame is not None and len(stack) < self.stack_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            del frame
+
+            # Collapsed format lists frames root-first
+            stacks[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def format_collapsed(stacks: Counter) -> str:
+        """Render stack counts in the collapsed format consumed by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+    @staticmethod
+    def _top_allocation_sites(baseline: tracemalloc.Snapshot, final: tracemalloc.Snapshot,
+                              limit: int) -> List[Dict[str, Any]]:
+        """Rank source lines by memory allocated during the profiling window"""
+        ignored = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        differences = final.filter_traces(ignored).compare_to(baseline.filter_traces(ignored), "lineno")
+
+        sites = []
+        for stat in differences:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            sites.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+                "size_kb": round(stat.size / 1024, 1)
+            })
+            if len(sites) >= limit:
+                break
+        return sites
+
+
+# Global profiler instance
+profiling_service = ProfilingService()
@@ -1,93 +1,190 @@
-from models import Package, RiskAssessment, CarrierType, EnhancedRiskAssessment, RiskFactor
+from models import Package, RiskAssessment, RiskFactorVector, CarrierType, EnhancedRiskAssessment, RiskFactor, ShipStationShipment
 from weather_service import WeatherService
-from database import risk_db
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Tuple
+from database import RiskDatabase, risk_db
+from zip_reference import zip_reference
+from address_resolver import address_resolver
+from service_classifier import service_classifier
+from delivery_calendar import delivery_calendar
+from route_distance import RouteDistanceService
+from collections import OrderedDict
+from datetime import date
+from typing import List, Dict, Optional, Tuple
 import calendar
 import logging
 import math
+import os
 
 logger = logging.getLogger(__name__)
 
+# Destination approximations used when a ship-to only has a state
+STATE_DEFAULT_ZIPS = {
+    'CA': '90210',  # California -> Beverly Hills
+    'WA': '98101',  # Washington -> Seattle  
+    'NY': '10001',  # New York -> Manhattan
+    'FL': '33101',  # Florida -> Miami
+    'IL': '60601',  # Illinois -> Chicago
+    'TX': '75201',  # Texas -> Dallas
+    'FR': '75001',  # France -> Paris (mock)
+    'UK': '10001',  # UK -> treat as NY for demo
+    'DE': '10001',  # Germany -> treat as NY for demo
+}
+STATE_DEFAULT_CITIES = {
+    'CA': 'Los Angeles',
+    'WA': 'Seattle',
+    'NY': 'New York', 
+    'FL': 'Miami',
+    'IL': 'Chicago',
+    'TX': 'Dallas',
+    'FR': 'Paris',
+    'UK': 'London',
+    'DE': 'Berlin'
+}
+
 
 class RiskScoringEngine:
-    def __init__(self):
+    def __init__(self, factor_cache_size: int = 10000):
         self.weather_service = WeatherService()
+        # (package fields) -> (input version, RiskFactorVector), least recently used first
+        self.factor_cache_size = factor_cache_size
+        self._factor_cache: "OrderedDict[Tuple, Tuple[Tuple, RiskFactorVector]]" = OrderedDict()
         self.db = risk_db
         logger.info("RiskScoringEngine initialized with smart database backend")
     
+    @property
+    def db(self) -> RiskDatabase:
+        return self._db
+    
+    @db.setter
+    def db(self, db: RiskDatabase):
+        # Route distances live in the same database as every other factor
+        self._db = db
+        self.route_distances = RouteDistanceService(db, zip_reference, os.getenv("DEFAULT_ORIGIN_ZIP", "10001"))
+    
+    async def get_factor_vector(self, package: Package) -> RiskFactorVector:
+        """
+        Compute every raw risk factor for a package once.
+        Memoized per package and input version (risk data version, city weather version, today),
+        so the basic and enhanced scores for the same package share one set of lookups.
+        """
+        key = (package.package_id, package.destination_zip, package.destination_city,
+               package.carrier.value, package.expected_delivery_date, package.origin_zip)
+        version = (self.db.db_path, await self.db.get_data_version(),
+                   self.weather_service.cache_version(package.destination_city), date.today())
+        
+        cached = self._factor_cache.get(key)
+        if cached is not None and cached[0] == version:
+            self._factor_cache.move_to_end(key)
+            logger.debug(f"Factor vector cache HIT for {package.package_id}")
+            return cached[1]
+        
+        carrier_risk = await self.db.get_carrier_risk(package.carrier.value)
+        geographic_risk = await self.db.get_geographic_risk(package.destination_zip)
+        performance_risk = await self.db.get_delivery_performance_risk(package.carrier.value, package.destination_zip)
+        
+        try:
+            logger.info(f"Fetching weather risk for {package.destination_city}...")
+            weather_risk_data = await self.weather_service.get_weather_risk(package.destination_city)
+            weather_risk = weather_risk_data.get("risk_score", 0)
+            weather_reasons = weather_risk_data.get("reasons", [])
+            weather_available = True
+        except Exception as e:
+            # If weather service fails, add moderate risk
+            weather_risk = 10
+            weather_reasons = []
+            weather_available = False
+            logger.error(f"Weather service failed: {str(e)} - adding default risk (+10 points)")
+        
+        temporal_risk, temporal_reasons = await self.db.get_temporal_risk(package.expected_delivery_date)
+        
+        factors = RiskFactorVector(
+            carrier=carrier_risk,
+            geographic=geographic_risk,
+            performance=performance_risk,
+            weather=weather_risk,
+            weather_reasons=weather_reasons,
+            weather_available=weather_available,
+            temporal=temporal_risk,
+            temporal_reasons=temporal_reasons,
+            timeline=self._calculate_date_proximity_risk(package.expected_delivery_date),
+            route=await self._get_route_risk(package)
+        )
+        
+        # Don't pin a weather outage: retry the lookup next time
+        if weather_available:
+            self._factor_cache[key] = (version, factors)
+            self._factor_cache.move_to_end(key)
+            while len(self._factor_cache) > self.factor_cache_size:
+                self._factor_cache.popitem(last=False)
+        return factors
+    
     async def calculate_risk_score(self, package: Package) -> RiskAssessment:
         """Calculate comprehensive risk score using smart database-driven analysis"""
         logger.info(f"Calculating smart risk score for package {package.package_id}")
         logger.info(f"Package details: {package.destination_city}, {package.destination_zip}, {package.carrier}, delivery: {package.expected_delivery_date}")
         
-        total_risk = 0
+        vector = await self.get_factor_vector(package)
+        return self._project_risk_assessment(package, vector)
+    
+    def _project_risk_assessment(self, package: Package, factors: RiskFactorVector) -> RiskAssessment:
+        """Additive score: sum of all factor points, capped at 100"""
         reasons = []
         
         # 1. Carrier-based risk (from historical performance data)
-        carrier_risk = await self.db.get_carrier_risk(package.carrier.value)
-        total_risk += carrier_risk
-        logger.info(f"Database carrier risk ({package.carrier}): +{carrier_risk} points")
-        if carrier_risk > 15:
+        logger.info(f"Database carrier risk ({package.carrier}): +{factors.carrier} points")
+        if factors.carrier > 15:
             reasons.append(f"{package.carrier} has historical delivery challenges")
             logger.info(f"High carrier risk detected for {package.carrier}")
         
         # 2. Geographic risk (from database analysis)
-        geographic_risk = await self.db.get_geographic_risk(package.destination_zip)
-        total_risk += geographic_risk
-        logger.info(f"Database geographic risk ({package.destination_zip}): +{geographic_risk} points")
-        if geographic_risk > 15:
+        logger.info(f"Database geographic risk ({package.destination_zip}): +{factors.geographic} points")
+        if factors.geographic > 15:
             reasons.append(f"destination {package.destination_zip} has delivery complexity")
             logger.info(f"High geographic risk for zip {package.destination_zip}")
         
         # 3. Carrier-Zip specific performance (historical combination data)
-        performance_risk = await self.db.get_delivery_performance_risk(package.carrier.value, package.destination_zip)
-        total_risk += performance_risk
-        logger.info(f"Historical performance risk ({package.carrier} to {package.destination_zip}): +{performance_risk} points")
-        if performance_risk > 10:
+        logger.info(f"Historical performance risk ({package.carrier} to {package.destination_zip}): +{factors.performance} points")
+        if factors.performance > 10:
             reasons.append(f"{package.carrier} has specific issues delivering to {package.destination_zip}")
         
         # 4. Weather-based risk (real-time data)
-        try:
-            logger.info(f"Fetching weather risk for {package.destination_city}...")
-            weather_risk_data = await self.weather_service.get_weather_risk(package.destination_city)
-            weather_risk = weather_risk_data.get("risk_score", 0)
-            weather_reasons = weather_risk_data.get("reasons", [])
-            
-            total_risk += weather_risk
-            reasons.extend(weather_reasons)
-            logger.info(f"Weather risk: +{weather_risk} points, reasons: {weather_reasons}")
-        except Exception as e:
-            # If weather service fails, add moderate risk
-            total_risk += 10
+        if factors.weather_available:
+            reasons.extend(factors.weather_reasons)
+            logger.info(f"Weather risk: +{factors.weather} points, reasons: {factors.weather_reasons}")
+        else:
             reasons.append("weather data unavailable")
-            logger.error(f"Weather service failed: {str(e)} - adding default risk (+10 points)")
         
         # 5. Temporal/seasonal patterns (from database)
-        temporal_risk, temporal_reasons = await self.db.get_temporal_risk(package.expected_delivery_date)
-        total_risk += temporal_risk
-        reasons.extend(temporal_reasons)
-        logger.info(f"Database temporal risk: +{temporal_risk} points, reasons: {temporal_reasons}")
+        reasons.extend(factors.temporal_reasons)
+        logger.info(f"Database temporal risk: +{factors.temporal} points, reasons: {factors.temporal_reasons}")
         
         # 6. Delivery date proximity (immediate timeline risk)
-        date_risk = self._calculate_date_proximity_risk(package.expected_delivery_date)
-        total_risk += date_risk
-        logger.info(f"Delivery timeline risk: +{date_risk} points")
-        if date_risk > 15:
+        logger.info(f"Delivery timeline risk: +{factors.timeline} points")
+        if factors.timeline > 15:
             reasons.append("tight delivery timeline")
             logger.info(f"Tight delivery timeline detected")
         
+        total_risk = (factors.carrier + factors.geographic + factors.performance +
+                      factors.weather + factors.temporal + factors.timeline)
+        
         # Cap the risk score at 100
         final_risk_score = min(total_risk, 100)
         logger.info(f"SMART RISK CALCULATION for {package.package_id}:")
-        logger.info(f"   Carrier: {carrier_risk} + Geographic: {geographic_risk} + Performance: {performance_risk}")
-        logger.info(f"   Weather: {weather_risk_data.get('risk_score', 10) if 'weather_risk_data' in locals() else 10} + Temporal: {temporal_risk} + Timeline: {date_risk}")
+        logger.info(f"   Carrier: {factors.carrier} + Geographic: {factors.geographic} + Performance: {factors.performance}")
+        logger.info(f"   Weather: {factors.weather} + Temporal: {factors.temporal} + Timeline: {factors.timeline}")
         logger.info(f"   Total: {total_risk} -> Final (capped): {final_risk_score}")
         logger.info(f"   Risk reasons: {reasons}")
         
         return RiskAssessment(
             risk_score=final_risk_score,
-            reasons=reasons if reasons else ["low risk delivery"]
+            reasons=reasons if reasons else ["low risk delivery"],
+            factors={
+                "carrier": factors.carrier,
+                "geographic": factors.geographic,
+                "performance": factors.performance,
+                "weather": factors.weather,
+                "temporal": factors.temporal,
+                "timeline": factors.timeline
+            }
         )
     
     async def record_delivery_outcome(self, package_id: str, carrier: str, 
@@ -102,23 +199,20 @@ class RiskScoringEngine:
     
     def _calculate_date_proximity_risk(self, delivery_date_str: str) -> int:
         """Calculate risk based on how soon the delivery is expected"""
-        try:
-            delivery_date = datetime.strptime(delivery_date_str, "%Y-%m-%d").date()
-            today = date.today()
-            
-            days_until_delivery = (delivery_date - today).days
-            
-            if days_until_delivery <= 0:
-                return 25  # Same day or overdue
-            elif days_until_delivery == 1:
-                return 20  # Next day
-            elif days_until_delivery <= 3:
-                return 10  # Within 3 days
-            else:
-                return 0   # More than 3 days
-                
-        except ValueError:
+        delivery_day = delivery_calendar.day(delivery_date_str)
+        if delivery_day is None:
             return 5  # Invalid date format
+        
+        days_until_delivery = delivery_calendar.days_from_today(delivery_day)
+        
+        if days_until_delivery <= 0:
+            return 25  # Same day or overdue
+        elif days_until_delivery == 1:
+            return 20  # Next day
+        elif days_until_delivery <= 3:
+            return 10  # Within 3 days
+        else:
+            return 0   # More than 3 days
     
     def get_risk_level_description(self, risk_score: int) -> str:
         """Convert numeric risk score to human-readable description"""
@@ -138,8 +232,31 @@ class RiskScoringEngine:
         else:
             return "low"
     
+    async def prefetch_routes(self, packages: List[Package], persist: bool = False):
+        """Resolve route distances for a batch of packages with one lookup per origin (stored with persist)"""
+        by_origin: Dict[str, List[str]] = {}
+        for package in packages:
+            origin_zip = package.origin_zip or self.route_distances.default_origin_zip
+            by_origin.setdefault(origin_zip, []).append(package.destination_zip)
+        try:
+            for origin_zip, destination_zips in by_origin.items():
+                await self.route_distances.get_distances(destination_zips, origin_zip, persist=persist)
+        except Exception as e:
+            logger.warning(f"Route distance prefetch failed: {str(e)}")
+    
+    async def _get_route_risk(self, package: Package) -> int:
+        """Route risk from the great-circle distance origin -> destination, zip-range estimate if unknown"""
+        try:
+            route_risk = await self.route_distances.get_route_risk(package.destination_zip, package.origin_zip)
+        except Exception as e:
+            logger.warning(f"Route distance lookup failed for {package.package_id}: {str(e)}")
+            route_risk = None
+        if route_risk is None:
+            return self._estimate_route_distance(package.destination_zip)
+        return route_risk
+    
     def _estimate_route_distance(self, destination_zip: str) -> int:
-        """Estimate route distance and complexity based on zip code"""
+        """Estimate route distance and complexity based on zip code (fallback when no centroid is known)"""
         # Simple distance estimation based on zip code patterns
         # In production, you'd use actual routing APIs
         zip_num = int(destination_zip[:5]) if destination_zip.isdigit() and len(destination_zip) >= 5 else 50000
@@ -192,37 +309,29 @@ class RiskScoringEngine:
     
     def _calculate_revised_delivery_date(self, original_date: str, delay_days: int) -> str:
         """Calculate revised delivery date"""
-        try:
-            original = datetime.strptime(original_date, "%Y-%m-%d")
-            revised = original + timedelta(days=delay_days)
-            return revised.strftime("%Y-%m-%dT00:00:00Z")
-        except ValueError:
+        original = delivery_calendar.day(original_date)
+        if original is None:
             # Fallback if date parsing fails
-            return datetime.now().strftime("%Y-%m-%dT00:00:00Z")
+            return f"{delivery_calendar.today().iso}T00:00:00Z"
+        # Carriers don't deliver on Sundays or carrier holidays
+        revised = delivery_calendar.next_delivery_day(delivery_calendar.shift(original, delay_days))
+        return f"{revised.iso}T00:00:00Z"
     
     async def calculate_enhanced_risk_assessment(self, package: Package) -> EnhancedRiskAssessment:
         """Calculate enhanced risk assessment for frontend API"""
         logger.info(f"Calculating enhanced risk assessment for package {package.package_id}")
         
-        # Get individual factor scores
-        carrier_risk = await self.db.get_carrier_risk(package.carrier.value)
-        geographic_risk = await self.db.get_geographic_risk(package.destination_zip)
-        performance_risk = await self.db.get_delivery_performance_risk(package.carrier.value, package.destination_zip)
-        route_risk = self._estimate_route_distance(package.destination_zip)
-        
-        # Get weather risk
-        weather_risk = 0
-        weather_reasons = []
-        has_weather_data = False
-        try:
-            weather_data = await self.weather_service.get_weather_risk(package.destination_city)
-            weather_risk = weather_data.get("risk_score", 0)
-            weather_reasons = weather_data.get("reasons", [])
-            has_weather_data = True
-        except Exception as e:
-            weather_risk = 10  # Default weather risk
-            weather_reasons = ["weather data unavailable"]
-            logger.warning(f"Weather service failed: {str(e)}")
+        vector = await self.get_factor_vector(package)
+        return self._project_enhanced_assessment(package, vector)
+    
+    def _project_enhanced_assessment(self, package: Package, vector: RiskFactorVector) -> EnhancedRiskAssessment:
+        """Weighted score over carrier, route, weather and current-delay factors"""
+        carrier_risk = vector.carrier
+        performance_risk = vector.performance
+        route_risk = vector.route
+        weather_risk = vector.weather
+        weather_reasons = vector.weather_reasons if vector.weather_available else ["weather data unavailable"]
+        has_weather_data = vector.weather_available
         
         # Calculate weighted overall score (matching frontend requirements)
         # Carrier Performance: 30%, Route Distance: 25%, Weather: 25%, Current Delays: 20%
@@ -281,78 +390,60 @@ class RiskScoringEngine:
             revisedDeliveryDate=revised_date
         )
     
-    def _map_shipstation_to_package(self, shipment: dict) -> Package:
+    def map_shipstation_to_package(self, shipment: dict) -> Package:
         """Convert ShipStation shipment to our internal Package format"""
-        # Extract basic info
-        package_id = shipment.get('fulfillmentPlanId', shipment.get('orderNumber', 'UNKNOWN'))
-        
-        # Map destination - use state code as zip approximation
-        # In production, you'd want proper address resolution
-        state_to_zip_mapping = {
-            'CA': '90210',  # California -> Beverly Hills
-            'WA': '98101',  # Washington -> Seattle  
-            'NY': '10001',  # New York -> Manhattan
-            'FL': '33101',  # Florida -> Miami
-            'IL': '60601',  # Illinois -> Chicago
-            'TX': '75201',  # Texas -> Dallas
-            'FR': '75001',  # France -> Paris (mock)
-            'UK': '10001',  # UK -> treat as NY for demo
-            'DE': '10001',  # Germany -> treat as NY for demo
-        }
+        return self._build_shipstation_package(
+            package_id=shipment.get('fulfillmentPlanId', shipment.get('orderNumber', 'UNKNOWN')),
+            state=shipment.get('state', 'CA'),
+            requested_service=shipment.get('requestedService', ''),
+            service_name=shipment.get('serviceName'),
+            ship_by=shipment.get('shipByDateTime', shipment.get('orderDateTime', '')),
+            city=shipment.get('city'),
+            postal_code=shipment.get('postalCode'),
+            country_code=shipment.get('countryCode')
+        )
+    
+    def map_shipstation_shipment_to_package(self, shipment: ShipStationShipment) -> Package:
+        """Convert an already-validated ShipStation shipment model without a dict round-trip"""
+        return self._build_shipstation_package(
+            package_id=shipment.fulfillmentPlanId,
+            state=shipment.state,
+            requested_service=shipment.requestedService,
+            service_name=shipment.serviceName,
+            ship_by=shipment.shipByDateTime,
+            country_code=shipment.countryCode
+        )
+    
+    def _resolve_shipstation_destination(self, state: str, city: Optional[str], postal_code: Optional[str],
+                                         country_code: Optional[str]) -> Tuple[str, str]:
+        """Destination (zip, city) for a ShipStation ship-to: postal code, then city, then state"""
+        resolved = address_resolver.resolve(country_code, state, city, postal_code)
+        if resolved is not None and resolved.source != 'state':
+            return resolved.zip_code, resolved.city or city
+        
+        # Only the state is usable - keep the long-standing per-state defaults
+        if state in STATE_DEFAULT_ZIPS:
+            return STATE_DEFAULT_ZIPS[state], city or STATE_DEFAULT_CITIES[state]
+        if resolved is not None:
+            return resolved.zip_code, city or resolved.city
+        return '90210', city or 'Los Angeles'  # Default to CA
+    
+    def _build_shipstation_package(self, package_id: str, state: str, requested_service: str,
+                                   service_name: Optional[str], ship_by: str, city: Optional[str] = None,
+                                   postal_code: Optional[str] = None, country_code: Optional[str] = None) -> Package:
+        """Build our internal Package from the ShipStation fields used for scoring"""
+        destination_zip, destination_city = self._resolve_shipstation_destination(state, city, postal_code, country_code)
         
-        state = shipment.get('state', 'CA')
-        destination_zip = state_to_zip_mapping.get(state, '90210')  # Default to CA
-        
-        # Map destination city from state
-        state_to_city_mapping = {
-            'CA': 'Los Angeles',
-            'WA': 'Seattle',
-            'NY': 'New York', 
-            'FL': 'Miami',
-            'IL': 'Chicago',
-            'TX': 'Dallas',
-            'FR': 'Paris',
-            'UK': 'London',
-            'DE': 'Berlin'
-        }
-        destination_city = state_to_city_mapping.get(state, 'Los Angeles')
-        
-        # Map carrier from service info
-        requested_service = shipment.get('requestedService', '').lower()
-        service_name = shipment.get('serviceName', '').lower() if shipment.get('serviceName') else ''
-        
-        # Determine carrier from service description
-        if 'ups' in requested_service or 'ups' in service_name:
-            carrier = CarrierType.UPS
-        elif 'fedex' in requested_service or 'fedex' in service_name:
-            carrier = CarrierType.FEDEX
-        elif 'usps' in requested_service or 'first class' in requested_service or 'priority' in requested_service:
-            carrier = CarrierType.USPS
-        elif 'dhl' in requested_service or 'dhl' in service_name:
-            carrier = CarrierType.DHL
-        else:
-            # Default based on service characteristics
-            if 'cheapest' in requested_service or 'first class' in requested_service:
-                carrier = CarrierType.USPS  # Cheapest usually USPS
-            else:
-                carrier = CarrierType.UPS   # Default to UPS
+        carrier = service_classifier.classify(requested_service, service_name)
         
         # Use shipByDateTime as delivery date, or estimate from order date
-        ship_by = shipment.get('shipByDateTime', shipment.get('orderDateTime', ''))
-        if ship_by:
-            try:
-                # Parse the ship by date and add 2-3 days for delivery
-                from datetime import datetime, timedelta
-                ship_date = datetime.fromisoformat(ship_by.replace('Z', '+00:00'))
-                estimated_delivery = ship_date + timedelta(days=2)  # Add 2 days for delivery
-                expected_delivery_date = estimated_delivery.strftime('%Y-%m-%d')
-            except:
-                # Fallback to a future date
-                from datetime import datetime, timedelta
-                expected_delivery_date = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+        ship_day = delivery_calendar.day_of_datetime(ship_by) if ship_by else None
+        if ship_day is not None:
+            # Add 2 days for delivery to the ship by date
+            expected_delivery_date = delivery_calendar.shift(ship_day, 2).iso
         else:
-            from datetime import datetime, timedelta
-            expected_delivery_date = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+            # Fallback to a future date
+            expected_delivery_date = delivery_calendar.shift(delivery_calendar.today(), 3).iso
         
         return Package(
             package_id=package_id,
@@ -361,18 +452,3 @@ class RiskScoringEngine:
             carrier=carrier,
             expected_delivery_date=expected_delivery_date
         )
-    
-    async def calculate_shipstation_risk_score(self, shipment: dict) -> int:
-        """Calculate just the risk score for ShipStation shipment enrichment"""
-        try:
-            # Convert to our internal format
-            package = self._map_shipstation_to_package(shipment)
-            
-            # Get basic risk assessment
-            risk_assessment = await self.calculate_risk_score(package)
-            
-            return risk_assessment.risk_score
-        except Exception as e:
-            logger.warning(f"Error calculating risk for shipment {shipment.get('fulfillmentPlanId', 'UNKNOWN')}: {str(e)}")
-            # Return default medium risk if calculation fails
-            return 50
\ No newline at end of file
@@ -0,0 +1,131 @@
+from database import RiskDatabase
+from zip_reference import ZipReference
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_MILES = 3958.8
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in miles"""
+    return haversine_miles_batch((lat1, lon1), [(lat2, lon2)])[0]
+
+
+def haversine_miles_batch(origin: Tuple[float, float], destinations: Sequence[Tuple[float, float]]) -> List[float]:
+    """Great-circle distances from one origin to many destinations; origin terms are computed once"""
+    lat1 = math.radians(origin[0])
+    lon1 = math.radians(origin[1])
+    cos_lat1 = math.cos(lat1)
+    radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+
+    distances = []
+    for lat, lon in destinations:
+        lat2 = radians(lat)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(lon) - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_MILES * asin(min(1.0, sqrt(a))))
+    return distances
+
+
+def route_risk_from_distance(distance_miles: int, rural_destination: bool = False) -> int:
+    """Route risk (0-100) from distance: ~20 for local, ~70 coast to coast; rural last miles add 10"""
+    risk = 20 + distance_miles // 50
+    if rural_destination:
+        risk += 10
+    return int(min(risk, 90))
+
+
+class RouteDistanceService:
+    """
+    Origin -> destination route distances from ZIP centroids (haversine).
+    Lookups go through an LRU of recent pairs, then route_performance (which may also hold
+    distances from other sources), and only then are computed. Computed distances are written
+    to route_performance only by callers that ask for it (background scoring), so request
+    paths stay read-only.
+    """
+
+    def __init__(self, db: RiskDatabase, reference: ZipReference, default_origin_zip: str,
+                 cache_size: int = 50000):
+        self.db = db
+        self.reference = reference
+        self.default_origin_zip = default_origin_zip
+        self.cache_size = cache_size
+        # (origin zip, destination zip) -> miles, None when either centroid is unknown
+        self._cache: "OrderedDict[Tuple[str, str], Optional[int]]" = OrderedDict()
+        # Cached pairs computed here but not yet stored in route_performance
+        self._unsaved: Set[Tuple[str, str]] = set()
+        logger.info(f"RouteDistanceService initialized (default origin: {default_origin_zip}, cache size: {cache_size})")
+
+    def _remember(self, key: Tuple[str, str], miles: Optional[int]):
+        self._cache[key] = miles
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._unsaved.discard(evicted)
+
+    def _compute(self, origin_zip: str, destination_zips: List[str]) -> Dict[str, Optional[int]]:
+        origin = self.reference.lookup(origin_zip)
+        results: Dict[str, Optional[int]] = {zip_code: None for zip_code in destination_zips}
+        if origin is None:
+            return results
+
+        known = [(zip_code, self.reference.lookup(zip_code)) for zip_code in destination_zips]
+        known = [(zip_code, info) for zip_code, info in known if info is not None]
+        distances = haversine_miles_batch((origin.lat, origin.lon), [(info.lat, info.lon) for _, info in known])
+        for (zip_code, _), miles in zip(known, distances):
+            results[zip_code] = int(round(miles))
+        return results
+
+    async def get_distances(self, destination_zips: Iterable[str], origin_zip: Optional[str] = None,
+                            persist: bool = False) -> Dict[str, Optional[int]]:
+        """
+        Distances in miles from origin_zip (default origin if None) to each destination.
+        With persist, distances computed here (now or by earlier lookups) are stored in route_performance.
+        """
+        origin_zip = origin_zip or self.default_origin_zip
+        results: Dict[str, Optional[int]] = {}
+        misses = []
+        for zip_code in dict.fromkeys(destination_zips):
+            key = (origin_zip, zip_code)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results[zip_code] = self._cache[key]
+            else:
+                misses.append(zip_code)
+
+        if misses:
+            stored = await self.db.get_route_distances(origin_zip, misses)
+            to_compute = [zip_code for zip_code in misses if zip_code not in stored]
+            computed = self._compute(origin_zip, to_compute) if to_compute else {}
+            for zip_code in misses:
+                key = (origin_zip, zip_code)
+                if zip_code in stored:
+                    miles = stored[zip_code]
+                else:
+                    miles = computed.get(zip_code)
+                    if miles is not None:
+                        self._unsaved.add(key)
+                self._remember(key, miles)
+                results[zip_code] = miles
+
+        if persist:
+            new_rows = [(origin_zip, zip_code, miles) for zip_code, miles in results.items()
+                        if (origin_zip, zip_code) in self._unsaved]
+            if new_rows:
+                await self.db.record_route_distances(new_rows)
+                self._unsaved.difference_update((origin_zip, zip_code) for _, zip_code, _ in new_rows)
+        return results
+
+    async def get_distance(self, destination_zip: str, origin_zip: Optional[str] = None) -> Optional[int]:
+        return (await self.get_distances([destination_zip], origin_zip))[destination_zip]
+
+    async def get_route_risk(self, destination_zip: str, origin_zip: Optional[str] = None) -> Optional[int]:
+        """Route risk for the pair, None if either end has no known centroid"""
+        miles = await self.get_distance(destination_zip, origin_zip)
+        if miles is None:
+            return None
+        destination = self.reference.lookup(destination_zip)
+        return route_risk_from_distance(miles, destination is not None and destination.urban_rural == "rural")
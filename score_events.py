@@ -0,0 +1,128 @@
+from models import RiskAssessment
+from json_response import dumps
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data) -> bytes:
+    """Encode one Server-Sent Events message"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class ScoreSubscription:
+    """
+    One push connection subscribed to a set of fulfillmentPlanIds.
+    Pending updates are coalesced per ID (latest score wins), so a slow client holds at most
+    one queued update per subscribed ID and publishers never wait on it.
+    """
+
+    def __init__(self, package_ids: Iterable[str], min_delta: int, baselines: Optional[Dict[str, int]] = None):
+        self.package_ids: Set[str] = set(package_ids)
+        self.min_delta = min_delta
+        self._last_sent: Dict[str, int] = dict(baselines or {})
+        self._pending: Dict[str, Dict] = {}
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+
+    def offer(self, package_id: str, assessment: RiskAssessment):
+        """Queue an update if the score moved at least min_delta from what the client last saw"""
+        previous = self._last_sent.get(package_id)
+        if package_id in self._pending:
+            self.coalesced += 1
+
+        if previous is not None and abs(assessment.risk_score - previous) < self.min_delta:
+            # Also drops a queued update if the score moved back before it was delivered
+            self._pending.pop(package_id, None)
+            return
+
+        self._pending[package_id] = {
+            "fulfillmentPlanId": package_id,
+            "riskScore": assessment.risk_score,
+            "previousRiskScore": previous,
+            "reasons": assessment.reasons
+        }
+        self._ready.set()
+
+    def drain(self) -> List[Dict]:
+        """Take every pending update; the client is now considered to have seen them"""
+        updates = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        for update in updates:
+            self._last_sent[update["fulfillmentPlanId"]] = update["riskScore"]
+        return updates
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for pending updates; False if none arrived within timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class ScoreEventBroker:
+    """Fans re-scoring results out to the push connections subscribed to each package"""
+
+    def __init__(self, max_subscriptions: int = 1000):
+        self.max_subscriptions = max_subscriptions
+        self._subscriptions: Set[ScoreSubscription] = set()
+        self._by_package: Dict[str, Set[ScoreSubscription]] = {}
+        logger.info(f"ScoreEventBroker initialized (max subscriptions: {max_subscriptions})")
+
+    @property
+    def subscription_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, package_ids: Iterable[str], min_delta: int,
+                  baselines: Optional[Dict[str, int]] = None) -> ScoreSubscription:
+        if len(self._subscriptions) >= self.max_subscriptions:
+            raise RuntimeError("Too many open score subscriptions")
+
+        subscription = ScoreSubscription(package_ids, min_delta, baselines)
+        self._subscriptions.add(subscription)
+        for package_id in subscription.package_ids:
+            self._by_package.setdefault(package_id, set()).add(subscription)
+        logger.info(f"Score subscription opened for {len(subscription.package_ids)} IDs ({len(self._subscriptions)} open)")
+        return subscription
+
+    def unsubscribe(self, subscription: ScoreSubscription):
+        if subscription not in self._subscriptions:
+            return
+        self._subscriptions.discard(subscription)
+        for package_id in subscription.package_ids:
+            subscribers = self._by_package.get(package_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_package[package_id]
+        logger.info(f"Score subscription closed ({len(self._subscriptions)} open, {subscription.coalesced} updates coalesced)")
+
+    def publish(self, package_id: str, assessment: RiskAssessment):
+        """Scorer listener: offer the new score to every subscriber of this package"""
+        for subscription in self._by_package.get(package_id, ()):
+            subscription.offer(package_id, assessment)
+
+
+async def stream_score_events(broker: ScoreEventBroker, subscription: ScoreSubscription,
+                              heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """
+    SSE body for one subscription. Sends a heartbeat comment when idle so proxies keep the
+    connection open and a dead client is detected on the next write; unsubscribes on exit.
+    """
+    try:
+        yield b"retry: 5000\n" + format_sse("subscribed", {
+            "fulfillmentPlanIds": sorted(subscription.package_ids),
+            "minDelta": subscription.min_delta
+        })
+        while True:
+            if await subscription.wait(heartbeat_seconds):
+                for update in subscription.drain():
+                    yield format_sse("score", update)
+            else:
+                yield b": heartbeat\n\n"
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,110 @@
+from models import CarrierType
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Rules in priority order: the first rule with a keyword in the service strings wins.
+# Keywords are case-insensitive substrings; "fields" limits a rule to requested_service
+# and/or service_name (both by default).
+DEFAULT_CARRIER_RULES: List[Dict] = [
+    {"carrier": "UPS", "keywords": ["ups"]},
+    {"carrier": "FedEx", "keywords": ["fedex"]},
+    {"carrier": "USPS", "keywords": ["usps", "first class", "priority"], "fields": ["requested_service"]},
+    {"carrier": "DHL", "keywords": ["dhl"]},
+    {"carrier": "OnTrac", "keywords": ["ontrac"]},
+    {"carrier": "LaserShip", "keywords": ["lasership", "laser ship"]},
+    {"carrier": "Canada Post", "keywords": ["canada post", "canadapost", "postes canada"]},
+    # No carrier named - cheapest services usually go USPS, everything else UPS
+    {"carrier": "USPS", "keywords": ["cheapest"], "fields": ["requested_service"]}
+]
+DEFAULT_CARRIER = "UPS"
+SERVICE_FIELDS = ("requested_service", "service_name")
+
+
+class ServiceClassifier:
+    """
+    Maps ShipStation requestedService / serviceName strings to a carrier.
+    All keywords are compiled into one alternation regex per field (named group per rule),
+    and classifications are memoized, so the recurring service strings cost one dict hit.
+    Rules come from a JSON file ({"rules": [...], "default": "UPS"}) when one is configured.
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None, default_carrier: str = DEFAULT_CARRIER,
+                 cache_size: int = 4096):
+        self.default_carrier = CarrierType(default_carrier)
+        self.cache_size = cache_size
+        self._carriers: List[CarrierType] = []
+        self._patterns: Dict[str, Optional[re.Pattern]] = {}
+        self._cache: "OrderedDict[Tuple[str, str], CarrierType]" = OrderedDict()
+        self._compile(DEFAULT_CARRIER_RULES if rules is None else rules)
+
+    @classmethod
+    def from_file(cls, path: str, cache_size: int = 4096) -> "ServiceClassifier":
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config["rules"], config.get("default", DEFAULT_CARRIER), cache_size)
+
+    def _compile(self, rules: List[Dict]):
+        alternatives: Dict[str, List[str]] = {field: [] for field in SERVICE_FIELDS}
+        for rule in rules:
+            try:
+                carrier = CarrierType(rule["carrier"])
+            except ValueError:
+                logger.warning(f"Skipping service rule for unknown carrier '{rule['carrier']}'")
+                continue
+            keywords = "|".join(re.escape(keyword.lower()) for keyword in rule["keywords"] if keyword)
+            if not keywords:
+                continue
+            group = f"r{len(self._carriers)}"
+            self._carriers.append(carrier)
+            for field in rule.get("fields", SERVICE_FIELDS):
+                alternatives[field].append(f"(?P<{group}>{keywords})")
+
+        self._patterns = {field: re.compile("|".join(parts)) if parts else None
+                          for field, parts in alternatives.items()}
+        logger.info(f"ServiceClassifier compiled {len(self._carriers)} carrier rules")
+
+    def _first_rule(self, field: str, text: str) -> Optional[int]:
+        pattern = self._patterns[field]
+        if pattern is None or not text:
+            return None
+        matched = [int(match.lastgroup[1:]) for match in pattern.finditer(text)]
+        return min(matched) if matched else None
+
+    def _classify(self, requested_service: str, service_name: str) -> CarrierType:
+        matches = [rule for rule in (self._first_rule("requested_service", requested_service),
+                                     self._first_rule("service_name", service_name)) if rule is not None]
+        return self._carriers[min(matches)] if matches else self.default_carrier
+
+    def classify(self, requested_service: Optional[str], service_name: Optional[str] = None) -> CarrierType:
+        """Carrier for a ShipStation service description"""
+        key = ((requested_service or "").lower(), (service_name or "").lower())
+        carrier = self._cache.get(key)
+        if carrier is not None:
+            self._cache.move_to_end(key)
+            return carrier
+
+        carrier = self._classify(*key)
+        self._cache[key] = carrier
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return carrier
+
+
+def load_service_classifier(path: Optional[str]) -> ServiceClassifier:
+    """Classifier from the configured rules file, falling back to the built-in rules"""
+    if path:
+        try:
+            return ServiceClassifier.from_file(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load carrier service rules from {path} ({str(e)}) - using built-in rules")
+    return ServiceClassifier()
+
+
+# Global service classifier instance
+service_classifier = load_service_classifier(os.getenv("CARRIER_SERVICE_RULES"))
@@ -0,0 +1,109 @@
+"""
+Tests for the background customer action processor
+"""
+
+import asyncio
+import pytest
+from action_processor import ActionProcessor
+
+
+async def record_actions(db, actions):
+    for package_id, action in actions:
+        await db.record_customer_action(package_id, action)
+
+
+class TestActionProcessor:
+    @pytest.mark.asyncio
+    async def test_processes_pending_actions_with_registered_handlers(self, db):
+        await record_actions(db, [("P1", "Accept Delay"), ("P2", "Request Refund"), ("P3", "Resend")])
+        processor = ActionProcessor(db, batch_size=2)
+
+        async def refund(action):
+            return f"Refund issued for {action['package_id']}"
+
+        processor.register("Request Refund", refund)
+        processor.register("Resend", refund)
+
+        assert await processor.run_until_idle() == 3
+        actions = await db.get_customer_actions()
+        assert all(action["processed"] for action in actions)
+        notes = {action["package_id"]: action["processing_notes"] for action in actions}
+        assert notes["P2"] == "Refund issued for P2"
+        stats = await db.get_customer_action_stats()
+        assert stats["processing_stats"] == {"total": 3, "processed": 3, "pending": 0}
+
+    @pytest.mark.asyncio
+    async def test_refund_and_resend_need_a_registered_handler(self, db):
+        """Test nothing claims a refund or resend was queued when no integration is installed"""
+        await record_actions(db, [("P1", "Request Refund"), ("P2", "Resend")])
+        processor = ActionProcessor(db, max_attempts=1, retry_delay_seconds=0)
+
+        await processor.process_batch()
+        await processor.process_batch()
+
+        actions = await db.get_customer_actions()
+        assert not any(action["processed"] for action in actions)
+        assert all("No handler configured" in action["processing_notes"] for action in actions)
+        assert processor.failed == 0
+
+    @pytest.mark.asyncio
+    async def test_custom_handler_and_bounded_concurrency(self, db):
+        await record_actions(db, [(f"P{i}", "Resend") for i in range(8)])
+        processor = ActionProcessor(db, concurrency=2)
+        running = 0
+        peak = 0
+
+        async def slow_resend(action):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "resent"
+
+        processor.register("Resend", slow_resend)
+        assert await processor.process_batch() == 8
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_handler_retried_then_given_up(self, db):
+        await record_actions(db, [("P1", "Request Refund")])
+        processor = ActionProcessor(db, max_attempts=2, retry_delay_seconds=0)
+
+        async def broken(action):
+            raise RuntimeError("payment gateway down")
+
+        processor.register("Request Refund", broken)
+
+        await processor.process_batch()
+        first = (await db.get_customer_actions())[0]
+        assert not first["processed"] and "payment gateway down" in first["processing_notes"]
+
+        await processor.process_batch()
+        final = (await db.get_customer_actions())[0]
+        assert final["processed"] and final["processing_notes"].startswith("FAILED after 2 attempts")
+        assert processor.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_claimed_actions_not_handed_out_twice_until_lease_expires(self, db):
+        await record_actions(db, [("P1", "Resend"), ("P2", "Resend")])
+
+        first = await db.claim_customer_actions(10, lease_seconds=0.05)
+        second = await db.claim_customer_actions(10, lease_seconds=0.05)
+        await asyncio.sleep(0.1)
+        # Worker never completed them: at-least-once redelivery
+        third = await db.claim_customer_actions(10, lease_seconds=60)
+
+        assert [a["package_id"] for a in first] == ["P1", "P2"]
+        assert second == []
+        assert [a["attempts"] for a in third] == [2, 2]
+
+    @pytest.mark.asyncio
+    async def test_unknown_action_is_not_marked_processed(self, db):
+        await record_actions(db, [("P1", "Upgrade Shipping")])
+        processor = ActionProcessor(db, retry_delay_seconds=60)
+
+        await processor.process_batch()
+        action = (await db.get_customer_actions())[0]
+        assert not action["processed"]
+        assert "No handler configured" in action["processing_notes"]
@@ -0,0 +1,92 @@
+"""
+Tests for ShipStation ship-to address resolution
+"""
+
+from address_resolver import AddressResolver, normalize_postal_code, normalize_city
+from risk_engine import RiskScoringEngine
+
+CSV = (
+    "zip,city,lat,lon,state,urban_rural,base_risk\n"
+    "63101,St. Louis,38.631,-90.193,MO,urban,16\n"
+    "64105,Kansas City,39.103,-94.591,MO,urban,15\n"
+    "02108,Boston,42.3576,-71.0684,MA,urban,16\n"
+)
+
+
+def make_resolver(tmp_path, **kwargs):
+    path = tmp_path / "zips.csv"
+    path.write_text(CSV)
+    return AddressResolver(str(path), **kwargs)
+
+
+class TestNormalization:
+    def test_postal_codes(self):
+        assert normalize_postal_code("02108-1234") == "02108"
+        assert normalize_postal_code("021081234") == "02108"
+        assert normalize_postal_code("2108") == "02108"
+        assert normalize_postal_code(" 98101 ") == "98101"
+        assert normalize_postal_code("12") is None
+        assert normalize_postal_code(None) is None
+        assert normalize_postal_code("sw1a  1aa", "GB") == "SW1A 1AA"
+
+    def test_city_names(self):
+        assert normalize_city("St. Louis") == normalize_city("saint louis")
+        assert normalize_city("Winston-Salem") == "winston salem"
+        assert normalize_city("  KANSAS   City ") == "kansas city"
+        assert normalize_city(None) == ""
+
+
+class TestAddressResolver:
+    def test_resolution_order(self, tmp_path):
+        resolver = make_resolver(tmp_path)
+
+        by_zip = resolver.resolve("US", "MO", "Anywhere", "02108-0001")
+        assert by_zip.zip_code == "02108" and by_zip.source == "postal_code" and by_zip.city == "Anywhere"
+        assert resolver.resolve("US", "MA", None, "2108").city == "Boston"
+
+        by_city = resolver.resolve("US", "mo", "Saint Louis")
+        assert by_city.zip_code == "63101" and by_city.source == "city" and by_city.city == "Saint Louis"
+
+        by_state = resolver.resolve("US", "MO", "Springfield")
+        assert by_state.zip_code == "63101" and by_state.source == "state"
+
+        assert resolver.resolve("US", "ZZ", "Nowhere") is None
+        assert resolver.resolve("CA", "MO", "St Louis") is None
+
+    def test_cache_is_bounded(self, tmp_path):
+        resolver = make_resolver(tmp_path, cache_size=2)
+        for city in ["St Louis", "Kansas City", "Boston", "St Louis"]:
+            resolver.resolve("US", "MO", city)
+
+        assert len(resolver._cache) == 2
+        assert ("US", "MO", "saint louis", None) in resolver._cache
+
+    def test_missing_dataset(self, tmp_path):
+        resolver = AddressResolver(str(tmp_path / "missing.csv"))
+        assert resolver.resolve("US", "MO", "St Louis") is None
+        assert resolver.resolve("US", "MO", None, "63101").zip_code == "63101"
+
+
+class TestShipStationMapping:
+    def shipment(self, **fields):
+        shipment = {"fulfillmentPlanId": "FP-1", "state": "CA", "requestedService": "UPS Ground",
+                    "shipByDateTime": "2024-01-10T00:00:00Z"}
+        shipment.update(fields)
+        return shipment
+
+    def test_postal_code_wins(self):
+        package = RiskScoringEngine().map_shipstation_to_package(
+            self.shipment(state="NY", city="Brooklyn", postalCode="11201-2345", countryCode="US"))
+        assert package.destination_zip == "11201"
+        assert package.destination_city == "Brooklyn"
+
+    def test_city_lookup(self):
+        package = RiskScoringEngine().map_shipstation_to_package(self.shipment(city="Los Angeles", countryCode="US"))
+        assert package.destination_zip == "90012"
+
+    def test_state_only_keeps_defaults(self):
+        package = RiskScoringEngine().map_shipstation_to_package(self.shipment())
+        assert (package.destination_zip, package.destination_city) == ("90210", "Los Angeles")
+
+        package = RiskScoringEngine().map_shipstation_to_package(self.shipment(state="ZZ"))
+        assert package.destination_zip == "90210"
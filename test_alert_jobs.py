@@ -0,0 +1,116 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from alert_jobs import BulkAlertJobManager
+from alert_ledger import AlertLedger
+from email_dispatcher import EmailDispatcher
+from email_service import EmailService
+from main import app
+
+client = TestClient(app)
+
+SCORES = {"BULK-A": 95, "BULK-B": 85, "BULK-C": 75, "BULK-D": 40, "BULK-E": 90}
+
+
+RECIPIENTS = {package_id: f"{package_id.lower()}@example.com" for package_id in SCORES}
+RECIPIENTS["BULK-A"] = "alice@example.com"
+
+
+@pytest.fixture
+def scored_db(db):
+    """Database holding the campaign packages with their latest risk scores"""
+    async def seed():
+        await db.upsert_packages([
+            {
+                "package_id": package_id,
+                "destination_zip": "98101",
+                "destination_city": "Seattle",
+                "carrier": "DHL" if package_id == "BULK-E" else "UPS",
+                "expected_delivery_date": "2030-01-01"
+            }
+            for package_id in SCORES
+        ])
+        await db.record_risk_scores([(package_id, score, ["storm & wind"], {}) for package_id, score in SCORES.items()])
+
+    asyncio.run(seed())
+    return db
+
+
+async def run_campaign(db, statuses=(), recipients=RECIPIENTS, runs=1, **criteria):
+    """Run the bulk job `runs` times against a fake SendGrid; returns the last job and all posted payloads"""
+    posted = []
+    statuses = list(statuses)
+
+    def sendgrid(request: httpx.Request) -> httpx.Response:
+        posted.append(json.loads(request.content))
+        return httpx.Response(statuses.pop(0) if statuses else 202)
+
+    email_service = EmailService()
+    email_service.mock_mode = False
+    email_service.dispatcher = EmailDispatcher(
+        "SG.test-key", db, base_url="https://sendgrid.test", max_attempts=1,
+        transport=httpx.MockTransport(sendgrid)
+    )
+    manager = BulkAlertJobManager(db, email_service, AlertLedger(db), batch_size=2, requests_per_second=1000)
+    for _ in range(runs):
+        job = manager.start_job(recipients=recipients, **criteria)
+        await manager._tasks[job.job_id]
+    await email_service.dispatcher.stop()
+    return job, posted
+
+
+class TestBulkAlerts:
+    @pytest.mark.asyncio
+    async def test_batches_high_risk_packages(self, scored_db):
+        """Test packages above the threshold are sent highest risk first in personalization batches"""
+        job, posted = await run_campaign(scored_db, min_risk=70, carrier="UPS")
+
+        batches = [[p["substitutions"]["-t_package_id-"] for p in payload["personalizations"]] for payload in posted]
+        assert batches == [["BULK-A", "BULK-B"], ["BULK-C"]]
+        assert job.to_dict()["status"] == "completed"
+        assert job.sent == 3 and job.batches_sent == 2
+
+        first = posted[0]["personalizations"][0]
+        assert first["to"] == [{"email": "alice@example.com"}]
+        assert first["substitutions"]["-h_reasons-"] == "storm &amp; wind"
+        assert "-h_package_id-" in posted[0]["content"][1]["value"]
+
+    @pytest.mark.asyncio
+    async def test_failed_batches_are_reported(self, scored_db):
+        job, posted = await run_campaign(scored_db, statuses=[400], min_risk=80)
+
+        assert job.status == "completed_with_errors"
+        assert (job.selected, job.failed, job.sent) == (3, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_packages_without_recipient_are_skipped(self, scored_db):
+        """Test unaddressed packages are not sent to a placeholder address or counted as sent"""
+        job, posted = await run_campaign(scored_db, recipients={"BULK-C": "carol@example.com"}, min_risk=70, carrier="UPS")
+
+        assert [[p["to"] for p in payload["personalizations"]] for payload in posted] == [[[{"email": "carol@example.com"}]]]
+        assert (job.selected, job.sent, job.skipped, job.batches_sent) == (3, 1, 2, 1)
+        assert job.to_dict()["packages_skipped"] == 2
+
+    @pytest.mark.asyncio
+    async def test_rerun_does_not_alert_again(self, scored_db):
+        """Test a repeated campaign is suppressed by the alert ledger"""
+        job, posted = await run_campaign(scored_db, runs=2, min_risk=70, carrier="UPS")
+
+        assert len(posted) == 2
+        assert (job.selected, job.sent, job.suppressed, job.batches_sent) == (3, 0, 3, 0)
+        assert job.to_dict()["packages_suppressed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_claims_are_released(self, scored_db):
+        """Test packages from a failed batch are alerted when the campaign is retried"""
+        job, posted = await run_campaign(scored_db, statuses=[400], runs=2, min_risk=80)
+
+        retried = [p["substitutions"]["-t_package_id-"] for p in posted[-1]["personalizations"]]
+        assert retried == ["BULK-A", "BULK-E"]
+        assert (job.sent, job.suppressed, job.failed) == (2, 1, 0)
+
+    def test_endpoints_require_admin(self):
+        assert client.post("/alerts/bulk", json={"min_risk": 80}).status_code == 403
+        assert client.get("/alerts/bulk/unknown").status_code == 403
@@ -0,0 +1,118 @@
+"""
+Tests for repeat-alert suppression
+"""
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from alert_ledger import AlertLedger
+import main
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def ledger(db):
+    return AlertLedger(db, window_seconds=3600)
+
+
+class TestAlertLedger:
+    @pytest.mark.asyncio
+    async def test_repeat_alert_suppressed(self, ledger):
+        assert await ledger.claim("PKG1", "a@example.com") is True
+        assert await ledger.claim("PKG1", "A@Example.com ") is False
+        assert await ledger.claim("PKG1", "b@example.com") is True
+        assert await ledger.claim("PKG2", "a@example.com") is True
+        assert ledger.suppressed == 1
+
+    @pytest.mark.asyncio
+    async def test_repeat_rejected_in_memory_without_database(self, ledger):
+        await ledger.claim("PKG1", "a@example.com")
+
+        async def fail(*args):
+            raise AssertionError("database touched")
+        ledger.db.claim_alert = fail
+        ledger.db.get_alert_sent_at = fail
+
+        assert await ledger.claim("PKG1", "a@example.com") is False
+
+    @pytest.mark.asyncio
+    async def test_ledger_shared_across_instances(self, ledger):
+        assert await ledger.claim("PKG1", "a@example.com") is True
+
+        # Another process (cold cache) over the same database still suppresses
+        second = AlertLedger(ledger.db, window_seconds=3600)
+        assert await second.claim("PKG1", "a@example.com") is False
+        assert second.recently_alerted("PKG1", "a@example.com")
+
+    @pytest.mark.asyncio
+    async def test_window_expiry_allows_new_alert(self, db):
+        ledger = AlertLedger(db, window_seconds=0.05)
+
+        assert await ledger.claim("PKG1", "a@example.com")
+        assert not await ledger.claim("PKG1", "a@example.com")
+        await asyncio.sleep(0.1)
+        assert await ledger.claim("PKG1", "a@example.com") is True
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_claim_once(self, ledger):
+        claims = await asyncio.gather(*[ledger.claim("PKG1", "a@example.com") for _ in range(5)])
+
+        assert sorted(claims) == [False] * 4 + [True]
+
+    @pytest.mark.asyncio
+    async def test_release_allows_retry(self, ledger):
+        await ledger.claim("PKG1", "a@example.com")
+        await ledger.release("PKG1", "a@example.com")
+
+        # Cold cache must see the release in the table as well
+        assert await AlertLedger(ledger.db, window_seconds=3600).claim("PKG1", "a@example.com") is True
+
+    @pytest.mark.asyncio
+    async def test_failed_database_claim_does_not_suppress_retry(self, ledger):
+        claim_alert = ledger.db.claim_alert
+
+        async def locked(*args):
+            raise RuntimeError("database is locked")
+
+        ledger.db.claim_alert = locked
+        try:
+            await ledger.claim("PKG1", "a@example.com")
+        except RuntimeError:
+            pass
+        assert not ledger.recently_alerted("PKG1", "a@example.com")
+
+        ledger.db.claim_alert = claim_alert
+        assert await ledger.claim("PKG1", "a@example.com") is True
+
+    @pytest.mark.asyncio
+    async def test_zero_window_disables_suppression(self, db):
+        ledger = AlertLedger(db, window_seconds=0)
+
+        assert [await ledger.claim("PKG1", "a@example.com") for _ in range(3)] == [True, True, True]
+
+
+class TestSendAlertSuppression:
+    def test_second_alert_gets_409(self, ledger, monkeypatch):
+        monkeypatch.setattr(main, "alert_ledger", ledger)
+        package_id = next(iter(main.package_store.all())).package_id
+        alert = {"package_id": package_id, "customer_email": "dup@example.com"}
+
+        assert client.post("/send-alert", json=alert).status_code == 200
+        response = client.post("/send-alert", json=alert)
+        assert response.status_code == 409
+        assert "already sent" in response.json()["detail"]
+
+    def test_ledger_failure_gets_503_and_retry_succeeds(self, ledger, monkeypatch):
+        monkeypatch.setattr(main, "alert_ledger", ledger)
+        package_id = next(iter(main.package_store.all())).package_id
+        alert = {"package_id": package_id, "customer_email": "retry@example.com"}
+        claim_alert = ledger.db.claim_alert
+
+        async def locked(*args):
+            raise RuntimeError("database is locked")
+
+        ledger.db.claim_alert = locked
+        assert client.post("/send-alert", json=alert).status_code == 503
+        ledger.db.claim_alert = claim_alert
+        assert client.post("/send-alert", json=alert).status_code == 200
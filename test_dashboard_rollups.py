@@ -0,0 +1,93 @@
+"""
+Tests for the dashboard rollup tables and cached dashboard statistics
+"""
+
+import aiosqlite
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+class TestRollups:
+    @pytest.mark.asyncio
+    async def test_actions_rolled_up_on_write(self, db):
+        for action in ["Resend", "Resend", "Accept Delay"]:
+            await db.record_customer_action("P1", action)
+        async with aiosqlite.connect(db.db_path) as conn:
+            cursor = await conn.execute(
+                "SELECT bucket_type, action, count FROM action_rollups ORDER BY bucket_type, action"
+            )
+            rows = await cursor.fetchall()
+        stats = await db.get_customer_action_stats()
+
+        assert rows == [("day", "Accept Delay", 1), ("day", "Resend", 2),
+                        ("hour", "Accept Delay", 1), ("hour", "Resend", 2)]
+        assert stats["action_breakdown"] == [{"action": "Resend", "count": 2}, {"action": "Accept Delay", "count": 1}]
+        assert stats["recent_activity"] == 3
+        assert stats["processing_stats"] == {"total": 3, "processed": 0, "pending": 3}
+
+    @pytest.mark.asyncio
+    async def test_outcomes_rolled_up_on_write(self, db):
+        await db.record_delivery_outcome("P1", "UPS", "00000", "10001", "2026-01-01", "2026-01-01")
+        await db.record_delivery_outcome("P2", "UPS", "00000", "10001", "2026-01-01", "2026-01-04")
+
+        recent = (await db.get_performance_stats())["recent_performance"]
+        assert recent == {"total_deliveries": 2, "delayed_deliveries": 1, "average_delay_hours": 36.0}
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_backfilled_on_initialize(self, db):
+        await db.record_customer_action("P1", "Resend")
+        await db.record_delivery_outcome("P1", "UPS", "00000", "10001", "2026-01-01", "2026-01-03")
+        # Simulate a database created before rollups existed
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute("DELETE FROM action_rollups")
+            await conn.execute("DELETE FROM outcome_rollups")
+            await conn.commit()
+        await db.initialize()
+
+        action_stats = await db.get_customer_action_stats()
+        performance = await db.get_performance_stats()
+        assert action_stats["action_breakdown"] == [{"action": "Resend", "count": 1}]
+        assert performance["recent_performance"]["total_deliveries"] == 1
+        assert performance["recent_performance"]["delayed_deliveries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reads_never_migrate(self, db):
+        """Test stats reads on a database without rollups fail instead of creating them"""
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute("DROP TABLE action_rollups")
+            await conn.commit()
+
+        with pytest.raises(aiosqlite.OperationalError):
+            await db.get_customer_action_stats()
+
+        async with aiosqlite.connect(db.db_path) as conn:
+            cursor = await conn.execute("SELECT name FROM sqlite_master WHERE name = 'action_rollups'")
+            assert await cursor.fetchall() == []
+
+
+class TestDashboardCache:
+    def test_stats_cached_until_next_write(self, db, monkeypatch):
+        monkeypatch.setattr(main, "risk_db", db)
+        monkeypatch.setattr(main, "DASHBOARD_CACHE_TTL_SECONDS", 60)
+        main.dashboard_cache.clear()
+        calls = 0
+        real_stats = db.get_performance_stats
+
+        async def counting_stats():
+            nonlocal calls
+            calls += 1
+            return await real_stats()
+
+        monkeypatch.setattr(db, "get_performance_stats", counting_stats)
+
+        assert client.get("/admin/performance-stats").status_code == 200
+        assert client.get("/admin/performance-stats").status_code == 200
+        assert calls == 1
+
+        main.dashboard_cache.clear()
+        assert client.get("/admin/performance-stats").status_code == 200
+        assert calls == 2
+        main.dashboard_cache.clear()
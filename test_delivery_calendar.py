@@ -0,0 +1,124 @@
+"""
+Tests for the precomputed delivery calendar and cached date factors
+"""
+
+import asyncio
+from datetime import date, timedelta
+from database import RiskDatabase
+from delivery_calendar import DeliveryCalendar, thanksgiving, holidays_for_year, parse_iso_datetime
+from risk_engine import RiskScoringEngine
+
+
+class TestDeliveryCalendar:
+    def test_day_table(self):
+        calendar = DeliveryCalendar(window_days=30)
+        today = date.today()
+        info = calendar.day(today.isoformat())
+
+        assert len(calendar._by_iso) == 61
+        assert info is calendar.day(today.isoformat())
+        assert info.weekday == today.weekday()
+        assert info.day_name == today.strftime("%A").lower()
+        assert info.month_name == today.strftime("%B").lower()
+        assert calendar.days_from_today(info) == 0
+        assert calendar.today() is info
+
+    def test_holiday_weeks(self):
+        calendar = DeliveryCalendar(window_days=1)
+
+        assert thanksgiving(2024) == date(2024, 11, 28)
+        assert thanksgiving(2025) == date(2025, 11, 27)
+        assert calendar.day("2024-11-25").thanksgiving_week  # Monday of Thanksgiving week
+        assert not calendar.day("2024-11-24").thanksgiving_week
+        assert calendar.day("2024-12-29").christmas_week  # Sunday after Christmas 2024
+        assert not calendar.day("2024-12-22").christmas_week
+
+    def test_federal_and_carrier_holidays(self):
+        holidays = holidays_for_year(2022)
+        names = {day.isoformat(): holiday.name for day, holiday in holidays.holidays.items()}
+
+        # January 1, 2022 was a Saturday, so New Year's Day was observed in 2021
+        assert len(holidays.holidays) == 10
+        assert "2021-12-31" in {day.isoformat() for day in holidays_for_year(2021).holidays}
+        assert names["2022-01-17"] == "Martin Luther King Jr. Day"
+        assert names["2022-05-30"] == "Memorial Day"
+        assert names["2022-06-20"] == "Juneteenth"  # June 19 was a Sunday
+        assert names["2022-12-26"] == "Christmas Day"  # observed Monday
+        assert holidays_for_year(2022) is holidays
+
+    def test_next_delivery_day(self):
+        calendar = DeliveryCalendar(window_days=1)
+
+        assert calendar.day("2024-07-04").holiday == "Independence Day"
+        assert not calendar.day("2024-07-04").delivery_day
+        assert calendar.day("2024-01-15").holiday == "Martin Luther King Jr. Day"
+        assert calendar.day("2024-01-15").delivery_day  # UPS and FedEx deliver
+        assert calendar.next_delivery_day(calendar.day("2024-07-04")).iso == "2024-07-05"
+        assert calendar.next_delivery_day(calendar.day("2024-12-24")).iso == "2024-12-24"
+        # Sunday followed by Christmas Day observed on Monday
+        assert calendar.next_delivery_day(calendar.day("2022-12-25")).iso == "2022-12-27"
+
+    def test_outside_window_and_invalid(self):
+        calendar = DeliveryCalendar(window_days=1)
+
+        assert calendar.day("2001-02-03").day_name == "saturday"
+        assert calendar.shift(calendar.day("2001-02-28"), 1).iso == "2001-03-01"
+        assert calendar.day("2001-02-30") is None
+        assert calendar.day("not a date") is None
+
+    def test_datetime_parsing(self):
+        calendar = DeliveryCalendar(window_days=1)
+
+        assert calendar.day_of_datetime("2024-03-09T23:30:00Z").iso == "2024-03-09"
+        assert calendar.day_of_datetime("2024-03-09T23:30:00-08:00").iso == "2024-03-09"
+        assert calendar.day_of_datetime("garbage") is None
+        assert parse_iso_datetime("2024-03-09T10:00:00Z") is parse_iso_datetime("2024-03-09T10:00:00Z")
+
+
+class TestDateFactors:
+    def test_engine_date_helpers(self):
+        engine = RiskScoringEngine()
+        today = date.today()
+
+        assert engine._calculate_date_proximity_risk(today.isoformat()) == 25
+        assert engine._calculate_date_proximity_risk((today + timedelta(days=1)).isoformat()) == 20
+        assert engine._calculate_date_proximity_risk((today + timedelta(days=10)).isoformat()) == 0
+        assert engine._calculate_date_proximity_risk("bad") == 5
+        assert engine._calculate_revised_delivery_date("2024-12-31", 2) == "2025-01-02T00:00:00Z"
+        assert engine._calculate_revised_delivery_date("2024-11-27", 1) == "2024-11-29T00:00:00Z"  # past Thanksgiving
+        assert engine._calculate_revised_delivery_date("2024-03-09", 1) == "2024-03-11T00:00:00Z"  # past Sunday
+
+        package = engine.map_shipstation_to_package({"fulfillmentPlanId": "FP-1", "state": "CA",
+                                                      "shipByDateTime": "2024-02-28T12:00:00Z"})
+        assert package.expected_delivery_date == "2024-03-01"
+        package = engine.map_shipstation_to_package({"fulfillmentPlanId": "FP-2", "state": "CA"})
+        assert package.expected_delivery_date == (today + timedelta(days=3)).isoformat()
+
+    def test_temporal_risk_is_cached_per_date(self, tmp_path):
+        async def run():
+            db = RiskDatabase(str(tmp_path / "risk.db"))
+            await db.initialize()
+
+            first = await db.get_temporal_risk("2024-12-02")  # a Monday in December
+            # Later lookups are served without the database
+            db.db_path = str(tmp_path / "missing" / "risk.db")
+            second = await db.get_temporal_risk("2024-12-02")
+            return first, second, await db.get_temporal_risk("bad")
+
+        first, second, invalid = asyncio.run(run())
+
+        assert first == (11, ["Monday packages often delayed due to weekend backlog", "Holiday season rush"])
+        assert second == first
+        assert invalid == (0, [])
+
+    def test_holiday_periods_in_temporal_risk(self, tmp_path):
+        async def run():
+            db = RiskDatabase(str(tmp_path / "risk.db"))
+            await db.initialize()
+            return await db.get_temporal_risk("2024-11-26"), await db.get_temporal_risk("2024-11-28")
+
+        thanksgiving_week, thanksgiving_day = asyncio.run(run())
+
+        assert thanksgiving_week == (11, ["Black Friday and Thanksgiving impact", "Thanksgiving week"])
+        assert thanksgiving_day[0] == 21
+        assert thanksgiving_day[1][-1] == "Thanksgiving Day - carriers do not deliver"
@@ -0,0 +1,127 @@
+import httpx
+import pytest
+from email_dispatcher import EmailDispatcher
+
+
+def make_message(to: str = "customer@example.com") -> dict:
+    return {
+        "personalizations": [{"to": [{"email": to}]}],
+        "from": {"email": "noreply@shipstation.com"},
+        "subject": "Delivery Alert",
+        "content": [{"type": "text/plain", "value": "hello"}]
+    }
+
+
+class FakeSendGrid:
+    """In-process SendGrid v3 stand-in: replies with the queued statuses, then 202"""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        status = self.statuses.pop(0) if self.statuses else 202
+        return httpx.Response(status, text="" if status == 202 else '{"errors": [{"message": "nope"}]}')
+
+
+async def dispatch(db, server: FakeSendGrid, messages, max_attempts: int = 3):
+    """Send the messages through a worker pool until the queue drains; returns it and the dead letters"""
+    dispatcher = EmailDispatcher(
+        "SG.test-key", db, base_url="https://sendgrid.test", workers=2,
+        max_attempts=max_attempts, backoff_base_seconds=0, transport=httpx.MockTransport(server)
+    )
+    for message in messages:
+        assert dispatcher.enqueue(message)
+    await dispatcher.join()
+    await dispatcher.stop()
+    return dispatcher, await db.get_email_dead_letters()
+
+
+class TestEmailDispatcher:
+    @pytest.mark.asyncio
+    async def test_sends_through_worker_pool(self, db):
+        """Test queued emails are posted to the v3 endpoint with the API key"""
+        server = FakeSendGrid()
+        dispatcher, dead_letters = await dispatch(db, server, [make_message(f"c{i}@example.com") for i in range(5)])
+
+        assert dispatcher.sent == 5
+        assert dead_letters == []
+        assert all(r.url.path == "/v3/mail/send" for r in server.requests)
+        assert server.requests[0].headers["Authorization"] == "Bearer SG.test-key"
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_failures(self, db):
+        """Test 429/5xx responses are retried until SendGrid accepts the email"""
+        server = FakeSendGrid(statuses=[503, 429])
+        dispatcher, dead_letters = await dispatch(db, server, [make_message()])
+
+        assert len(server.requests) == 3
+        assert dispatcher.sent == 1
+        assert dead_letters == []
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_are_dead_lettered(self, db):
+        server = FakeSendGrid(statuses=[500, 500, 500])
+        dispatcher, dead_letters = await dispatch(db, server, [make_message()])
+
+        assert len(server.requests) == 3
+        assert dead_letters[0]["recipients"] == ["customer@example.com"]
+        assert dead_letters[0]["attempts"] == 3
+        assert dead_letters[0]["last_status"] == 500
+
+    @pytest.mark.asyncio
+    async def test_permanent_failure_is_not_retried(self, db):
+        """Test a 400 goes straight to the dead-letter table"""
+        server = FakeSendGrid(statuses=[400])
+        dispatcher, dead_letters = await dispatch(db, server, [make_message()])
+
+        assert len(server.requests) == 1
+        assert dead_letters[0]["attempts"] == 1
+        assert "nope" in dead_letters[0]["last_error"]
+
+    @pytest.mark.asyncio
+    async def test_queue_bound(self, db):
+        dispatcher = EmailDispatcher("SG.test-key", db, workers=0, queue_size=1)
+        assert dispatcher.enqueue(make_message())
+        assert not dispatcher.enqueue(make_message())
+
+
+class TestDeadLetterCallback:
+    @pytest.mark.asyncio
+    async def test_dead_lettered_alert_releases_its_ledger_claim(self, db, make_package):
+        """Test a queued alert that SendGrid rejects can be sent again instead of staying suppressed"""
+        from alert_ledger import AlertLedger
+        from email_service import EmailService
+        from models import EnrichedPackage
+
+        ledger = AlertLedger(db)
+        email_service = EmailService()
+        email_service.mock_mode = False
+        email_service.dispatcher = EmailDispatcher(
+            "SG.test-key", db, base_url="https://sendgrid.test", max_attempts=1,
+            transport=httpx.MockTransport(FakeSendGrid(statuses=[400]))
+        )
+        package = EnrichedPackage(**make_package("P1").model_dump(), risk_score=80, reasons=["storm"])
+
+        assert await ledger.claim("P1", "alice@example.com")
+        result = await email_service.send_delay_alert(
+            package, "alice@example.com", on_failure=lambda: ledger.release("P1", "alice@example.com")
+        )
+        await email_service.dispatcher.join()
+        await email_service.dispatcher.stop()
+
+        assert result["queued"]
+        assert await ledger.claim("P1", "alice@example.com")
+
+
+class TestDeadLetterEndpoint:
+    def test_requires_admin_token(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        import main
+
+        monkeypatch.setenv("ADMIN_API_KEY", "secret")
+        client = TestClient(main.app)
+
+        assert client.get("/admin/email/dead-letters").status_code == 403
+        assert client.get("/admin/email/dead-letters", headers={"X-Admin-Token": "wrong"}).status_code == 403
@@ -0,0 +1,117 @@
+"""
+Tests for the precompiled alert email templates
+"""
+
+from models import EnrichedPackage, CarrierType
+from email_templates import AlertEmailRenderer, risk_bucket
+
+
+def make_package(package_id="PKG1", risk_score=82, reasons=None, city="Miami"):
+    return EnrichedPackage(
+        package_id=package_id,
+        customer_email="customer@example.com",
+        destination_city=city,
+        destination_zip="33101",
+        carrier=CarrierType.FEDEX,
+        expected_delivery_date="2026-10-20",
+        risk_score=risk_score,
+        reasons=reasons if reasons is not None else ["Severe weather at destination"]
+    )
+
+
+class TestAlertEmailRenderer:
+    def test_renders_package_fields(self):
+        renderer = AlertEmailRenderer()
+        html_body, text_body = renderer.render(make_package())
+
+        assert "PKG1" in html_body and "Miami, 33101" in html_body
+        assert "<li><strong>Risk Level:</strong> 82/100</li>" in html_body
+        assert "- Severe weather at destination" in text_body
+
+    def test_text_body_matches_original_template(self):
+        """Test caching did not change the email customers receive"""
+        _, text_body = AlertEmailRenderer().render(make_package(reasons=["Severe weather", "storm"]))
+
+        assert text_body == f"""
+PACKAGE DELIVERY ALERT
+
+Your package may be delayed:
+
+Package Details:
+- Package ID: PKG1
+- Destination: Miami, 33101
+- Carrier: {CarrierType.FEDEX}
+- Expected Delivery: 2026-10-20
+- Risk Level: 82/100
+
+Potential Delay Reasons:
+- Severe weather
+- storm
+
+What would you like to do?
+Please visit our customer portal to choose your preferred action:
+1. Accept Delay
+2. Request Refund{"  "}
+3. Resend Package
+
+This is an automated message from ShipStation.
+        """
+
+    def test_escapes_html_but_not_text(self):
+        renderer = AlertEmailRenderer()
+        package = make_package(city="<script>x</script>", reasons=["storm & wind"])
+        html_body, text_body = renderer.render(package)
+
+        assert "<script>" not in html_body
+        assert "&lt;script&gt;x&lt;/script&gt;" in html_body
+        assert "<li>storm &amp; wind</li>" in html_body
+        assert "<script>x</script>, 33101" in text_body
+        assert "- storm & wind" in text_body
+
+    def test_dollar_signs_survive_both_render_steps(self):
+        renderer = AlertEmailRenderer()
+        html_body, text_body = renderer.render(make_package(reasons=["$5 surcharge ${zone}"]))
+
+        assert "$5 surcharge ${zone}" in html_body
+        assert "$5 surcharge ${zone}" in text_body
+
+    def test_bodies_cached_per_bucket_and_reasons(self):
+        renderer = AlertEmailRenderer()
+        renderer.render(make_package("A", 82))
+        renderer.render(make_package("B", 75))
+        assert (renderer.misses, renderer.hits) == (1, 1)
+
+        renderer.render(make_package("C", 50))
+        renderer.render(make_package("D", 82, reasons=["Other reason"]))
+        assert renderer.misses == 3
+
+        # Cached body still carries the per-package fields
+        html_body, _ = renderer.render(make_package("E", 90))
+        assert "E</li>" in html_body and "90/100" in html_body
+
+    def test_cache_is_bounded(self):
+        renderer = AlertEmailRenderer(cache_size=2)
+        for i in range(5):
+            renderer.render(make_package(reasons=[f"reason {i}"]))
+        assert len(renderer._bodies) == 2
+
+    def test_risk_bucket_bands(self):
+        assert risk_bucket(70) == "High Risk"
+        assert risk_bucket(40) == "Medium Risk"
+        assert risk_bucket(39) == "Low Risk"
+
+    def test_tagged_content_matches_bulk_substitutions(self):
+        renderer = AlertEmailRenderer()
+        text_content, html_content = renderer.render_tagged()
+        assert text_content["type"] == "text/plain" and html_content["type"] == "text/html"
+
+        fields = AlertEmailRenderer.package_fields(make_package(city="A&B", risk_score=45))
+        substitutions = renderer.bulk_substitutions(fields, ["x < y", "z"])
+
+        for tag in substitutions:
+            content = text_content if tag.startswith("-t_") else html_content
+            assert tag in content["value"]
+        assert substitutions["-h_destination_city-"] == "A&amp;B"
+        assert substitutions["-t_destination_city-"] == "A&B"
+        assert substitutions["-h_reasons-"] == "x &lt; y</li><li>z"
+        assert substitutions["-t_reasons-"] == "x < y\n- z"
@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from main import app
+from mock_data import MOCK_PACKAGES, build_awaiting_shipment_payload
+from models import ShipStationAwaitingShipmentResponse
+import json
+
+client = TestClient(app)
+
+
+class TestEnrichment:
+    def test_passthrough_matches_model_path(self):
+        """Test passthrough mode returns the same document as the validated path"""
+        payload = build_awaiting_shipment_payload()
+        # Sanity check: payload is a complete, valid model
+        ShipStationAwaitingShipmentResponse(**payload)
+
+        model_response = client.post("/enrich-awaiting-shipments", json=payload)
+        passthrough_response = client.post("/enrich-awaiting-shipments/passthrough", json=payload)
+
+        assert model_response.status_code == 200
+        assert passthrough_response.status_code == 200
+        assert passthrough_response.json() == model_response.json()
+        # Key order is preserved too
+        assert list(json.loads(passthrough_response.content)["salesOrders"][0]) == \
+            list(model_response.json()["salesOrders"][0])
+        assert 0 <= passthrough_response.json()["salesOrders"][0]["riskScore"] <= 100
+
+    def test_passthrough_rejects_invalid_json(self):
+        """Test passthrough mode reports malformed bodies"""
+        response = client.post(
+            "/enrich-awaiting-shipments/passthrough",
+            content=b"{not json",
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 400
+
+    def test_passthrough_rejects_wrong_shape(self):
+        """Test passthrough mode requires the awaiting-shipment envelope"""
+        response = client.post("/enrich-awaiting-shipments/passthrough", json={"salesOrders": {}})
+        assert response.status_code == 422
+
+    def test_packages_ndjson_stream(self):
+        """Test /packages streams one enriched package per line when NDJSON is requested"""
+        response = client.get("/packages", headers={"Accept": "application/x-ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = response.text.splitlines()
+        assert len(lines) == len(MOCK_PACKAGES)
+        first = json.loads(lines[0])
+        assert first["package_id"] == MOCK_PACKAGES[0].package_id
+        assert 0 <= first["risk_score"] <= 100
+
+    def test_awaiting_shipments_ndjson_stream(self):
+        """Test enriched sales orders are streamed as NDJSON and match the JSON response"""
+        payload = build_awaiting_shipment_payload()
+
+        streamed = client.post("/enrich-awaiting-shipments", json=payload,
+                               headers={"Accept": "application/x-ndjson"})
+        regular = client.post("/enrich-awaiting-shipments", json=payload)
+
+        assert streamed.status_code == 200
+        orders = [json.loads(line) for line in streamed.text.splitlines()]
+        assert orders == regular.json()["salesOrders"]
+
+    def test_order_drill_down_uses_enrichment_context(self):
+        """Test the order detail view resolves the enriched package instead of a mock one"""
+        payload = build_awaiting_shipment_payload()
+        payload["salesOrders"][0]["fulfillmentPlanIds"] = ["CTX-1"]
+        payload["salesOrders"][0]["shipTos"][0]["state"] = "NY"
+        payload["salesOrders"][0]["requestedService"] = "FedEx Ground"
+        client.post("/enrich-awaiting-shipments", json=payload)
+
+        response = client.get("/orders/CTX-1/risk-assessment")
+        assert response.status_code == 200
+        assert "FEDEX" in response.json()["factors"]["carrierPerformance"]["status"].upper()
+
+    def test_order_drill_down_without_enrichment_uses_default_shipment(self):
+        """Test orders not enriched in this process still get an assessment, as before contexts existed"""
+        response = client.get("/orders/NEVER-ENRICHED/risk-assessment")
+        assert response.status_code == 200
+        assert "UPS" in response.json()["factors"]["carrierPerformance"]["status"].upper()
@@ -0,0 +1,40 @@
+from fulfillment_context import FulfillmentContextStore
+from models import CarrierType, Package
+
+
+def make_package(package_id: str) -> Package:
+    return Package(
+        package_id=package_id,
+        destination_zip="98101",
+        destination_city="Seattle",
+        carrier=CarrierType.UPS,
+        expected_delivery_date="2025-08-05"
+    )
+
+
+class TestFulfillmentContextStore:
+    def test_size_bound_evicts_oldest(self):
+        store = FulfillmentContextStore(max_entries=2)
+        for package_id in ("FP1", "FP2", "FP3"):
+            store.put(package_id, make_package(package_id))
+
+        assert len(store) == 2
+        assert store.get("FP1") is None
+        assert store.get("FP3").package_id == "FP3"
+
+    def test_expired_entries_are_dropped(self):
+        store = FulfillmentContextStore(ttl_seconds=0)
+        store.put("FP1", make_package("FP1"))
+
+        assert store.get("FP1") is None
+        assert len(store) == 0
+
+    def test_put_drops_expired_entries(self, monkeypatch):
+        store = FulfillmentContextStore(ttl_seconds=10)
+        now = 1000.0
+        monkeypatch.setattr("fulfillment_context.time.monotonic", lambda: now)
+        store.put("FP1", make_package("FP1"))
+        now = 1011.0
+        store.put("FP2", make_package("FP2"))
+
+        assert len(store) == 1
@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from datetime import date
+from models import CarrierType, Package, RiskAssessment
+from package_scorer import PackageScorer
+from package_store import PackageStore
+
+
+class StubWeatherService:
+    def __init__(self):
+        self.weather = {}
+        self._cache = {}
+
+    async def get_weather_risk(self, city: str) -> dict:
+        if city not in self._cache:
+            self._cache[city] = dict(self.weather.get(city, {"risk_score": 0, "reasons": []}))
+        return self._cache[city]
+
+    def invalidate(self, city: str):
+        return self._cache.pop(city, None)
+
+
+class StubRiskEngine:
+    """Counts scoring calls per package instead of hitting the database"""
+
+    def __init__(self):
+        self.weather_service = StubWeatherService()
+        self.calls = []
+        self.score = 42
+
+    async def prefetch_routes(self, packages, persist=False):
+        pass
+
+    async def calculate_risk_score(self, package: Package) -> RiskAssessment:
+        self.calls.append(package.package_id)
+        return RiskAssessment(risk_score=self.score, reasons=["stub"], factors={"carrier": self.score})
+
+
+@pytest.fixture
+def packages(make_package):
+    return [
+        make_package("SEA-UPS"),
+        make_package("SEA-FEDEX", carrier=CarrierType.FEDEX, expected_delivery_date="2030-01-11"),
+        make_package("NYC-UPS", destination_city="New York", destination_zip="10001",
+                     expected_delivery_date="2030-01-20"),
+    ]
+
+
+@pytest.fixture
+def engine():
+    return StubRiskEngine()
+
+
+@pytest.fixture
+def scorer(db, engine, packages):
+    """Scorer over a fresh database with every test package tracked and scored once"""
+    async def setup():
+        store = PackageStore(db)
+        await store.upsert_many(packages)
+        scorer = PackageScorer(engine, store)
+        scorer.track_all(store.all())
+        await scorer.process_dirty()
+        return scorer
+
+    scorer = asyncio.run(setup())
+    engine.calls.clear()
+    return scorer
+
+
+class TestPackageScorer:
+    @pytest.mark.asyncio
+    async def test_tracked_packages_are_scored_and_stored(self, db, scorer):
+        """Test draining the queue scores every tracked package and persists the result"""
+        assert scorer.pending == 0
+        assert scorer.get_fresh_assessment("NYC-UPS").risk_score == 42
+        stored = await db.query_packages(limit=10, min_risk=0)
+        assert sorted(row["package_id"] for row in stored) == ["NYC-UPS", "SEA-FEDEX", "SEA-UPS"]
+
+    @pytest.mark.asyncio
+    async def test_performance_change_rescores_only_that_lane(self, engine, scorer):
+        """Test a recorded outcome only re-scores packages on the same carrier x zip"""
+        assert scorer.invalidate_performance("UPS", "98101") == 1
+        assert scorer.get_fresh_assessment("SEA-UPS") is None
+        assert scorer.get_fresh_assessment("SEA-FEDEX") is not None
+
+        await scorer.process_dirty()
+        assert engine.calls == ["SEA-UPS"]
+
+    @pytest.mark.asyncio
+    async def test_day_rollover_marks_only_near_deliveries(self, engine, scorer):
+        """Test midnight re-scores packages whose delivery date is now within the proximity window"""
+        scorer._today = date(2030, 1, 7)
+
+        assert scorer.on_day_rollover(date(2030, 1, 8)) == 2
+        await scorer.process_dirty()
+        assert sorted(engine.calls) == ["SEA-FEDEX", "SEA-UPS"]
+
+    def test_month_change_marks_everything(self, scorer):
+        """Test a month boundary re-scores every tracked package (carrier seasonality)"""
+        scorer._today = date(2030, 1, 31)
+
+        assert scorer.on_day_rollover(date(2030, 2, 1)) == 3
+
+    @pytest.mark.asyncio
+    async def test_weather_refresh_only_marks_changed_cities(self, engine, scorer):
+        """Test unchanged weather re-scores nothing and changed weather re-scores that city"""
+        weather = engine.weather_service
+
+        # Prime the cache, then refresh with identical conditions
+        for city in ("Seattle", "New York"):
+            await weather.get_weather_risk(city)
+        assert await scorer.refresh_weather() == 0
+
+        weather.weather["Seattle"] = {"risk_score": 30, "reasons": ["Severe weather: snow"]}
+        assert await scorer.refresh_weather() == 2
+        await scorer.process_dirty()
+        assert sorted(engine.calls) == ["SEA-FEDEX", "SEA-UPS"]
+
+    @pytest.mark.asyncio
+    async def test_retracking_changed_package_replaces_its_dependencies(self, scorer, make_package):
+        """Test an updated package moves to its new carrier x zip lane"""
+        scorer.track(make_package("SEA-UPS", carrier=CarrierType.DHL))
+        await scorer.process_dirty()
+
+        assert scorer.invalidate_performance("UPS", "98101") == 0
+        assert scorer.invalidate_performance("DHL", "98101") == 1
+
+    @pytest.mark.asyncio
+    async def test_change_feed_only_records_changed_scores(self, db, engine, scorer):
+        """Test re-scoring to the same result adds nothing to the change feed"""
+        initial = await db.get_risk_score_changes(since_seq=0)
+        assert [change["seq"] for change in initial] == [1, 2, 3]
+        assert initial[0]["factors"] == {"carrier": 42}
+
+        # Same inputs, same score: no new sequence numbers
+        scorer.invalidate_all()
+        await scorer.process_dirty()
+        assert await db.get_latest_risk_score_seq() == 3
+
+        engine.score = 77
+        scorer.invalidate_performance("UPS", "98101")
+        await scorer.process_dirty()
+        changes = await db.get_risk_score_changes(since_seq=3)
+        assert [(c["package_id"], c["risk_score"], c["seq"]) for c in changes] == [("SEA-UPS", 77, 4)]
+
+    @pytest.mark.asyncio
+    async def test_transient_packages_are_bounded_and_published(self, db, engine, scorer, make_package):
+        """Test enrichment-only packages are capped and re-scores reach listeners"""
+        scorer.max_transient = 2
+        published = []
+        scorer.add_listener(lambda package_id, assessment: published.append((package_id, assessment.risk_score)))
+
+        for i in range(3):
+            scorer.track_transient(make_package(f"FP{i}"), RiskAssessment(risk_score=10, reasons=["enriched"]))
+
+        # Scored during enrichment, so nothing is queued; the oldest was evicted
+        assert scorer.pending == 0
+        assert scorer.get_fresh_assessment("FP0") is None
+        assert scorer.get_fresh_assessment("FP2").risk_score == 10
+
+        engine.score = 55
+        scorer.invalidate_performance("UPS", "98101")
+        await scorer.process_dirty()
+        assert sorted(published) == [("FP1", 55), ("FP2", 55), ("SEA-UPS", 55)]
+
+        # Only the stored package reaches the change feed
+        changes = await db.get_risk_score_changes(since_seq=3)
+        assert [(c["package_id"], c["risk_score"]) for c in changes] == [("SEA-UPS", 55)]
@@ -0,0 +1,77 @@
+import pytest
+from models import CarrierType
+from package_store import PackageStore
+
+
+class TestPackageStore:
+    @pytest.mark.asyncio
+    async def test_upsert_indexes_and_persists(self, db, make_package):
+        """Test bulk upsert makes packages available in the index and the database"""
+        store = PackageStore(db)
+
+        await store.upsert_many([make_package("PKG-A"), make_package("PKG-B", carrier=CarrierType.DHL)])
+
+        assert (await store.get("PKG-B")).carrier == CarrierType.DHL
+        assert "PKG-A" in store
+        assert await db.get_package("PKG-A") == {
+            "package_id": "PKG-A",
+            "destination_zip": "98101",
+            "destination_city": "Seattle",
+            "carrier": "UPS",
+            "expected_delivery_date": "2030-01-10",
+            "origin_zip": None
+        }
+
+        # Upsert updates in place
+        await store.upsert_many([make_package("PKG-A", carrier=CarrierType.FEDEX, destination_zip="10001")])
+        assert len(store) == 2
+        assert (await db.get_package("PKG-A"))["carrier"] == "FedEx"
+        assert (await store.get("PKG-A")).destination_zip == "10001"
+
+    @pytest.mark.asyncio
+    async def test_load_from_database_in_batches(self, db, make_package):
+        """Test a fresh store rebuilds its index from the database"""
+        await PackageStore(db).upsert_many([make_package(f"PKG{i:05d}") for i in range(25)])
+
+        store = PackageStore(db)
+        loaded = await store.load_from_database(batch_size=10)
+
+        assert loaded == 25
+        assert (await store.get("PKG00024")).package_id == "PKG00024"
+        assert await store.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_fresh_store_reads_through_to_database(self, db, make_package):
+        """Test packages persisted by one store are found by a fresh one without loading"""
+        await PackageStore(db).upsert_many([make_package("PKG-A", carrier=CarrierType.DHL)])
+
+        store = PackageStore(db)
+        assert "PKG-A" not in store
+        assert (await store.get("PKG-A")).carrier == CarrierType.DHL
+        assert "PKG-A" in store
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded_and_pins_unsaved_packages(self, db, make_package):
+        """Test persisted packages are evicted least recently used first; memory-only ones stay"""
+        store = PackageStore(db, cache_size=2)
+        store.index_packages([make_package("DEMO")])
+        await store.upsert_many([make_package(f"PKG{i}") for i in range(3)])
+
+        assert len(store) == 3
+        assert "PKG0" not in store and "DEMO" in store
+        assert (await store.get("PKG0")).package_id == "PKG0"
+        assert "PKG1" not in store
+        assert await store.load_from_database() == 2
+
+
+class TestBulkUpsertEndpoint:
+    def test_requires_admin_token(self, monkeypatch, make_package):
+        from fastapi.testclient import TestClient
+        import main
+
+        monkeypatch.setenv("ADMIN_API_KEY", "secret")
+        client = TestClient(main.app)
+        body = [make_package("ADMIN-1").model_dump()]
+
+        assert client.post("/admin/packages/bulk-upsert", json=body).status_code == 403
+        assert client.post("/admin/packages/bulk-upsert", json=body, headers={"X-Admin-Token": "wrong"}).status_code == 403
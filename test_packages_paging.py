@@ -0,0 +1,116 @@
+import aiosqlite
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from database import risk_db
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def stored_packages(tmp_path, monkeypatch):
+    """Point the shared database at a fresh file holding 12 packages"""
+    monkeypatch.setattr(risk_db, "db_path", str(tmp_path / "risk.db"))
+    carriers = ["UPS", "FedEx", "USPS"]
+    packages = [
+        {
+            "package_id": f"PAGE{i:03d}",
+            "destination_zip": "98101" if i % 2 else "10001",
+            "destination_city": "Seattle" if i % 2 else "New York",
+            "carrier": carriers[i % 3],
+            "expected_delivery_date": f"2030-01-{i + 1:02d}"
+        }
+        for i in range(12)
+    ]
+
+    async def setup():
+        await risk_db.initialize()
+        await risk_db.upsert_packages(packages)
+        # Pre-score half of them directly, as rows stored before the change feed existed
+        async with aiosqlite.connect(risk_db.db_path) as db:
+            await db.executemany(
+                "UPDATE packages SET risk_score = ?, risk_reasons = ?, scored_at = CURRENT_TIMESTAMP WHERE package_id = ?",
+                [(10 + i * 5, json.dumps(["stored"]), p["package_id"]) for i, p in enumerate(packages[:6])]
+            )
+            await db.commit()
+
+    asyncio.run(setup())
+    return packages
+
+
+def fetch_all_pages(params: dict) -> list:
+    pages = []
+    cursor = None
+    while True:
+        response = client.get("/packages", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+class TestPackagesPaging:
+    def test_keyset_pages_cover_every_package_once(self, stored_packages):
+        pages = fetch_all_pages({"limit": 5})
+        ids = [p["package_id"] for page in pages for p in page]
+
+        assert [len(page) for page in pages] == [5, 5, 2]
+        assert ids == sorted(p["package_id"] for p in stored_packages)
+
+    def test_unscored_rows_are_scored_on_read_and_stored(self, stored_packages):
+        client.get("/packages", params={"limit": 12})
+
+        # Every row now has a stored score, so the risk sort sees all of them
+        pages = fetch_all_pages({"limit": 4, "sort": "risk"})
+        scores = [p["risk_score"] for page in pages for p in page]
+        assert len(scores) == 12
+        assert scores == sorted(scores, reverse=True)
+
+    def test_risk_sort_lists_unscored_packages_last(self, stored_packages):
+        pages = fetch_all_pages({"limit": 4, "sort": "risk"})
+        ids = [p["package_id"] for page in pages for p in page]
+
+        # Six stored scores highest first, then the six unscored packages in id order
+        assert [len(page) for page in pages] == [4, 4, 4, 0]
+        assert ids == [f"PAGE{i:03d}" for i in (5, 4, 3, 2, 1, 0, 6, 7, 8, 9, 10, 11)]
+
+    def test_filters(self, stored_packages):
+        response = client.get("/packages", params={
+            "carrier": "UPS", "zip_prefix": "100", "date_from": "2030-01-02"
+        })
+        packages = response.json()
+
+        assert response.status_code == 200
+        assert [p["package_id"] for p in packages] == ["PAGE006"]
+        for package in packages:
+            assert package["carrier"] == "UPS"
+            assert package["destination_zip"].startswith("100")
+            assert package["expected_delivery_date"] >= "2030-01-02"
+
+    def test_min_risk_uses_stored_scores(self, stored_packages):
+        packages = client.get("/packages", params={"min_risk": 30, "sort": "risk"}).json()
+        assert [p["risk_score"] for p in packages] == [35, 30]
+        assert all(p["reasons"] == ["stored"] for p in packages)
+
+    def test_invalid_cursor(self, stored_packages):
+        response = client.get("/packages", params={"limit": 5, "cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_risk_score_change_feed(self, stored_packages):
+        client.get("/packages", params={"limit": 12})
+
+        first = client.get("/risk-scores/changes", params={"since": 0, "limit": 4}).json()
+        assert len(first["changes"]) == 4 and first["has_more"]
+        assert set(first["changes"][0]["factors"]) >= {"carrier", "weather", "timeline"}
+
+        rest = client.get("/risk-scores/changes", params={"since": first["next_since"]}).json()
+        seqs = [c["seq"] for c in first["changes"] + rest["changes"]]
+        # Only the six rows scored on read are in the feed, in sequence order
+        assert seqs == sorted(seqs) and len(seqs) == 6
+        assert not rest["has_more"]
+
+        caught_up = client.get("/risk-scores/changes", params={"since": rest["next_since"]}).json()
+        assert caught_up == {"changes": [], "next_since": rest["next_since"], "has_more": False}
@@ -0,0 +1,52 @@
+import asyncio
+from fastapi.testclient import TestClient
+from main import app
+from profiler import ProfilingService
+
+client = TestClient(app)
+
+
+class TestProfiler:
+    def test_profile_collects_stacks_and_allocations(self):
+        """Test a short profile captures samples in collapsed format"""
+        async def busy_profile():
+            service = ProfilingService(sample_interval=0.001)
+            profile_task = asyncio.create_task(service.profile(0.3, top_allocations=5))
+            # Keep the event loop busy so the sampler has something to see
+            payload = []
+            while not profile_task.done():
+                payload.append([str(i) for i in range(500)])
+                await asyncio.sleep(0)
+            return await profile_task
+
+        profile = asyncio.run(busy_profile())
+
+        assert profile["total_samples"] > 0
+        assert len(profile["top_allocations"]) <= 5
+        for line in profile["collapsed_stacks"].splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack
+            assert int(count) > 0
+
+    def test_profile_endpoint_disabled_without_admin_key(self, monkeypatch):
+        """Test profiling is rejected when ADMIN_API_KEY is not configured"""
+        monkeypatch.delenv("ADMIN_API_KEY", raising=False)
+        response = client.post("/admin/profile?duration=0.1", headers={"X-Admin-Token": "anything"})
+        assert response.status_code == 403
+
+    def test_profile_endpoint_rejects_wrong_token(self, monkeypatch):
+        """Test profiling requires the matching admin token"""
+        monkeypatch.setenv("ADMIN_API_KEY", "secret")
+        response = client.post("/admin/profile?duration=0.1", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+
+    def test_profile_endpoint_collapsed_format(self, monkeypatch):
+        """Test admin can download a collapsed-stack profile"""
+        monkeypatch.setenv("ADMIN_API_KEY", "secret")
+        response = client.post(
+            "/admin/profile?duration=0.2&format=collapsed",
+            headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "profile.collapsed" in response.headers["content-disposition"]
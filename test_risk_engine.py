@@ -0,0 +1,80 @@
+import pytest
+from database import RiskDatabase
+from risk_engine import RiskScoringEngine
+
+
+@pytest.fixture
+def engine(db):
+    engine = RiskScoringEngine()
+    engine.db = db
+    return engine
+
+
+class CountingLookups:
+    """Wrap the engine's database lookups to count factor queries"""
+
+    def __init__(self, engine: RiskScoringEngine):
+        self.calls = 0
+        original = engine.db.get_carrier_risk
+
+        async def counted(carrier: str) -> int:
+            self.calls += 1
+            return await original(carrier)
+
+        engine.db.get_carrier_risk = counted
+
+
+class TestFactorVector:
+    @pytest.mark.asyncio
+    async def test_basic_and_enhanced_share_one_lookup(self, engine, make_package):
+        """Test the grid score and the detail view reuse the same memoized factors"""
+        lookups = CountingLookups(engine)
+        package = make_package("PKG-VEC")
+
+        basic = await engine.calculate_risk_score(package)
+        enhanced = await engine.calculate_enhanced_risk_assessment(package)
+
+        assert lookups.calls == 1
+        assert basic.factors["carrier"] == enhanced.factors["carrierPerformance"].score
+        assert basic.risk_score == min(sum(basic.factors.values()), 100)
+
+    @pytest.mark.asyncio
+    async def test_input_changes_invalidate_the_vector(self, engine, make_package):
+        """Test new delivery outcomes and weather refreshes force a recomputation"""
+        lookups = CountingLookups(engine)
+        package = make_package("PKG-VEC")
+
+        await engine.calculate_risk_score(package)
+        await engine.record_delivery_outcome("PKG-VEC", "UPS", "10001", "98101", "2030-01-01", "2030-01-04")
+        await engine.calculate_risk_score(package)
+        engine.weather_service.invalidate("Seattle")
+        await engine.calculate_risk_score(package)
+        # Unrelated city: still memoized
+        engine.weather_service.invalidate("Miami")
+        await engine.calculate_risk_score(package)
+
+        assert lookups.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_outcomes_from_another_process_invalidate_the_vector(self, engine, make_package):
+        """Test an outcome recorded through a different database handle is picked up"""
+        engine.db.version_check_seconds = 0
+        lookups = CountingLookups(engine)
+        other_worker = RiskDatabase(engine.db.db_path)
+        package = make_package("PKG-VEC")
+
+        await engine.calculate_risk_score(package)
+        await engine.calculate_risk_score(package)
+        await other_worker.record_delivery_outcome("PKG-VEC", "UPS", "10001", "98101", "2030-01-01", "2030-01-04")
+        await engine.calculate_risk_score(package)
+
+        assert lookups.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self, engine, make_package):
+        engine.factor_cache_size = 2
+
+        for i in range(3):
+            await engine.calculate_risk_score(make_package(f"PKG-{i}"))
+
+        assert len(engine._factor_cache) == 2
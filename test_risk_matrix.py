@@ -0,0 +1,64 @@
+"""
+Tests for the batched carrier x zip risk analysis
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+class TestRiskMatrix:
+    @pytest.mark.asyncio
+    async def test_matches_single_lookups(self, db):
+        carriers = ["UPS", "FedEx", "USPS", "DHL", "Unknown"]
+        zip_codes = ["98101", "10001", "90210", "33101", "00000"]
+
+        matrix = await db.get_risk_matrix(carriers, zip_codes)
+
+        assert matrix["performance_risk"] == {
+            carrier: {zip_code: await db.get_delivery_performance_risk(carrier, zip_code) for zip_code in zip_codes}
+            for carrier in carriers
+        }
+        assert matrix["carrier_risk"] == {carrier: await db.get_carrier_risk(carrier) for carrier in carriers}
+        assert matrix["geographic_risk"] == {zip_code: await db.get_geographic_risk(zip_code) for zip_code in zip_codes}
+
+    @pytest.mark.asyncio
+    async def test_defaults_to_all_known(self, db):
+        matrix = await db.get_risk_matrix()
+        assert {"UPS", "FedEx"} <= set(matrix["carriers"])
+        assert "98101" in matrix["zip_codes"]
+        assert set(matrix["performance_risk"]) == set(matrix["carriers"])
+
+    @pytest.mark.asyncio
+    async def test_cached_until_outcome_recorded(self, db):
+        first = await db.get_risk_matrix(["UPS"], ["99999"])
+        assert await db.get_risk_matrix(["UPS"], ["99999"]) is first
+        assert first["performance_risk"]["UPS"]["99999"] == 0
+
+        for _ in range(3):
+            await db.record_delivery_outcome("P1", "UPS", "00000", "99999", "2026-01-01", "2026-01-05")
+        after = await db.get_risk_matrix(["UPS"], ["99999"])
+        assert after["performance_risk"]["UPS"]["99999"] == 20
+
+
+class TestRiskMatrixEndpoints:
+    def test_matrix_endpoint(self, db, monkeypatch):
+        monkeypatch.setattr(main, "risk_db", db)
+        response = client.get("/admin/risk-matrix", params={"carriers": ["UPS", "DHL"], "zip_codes": ["98101"]})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["carriers"] == ["DHL", "UPS"]
+        assert set(body["performance_risk"]["UPS"]) == {"98101"}
+
+    def test_existing_analysis_endpoints_keep_shape(self, db, monkeypatch):
+        monkeypatch.setattr(main, "risk_db", db)
+
+        zip_body = client.get("/admin/risk-factors/98101").json()
+        assert set(zip_body["carrier_performance"]) == set(main.ANALYSIS_CARRIERS)
+        assert isinstance(zip_body["geographic_risk"], int)
+
+        carrier_body = client.get("/admin/carrier-analysis/UPS", params={"zip_codes": ["10001"]}).json()
+        assert list(carrier_body["zip_code_performance"]) == ["10001"]
+        assert isinstance(carrier_body["overall_risk"], int)
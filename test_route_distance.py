@@ -0,0 +1,101 @@
+"""
+Tests for great-circle route distances
+"""
+
+import aiosqlite
+import pytest
+from database import RiskDatabase
+from risk_engine import RiskScoringEngine
+from route_distance import RouteDistanceService, haversine_miles, haversine_miles_batch, route_risk_from_distance
+from zip_reference import ZipReference, DEFAULT_CSV_PATH
+
+
+@pytest.fixture
+def service(db):
+    return RouteDistanceService(db, ZipReference(DEFAULT_CSV_PATH), "10001")
+
+
+class TestHaversine:
+    def test_known_distance(self):
+        # New York -> Los Angeles is ~2450 miles
+        assert 2400 < haversine_miles(40.7506, -73.9972, 34.1030, -118.4105) < 2500
+        assert haversine_miles(40.0, -75.0, 40.0, -75.0) == 0
+
+    def test_batch_matches_single(self):
+        destinations = [(47.6114, -122.3305), (25.7791, -80.1978), (41.8858, -87.6181)]
+        batch = haversine_miles_batch((40.7506, -73.9972), destinations)
+        assert batch == [haversine_miles(40.7506, -73.9972, lat, lon) for lat, lon in destinations]
+
+    def test_route_risk_bands(self):
+        assert route_risk_from_distance(0) == 20
+        assert route_risk_from_distance(2450) == 69
+        assert route_risk_from_distance(100, rural_destination=True) == 32
+        assert route_risk_from_distance(10000) == 90
+
+
+class TestRouteDistanceService:
+    @pytest.mark.asyncio
+    async def test_origin_aware_distances(self, service):
+        from_ny = await service.get_distance("98101")
+        from_seattle = await service.get_distance("98101", origin_zip="99201")
+
+        assert 2350 < from_ny < 2450
+        assert 200 < from_seattle < 250
+
+    @pytest.mark.asyncio
+    async def test_distances_stored_in_route_performance_and_cached(self, service):
+        distances = await service.get_distances(["98101", "60601", "00000"], persist=True)
+        async with aiosqlite.connect(service.db.db_path) as db:
+            cursor = await db.execute(
+                "SELECT destination_zip, distance_miles, typical_transit_days FROM route_performance "
+                "WHERE origin_zip = '10001' ORDER BY destination_zip"
+            )
+            rows = await cursor.fetchall()
+
+        assert distances["00000"] is None
+        assert [row[0] for row in rows] == ["60601", "98101"]
+        assert rows[1][1] == distances["98101"] and rows[1][2] == 1 + distances["98101"] // 500
+
+        async def fail(*args):
+            raise AssertionError("database touched")
+        service.db.get_route_distances = fail
+        assert await service.get_distances(["98101", "00000"]) == {"98101": distances["98101"], "00000": None}
+
+    @pytest.mark.asyncio
+    async def test_lookups_without_persist_do_not_write(self, service):
+        """Test request-path lookups stay read-only; a later persisting lookup stores what they computed"""
+        async def stored_rows():
+            async with aiosqlite.connect(service.db.db_path) as db:
+                cursor = await db.execute("SELECT destination_zip FROM route_performance WHERE origin_zip = '10001'")
+                return [row[0] for row in await cursor.fetchall()]
+
+        assert await service.get_distance("98101") is not None
+        assert await stored_rows() == []
+
+        await service.get_distances(["98101"], persist=True)
+        assert await stored_rows() == ["98101"]
+
+    @pytest.mark.asyncio
+    async def test_stored_distance_preferred_over_computed(self, service):
+        await service.db.record_route_distances([("10001", "60601", 800)])
+
+        assert await service.get_distance("60601") == 800
+
+
+class TestEngineRouteFactor:
+    @pytest.mark.asyncio
+    async def test_route_factor_uses_origin(self, db, make_package):
+        engine = RiskScoringEngine()
+        engine.db = db
+
+        far = await engine._get_route_risk(make_package("R1"))
+        near = await engine._get_route_risk(make_package("R1", origin_zip="98101"))
+        unknown = await engine._get_route_risk(make_package("R1", destination_zip="00000"))
+
+        assert far > 60 and near == 20
+        assert unknown == engine._estimate_route_distance("00000")
+
+    def test_route_distances_follow_the_engine_database(self, tmp_path):
+        engine = RiskScoringEngine()
+        engine.db = RiskDatabase(str(tmp_path / "other.db"))
+        assert engine.route_distances.db is engine.db
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from main import app, package_scorer, watch_enriched_orders
+from mock_data import build_awaiting_shipment_payload
+from models import RiskAssessment
+from score_events import ScoreEventBroker, stream_score_events
+
+client = TestClient(app)
+
+
+def assessment(score: int) -> RiskAssessment:
+    return RiskAssessment(risk_score=score, reasons=["test"])
+
+
+class TestScoreEvents:
+    def test_pushes_only_moves_beyond_threshold(self):
+        """Test updates within min_delta of the client's last score are not pushed"""
+        broker = ScoreEventBroker()
+        subscription = broker.subscribe(["FP1", "FP2"], min_delta=5, baselines={"FP1": 40})
+
+        broker.publish("FP1", assessment(43))
+        broker.publish("OTHER", assessment(90))
+        assert subscription.drain() == []
+
+        broker.publish("FP1", assessment(46))
+        broker.publish("FP2", assessment(10))  # no baseline yet: always pushed
+        updates = {u["fulfillmentPlanId"]: u for u in subscription.drain()}
+        assert updates["FP1"]["riskScore"] == 46 and updates["FP1"]["previousRiskScore"] == 40
+        assert updates["FP2"]["previousRiskScore"] is None
+
+        # Threshold is relative to what was last delivered (46)
+        broker.publish("FP1", assessment(49))
+        assert subscription.drain() == []
+
+    def test_slow_client_gets_latest_score_only(self):
+        """Test pending updates are coalesced per order instead of queuing without bound"""
+        broker = ScoreEventBroker()
+        subscription = broker.subscribe(["FP1"], min_delta=1, baselines={"FP1": 10})
+
+        for score in (20, 30, 40):
+            broker.publish("FP1", assessment(score))
+        updates = subscription.drain()
+
+        assert [u["riskScore"] for u in updates] == [40]
+        assert subscription.coalesced == 2
+
+        # A move that reverts before delivery is dropped
+        broker.publish("FP1", assessment(60))
+        broker.publish("FP1", assessment(40))
+        assert subscription.drain() == []
+
+    @pytest.mark.asyncio
+    async def test_stream_heartbeats_and_unsubscribes(self):
+        """Test the SSE body: subscribed event, heartbeat when idle, score events, cleanup on close"""
+        broker = ScoreEventBroker()
+        subscription = broker.subscribe(["FP1"], min_delta=5)
+        stream = stream_score_events(broker, subscription, heartbeat_seconds=0.01)
+
+        assert b"event: subscribed" in await stream.__anext__()
+        assert await stream.__anext__() == b": heartbeat\n\n"
+
+        broker.publish("FP1", assessment(70))
+        message = await stream.__anext__()
+        assert message.startswith(b"event: score\ndata: ")
+        assert b'"riskScore":70' in message
+
+        await stream.aclose()
+        assert broker.subscription_count == 0
+
+    def test_subscription_limit(self):
+        broker = ScoreEventBroker(max_subscriptions=1)
+        broker.subscribe(["FP1"], min_delta=5)
+        try:
+            broker.subscribe(["FP2"], min_delta=5)
+            assert False, "expected the second subscription to be rejected"
+        except RuntimeError:
+            pass
+
+    def test_stream_requires_ids(self):
+        assert client.get("/risk-scores/stream").status_code == 422
+        assert client.get("/risk-scores/stream", params={"fulfillmentPlanIds": " , "}).status_code == 422
+
+    def test_watched_orders_are_tracked_for_push(self):
+        """Test enrichment alone tracks nothing; watching an enriched order tracks it with its score as baseline"""
+        package_scorer.untrack("1147831")
+        response = client.post("/enrich-awaiting-shipments", json=build_awaiting_shipment_payload())
+        risk_score = response.json()["salesOrders"][0]["riskScore"]
+        assert package_scorer.get_fresh_assessment("1147831") is None
+
+        baselines = asyncio.run(watch_enriched_orders({"1147831", "NEVER-ENRICHED"}))
+        assert baselines == {"1147831": risk_score}
+        assert package_scorer.get_fresh_assessment("1147831").risk_score == risk_score
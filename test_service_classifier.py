@@ -0,0 +1,61 @@
+"""
+Tests for the ShipStation service string -> carrier classifier
+"""
+
+import json
+from models import CarrierType
+from service_classifier import ServiceClassifier, load_service_classifier
+
+
+class TestServiceClassifier:
+    def test_builtin_rules_match_legacy_precedence(self):
+        classifier = ServiceClassifier()
+
+        assert classifier.classify("UPS Ground") == CarrierType.UPS
+        assert classifier.classify("Standard", "FedEx Home Delivery") == CarrierType.FEDEX
+        assert classifier.classify("USPS Priority Mail") == CarrierType.USPS
+        assert classifier.classify("First Class Mail") == CarrierType.USPS
+        # A carrier named in serviceName outranks USPS keywords in requestedService
+        assert classifier.classify("Priority", "UPS 2nd Day Air") == CarrierType.UPS
+        # USPS keywords only count in requestedService
+        assert classifier.classify("Standard", "Priority") == CarrierType.UPS
+        assert classifier.classify("DHL Express Worldwide") == CarrierType.DHL
+        assert classifier.classify("Cheapest") == CarrierType.USPS
+        assert classifier.classify("Standard") == CarrierType.UPS
+        assert classifier.classify(None, None) == CarrierType.UPS
+
+    def test_new_carriers(self):
+        classifier = ServiceClassifier()
+
+        assert classifier.classify("OnTrac Ground") == CarrierType.ONTRAC
+        assert classifier.classify("Standard", "LaserShip Next Day") == CarrierType.LASERSHIP
+        assert classifier.classify("Canada Post Expedited Parcel") == CarrierType.CANADA_POST
+
+    def test_memo_cache(self):
+        classifier = ServiceClassifier(cache_size=2)
+        for service in ["UPS Ground", "FedEx Ground", "ups ground", "DHL"]:
+            classifier.classify(service)
+
+        assert list(classifier._cache) == [("ups ground", ""), ("dhl", "")]
+
+    def test_rules_from_file(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps({
+            "rules": [
+                {"carrier": "OnTrac", "keywords": ["regional express"]},
+                {"carrier": "Purolator", "keywords": ["purolator"]}
+            ],
+            "default": "USPS"
+        }))
+        classifier = load_service_classifier(str(path))
+
+        assert classifier.classify("Regional Express 2-Day") == CarrierType.ONTRAC
+        # Rules for carriers the models don't know are skipped
+        assert classifier.classify("Purolator Ground") == CarrierType.USPS
+
+    def test_unreadable_rules_fall_back_to_builtin(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text("{not json")
+
+        assert load_service_classifier(str(path)).classify("FedEx Ground") == CarrierType.FEDEX
+        assert load_service_classifier(str(tmp_path / "missing.json")).classify("DHL") == CarrierType.DHL
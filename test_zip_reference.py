@@ -0,0 +1,76 @@
+"""
+Tests for the memory-mapped ZIP reference dataset
+"""
+
+import os
+import mmap
+import pytest
+from zip_reference import ZipReference, zip_slot, DEFAULT_CSV_PATH
+import zip_reference as zip_reference_module
+
+CSV = "zip,lat,lon,state,urban_rural,base_risk\n02108,42.3576,-71.0684,MA,urban,16\n59601,46.613,-112.021,MT,rural,20\nbad,0,0,XX,urban,1\n"
+
+
+def write_csv(tmp_path, content=CSV):
+    path = tmp_path / "zips.csv"
+    path.write_text(content)
+    return str(path)
+
+
+class TestZipReference:
+    def test_lookup(self, tmp_path):
+        reference = ZipReference(write_csv(tmp_path))
+        info = reference.lookup("02108-1234")
+
+        assert len(reference) == 2
+        assert info.zip_code == "02108" and info.state == "MA" and info.urban_rural == "urban"
+        assert abs(info.lat - 42.3576) < 1e-4 and info.base_risk == 16
+        assert reference.lookup("59601").urban_rural == "rural"
+        assert reference.lookup("99999") is None
+        assert reference.lookup("abc") is None
+        assert "59601" in reference
+
+    def test_compiled_file_is_memory_mapped_and_reused(self, tmp_path):
+        csv_path = write_csv(tmp_path)
+        ZipReference(csv_path).lookup("02108")
+        bin_path = os.path.splitext(csv_path)[0] + ".bin"
+        built_at = os.stat(bin_path).st_mtime_ns
+
+        second = ZipReference(csv_path)
+        assert second.lookup("02108") is not None
+        assert isinstance(second._data, mmap.mmap)
+        assert os.stat(bin_path).st_mtime_ns == built_at
+
+    def test_rebuilt_when_source_changes(self, tmp_path):
+        csv_path = write_csv(tmp_path)
+        assert ZipReference(csv_path).lookup("73102") is None
+
+        write_csv(tmp_path, CSV + "73102,35.47,-97.519,OK,urban,13\n")
+        assert ZipReference(csv_path).lookup("73102").state == "OK"
+
+    def test_missing_dataset_disables_lookups(self, tmp_path):
+        reference = ZipReference(str(tmp_path / "missing.csv"))
+        assert reference.lookup("02108") is None
+        assert len(reference) == 0
+
+    def test_zip_slot(self):
+        assert zip_slot("00901") == 901
+        assert zip_slot("98101-0001") == 98101
+        assert zip_slot("9810") is None
+
+    def test_bundled_dataset_covers_seeded_zips(self):
+        reference = ZipReference(DEFAULT_CSV_PATH)
+        for zip_code in ["98101", "10001", "90210", "33101", "60601"]:
+            assert zip_code in reference
+
+
+class TestGeographicRiskFallback:
+    @pytest.mark.asyncio
+    async def test_unknown_zip_uses_reference_base_risk(self, db, tmp_path, monkeypatch):
+        monkeypatch.setattr(zip_reference_module.zip_reference, "csv_path", write_csv(tmp_path))
+        monkeypatch.setattr(zip_reference_module.zip_reference, "bin_path", str(tmp_path / "zips.bin"))
+        monkeypatch.setattr(zip_reference_module.zip_reference, "_data", None)
+
+        assert await db.get_geographic_risk("59601") == 20
+        assert await db.get_geographic_risk("99999") == 10
+        monkeypatch.setattr(zip_reference_module.zip_reference, "_data", None)
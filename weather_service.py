@@ -14,6 +14,7 @@ class WeatherService:
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
         # In-memory cache for demo
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
         # Hardcoded cities for demo
         self.supported_cities = {"Seattle", "New York"}
         
@@ -60,6 +61,16 @@ class WeatherService:
         self._cache[city] = risk_data
         return risk_data
     
+    def invalidate(self, city: str) -> Optional[Dict[str, Any]]:
+        """Drop the cached weather risk for a city, returning the previous value"""
+        logger.info(f"Invalidating cached weather for {city}")
+        self._versions[city] = self._versions.get(city, 0) + 1
+        return self._cache.pop(city, None)
+    
+    def cache_version(self, city: str) -> int:
+        """Changes whenever the cached weather for a city is invalidated"""
+        return self._versions.get(city, 0)
+    
     async def _fetch_weather_data(self, city: str) -> Dict[str, Any]:
         """Fetch actual weather data from OpenWeatherMap API"""
         logger.debug(f"Calling OpenWeatherMap API for {city}")
@@ -0,0 +1,139 @@
+from typing import NamedTuple, Optional
+import csv
+import logging
+import mmap
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "zip_reference.csv")
+
+# Binary layout: header, then one fixed-size record per numeric zip 00000-99999, so a lookup
+# is a single offset computation. Records with an empty state are zips missing from the source.
+MAGIC = b"ZIPREF01"
+HEADER = struct.Struct("<8sIqq")  # magic, entry count, source size, source mtime_ns
+RECORD = struct.Struct("<ff2sBB")  # lat, lon, state, urban/rural code, base risk
+ZIP_SLOTS = 100000
+
+URBAN_RURAL_CODES = {"urban": 1, "suburban": 2, "rural": 3}
+URBAN_RURAL_NAMES = {code: name for name, code in URBAN_RURAL_CODES.items()}
+
+
+class ZipInfo(NamedTuple):
+    zip_code: str
+    lat: float
+    lon: float
+    state: str
+    urban_rural: Optional[str]
+    base_risk: int
+
+
+def zip_slot(zip_code: str) -> Optional[int]:
+    """Numeric index for a 5-digit (or ZIP+4) code, None if it isn't one"""
+    zip5 = zip_code.strip()[:5]
+    if len(zip5) != 5 or not zip5.isdigit():
+        return None
+    return int(zip5)
+
+
+def compile_zip_reference(csv_path: str) -> bytes:
+    """
+    Build the binary table from a CSV with columns zip, lat, lon, state, urban_rural, base_risk
+    (e.g. derived from the Census ZCTA gazetteer); an optional city column feeds the address resolver
+    """
+    stat = os.stat(csv_path)
+    table = bytearray(HEADER.size + ZIP_SLOTS * RECORD.size)
+    count = 0
+
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            slot = zip_slot(row["zip"].zfill(5))
+            state = row["state"].strip().upper().encode("ascii")
+            if slot is None or len(state) != 2:
+                logger.warning(f"Skipping invalid ZIP reference row: {row}")
+                continue
+            RECORD.pack_into(
+                table, HEADER.size + slot * RECORD.size,
+                float(row["lat"]), float(row["lon"]), state,
+                URBAN_RURAL_CODES.get(row.get("urban_rural", "").strip().lower(), 0),
+                max(0, min(int(float(row.get("base_risk") or 10)), 255))
+            )
+            count += 1
+
+    HEADER.pack_into(table, 0, MAGIC, count, stat.st_size, stat.st_mtime_ns)
+    return bytes(table)
+
+
+class ZipReference:
+    """
+    Nationwide ZIP reference data (location, state, urban/rural class, base risk).
+    The CSV is compiled once into a fixed-record binary file next to it and memory-mapped
+    read-only, so every worker process shares the same pages and lookups don't parse anything.
+    The binary is rebuilt when the CSV changes. Opened lazily on first lookup.
+    """
+
+    def __init__(self, csv_path: str = DEFAULT_CSV_PATH, bin_path: Optional[str] = None):
+        self.csv_path = csv_path
+        self.bin_path = bin_path or os.path.splitext(csv_path)[0] + ".bin"
+        self._data = None
+        self._count = 0
+
+    def _is_current(self, header: bytes) -> bool:
+        magic, _, source_size, source_mtime = HEADER.unpack_from(header)
+        stat = os.stat(self.csv_path)
+        return magic == MAGIC and source_size == stat.st_size and source_mtime == stat.st_mtime_ns
+
+    def _open(self):
+        if self._data is not None:
+            return
+        if not os.path.exists(self.csv_path):
+            logger.warning(f"ZIP reference dataset not found at {self.csv_path} - lookups disabled")
+            self._data = b""
+            return
+
+        try:
+            with open(self.bin_path, "rb") as f:
+                if self._is_current(f.read(HEADER.size)):
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, struct.error):
+            pass
+
+        if self._data is None:
+            table = compile_zip_reference(self.csv_path)
+            try:
+                # Write-then-rename so concurrent workers never map a half-written file
+                tmp_path = f"{self.bin_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(table)
+                os.replace(tmp_path, self.bin_path)
+                with open(self.bin_path, "rb") as f:
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError as e:
+                logger.warning(f"Could not write {self.bin_path} ({str(e)}) - keeping ZIP reference in process memory")
+                self._data = table
+
+        self._count = HEADER.unpack_from(self._data)[1]
+        logger.info(f"ZIP reference loaded: {self._count} zip codes from {self.csv_path}")
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def lookup(self, zip_code: str) -> Optional[ZipInfo]:
+        """Reference data for a zip code, None if unknown"""
+        self._open()
+        slot = zip_slot(zip_code)
+        if slot is None or not self._count:
+            return None
+        lat, lon, state, urban_rural, base_risk = RECORD.unpack_from(self._data, HEADER.size + slot * RECORD.size)
+        if state == b"\0\0":
+            return None
+        return ZipInfo(f"{slot:05d}", lat, lon, state.decode("ascii"), URBAN_RURAL_NAMES.get(urban_rural), base_risk)
+
+    def __contains__(self, zip_code: str) -> bool:
+        return self.lookup(zip_code) is not None
+
+
+# Global ZIP reference instance
+zip_reference = ZipReference(os.getenv("ZIP_REFERENCE_CSV", DEFAULT_CSV_PATH))